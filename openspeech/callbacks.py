@@ -52,3 +52,29 @@ class CheckpointEveryNSteps(pl.Callback):
                 filename = f"{epoch}_{global_step}.ckpt"
             ckpt_path = os.path.join(trainer.checkpoint_callback.dirpath, filename)
             trainer.save_checkpoint(ckpt_path)
+
+
+class SamplerStateCallback(pl.Callback):
+    """
+    Count the train batches consumed from the batch sampler of the data module, so that the sampler state
+    saved in checkpoints points at the next unseen batch. Must run before ``CheckpointEveryNSteps``.
+    """
+
+    def on_train_batch_end(self, trainer: pl.Trainer, *args):
+        """Advance the position of the train sampler after every train batch"""
+        sampler = getattr(trainer.datamodule, "train_sampler", None)
+        if sampler is not None and hasattr(sampler, "advance"):
+            sampler.advance()
+
+
+class DatasetEpochCallback(pl.Callback):
+    """
+    Set the epoch of the train dataset of the data module before every train epoch, if it has ``set_epoch``.
+    Streaming datasets seed their shard order and shuffle with it, which Lightning only does for samplers.
+    """
+
+    def on_train_epoch_start(self, trainer: pl.Trainer, *args):
+        """Set the epoch of the train dataset"""
+        dataset = getattr(trainer.datamodule, "dataset", dict()).get("train")
+        if dataset is not None and hasattr(dataset, "set_epoch"):
+            dataset.set_epoch(trainer.current_epoch)
@@ -0,0 +1,466 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import gzip
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tarfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from openspeech.data.audio.load import load_audio_bytes
+from openspeech.data.packed import PackedStrings
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = (".flac", ".wav", ".pcm")
+COMPRESSED_EXTENSIONS = (".tar.gz", ".tgz")
+
+
+def decompress_archive(archive_path: str, remove_compressed: bool = False) -> str:
+    r"""
+    Returns the path of the uncompressed tar of ``archive_path``. Members of a gzip stream can not be read by
+    offset, so a ``.tar.gz`` is decompressed once (streamed, nothing is extracted) next to the original archive.
+    An uncompressed tar is returned as is.
+
+    With ``remove_compressed``, the compressed archive is removed once the decompressed copy is verified (the gzip
+    CRC-32 and length are checked at the end of the stream) and flushed to disk, so the disk usage does not double.
+
+    Args:
+        archive_path (str): path of ``.tar``, ``.tar.gz`` or ``.tgz`` archive
+        remove_compressed (bool): remove the compressed archive after decompression
+
+    Returns:
+        tar_path (str): path of the uncompressed tar
+    """
+    if not archive_path.endswith(COMPRESSED_EXTENSIONS):
+        return archive_path
+
+    extension = next(extension for extension in COMPRESSED_EXTENSIONS if archive_path.endswith(extension))
+    tar_path = f"{archive_path[: -len(extension)]}.tar"
+
+    if not os.path.exists(tar_path) or os.path.getmtime(tar_path) < os.path.getmtime(archive_path):
+        logger.info(f"Decompress {archive_path} to {tar_path}")
+        tmp_path = f"{tar_path}.{os.getpid()}.tmp"
+        try:
+            with gzip.open(archive_path, "rb") as src, open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, length=1 << 20)
+                dst.flush()
+                os.fsync(dst.fileno())
+        except (OSError, EOFError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, tar_path)
+
+    if remove_compressed:
+        os.remove(archive_path)
+
+    return tar_path
+
+
+def _fingerprint(tar_paths: list) -> str:
+    sha1 = hashlib.sha1("|".join(AUDIO_EXTENSIONS).encode("utf-8"))
+    for tar_path in tar_paths:
+        stat = os.stat(tar_path)
+        sha1.update(f"\0{os.path.abspath(tar_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+    return sha1.hexdigest()
+
+
+def _save_packed(arrays: dict, name: str, strings: PackedStrings) -> None:
+    arrays[f"{name}_data"] = strings.data
+    arrays[f"{name}_starts"] = strings.starts
+    arrays[f"{name}_ends"] = strings.ends
+
+
+def _load_packed(index, name: str) -> PackedStrings:
+    return PackedStrings(index[f"{name}_data"], index[f"{name}_starts"], index[f"{name}_ends"])
+
+
+class ArchiveIndex(object):
+    r"""
+    Location of every audio member of a set of uncompressed tar archives, and the contents of their text members
+    (e.g. transcripts). Members are addressed by a dataset-relative path, which is the member name unless the index
+    was built with a ``member_to_path`` mapping.
+
+    Args:
+        tar_paths (list): paths of the indexed tar archives
+        paths (PackedStrings): path of each audio member
+        archive_ids (np.ndarray): archive (position in ``tar_paths``) of each audio member (int32)
+        offsets (np.ndarray): byte offset of the contents of each audio member (int64)
+        sizes (np.ndarray): byte size of each audio member (int64)
+        text_paths (PackedStrings): path of each text member
+        texts (PackedStrings): contents of each text member
+    """
+
+    def __init__(
+        self,
+        tar_paths: list,
+        paths: PackedStrings,
+        archive_ids: np.ndarray,
+        offsets: np.ndarray,
+        sizes: np.ndarray,
+        text_paths: PackedStrings,
+        texts: PackedStrings,
+    ) -> None:
+        self.tar_paths = list(tar_paths)
+        self.paths = paths
+        self.archive_ids = archive_ids
+        self.offsets = offsets
+        self.sizes = sizes
+        self.text_paths = text_paths
+        self.texts = texts
+        self._rows = None
+
+    def lookup(self, path: str) -> Tuple[int, int, int]:
+        r"""Returns ``(archive_id, offset, size)`` of the audio member at ``path``. Raises KeyError if missing."""
+        if self._rows is None:
+            self._rows = {path: row for row, path in enumerate(self.paths)}
+        row = self._rows[path]
+        return int(self.archive_ids[row]), int(self.offsets[row]), int(self.sizes[row])
+
+    def __contains__(self, path: str) -> bool:
+        try:
+            self.lookup(path)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_rows"] = None
+        return state
+
+    def save(self, index_path: str, fingerprint: str = "") -> None:
+        arrays = dict(
+            fingerprint=np.array(fingerprint),
+            tar_paths=np.array(self.tar_paths),
+            archive_ids=self.archive_ids,
+            offsets=self.offsets,
+            sizes=self.sizes,
+        )
+        _save_packed(arrays, "paths", self.paths)
+        _save_packed(arrays, "text_paths", self.text_paths)
+        _save_packed(arrays, "texts", self.texts)
+
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, index_path: str) -> Tuple["ArchiveIndex", str]:
+        r"""Returns the index saved at ``index_path`` and its fingerprint."""
+        with np.load(index_path) as index:
+            archive_index = cls(
+                tar_paths=[str(tar_path) for tar_path in index["tar_paths"]],
+                paths=_load_packed(index, "paths"),
+                archive_ids=index["archive_ids"],
+                offsets=index["offsets"],
+                sizes=index["sizes"],
+                text_paths=_load_packed(index, "text_paths"),
+                texts=_load_packed(index, "texts"),
+            )
+            return archive_index, str(index["fingerprint"])
+
+
+def build_archive_index(
+    tar_paths: list,
+    member_to_path: Optional[Callable[[str], str]] = None,
+    text_suffix: str = ".txt",
+    encoding: str = "utf-8",
+) -> ArchiveIndex:
+    r"""
+    Scans uncompressed tar archives once and records the offset and size of every audio member, and the contents
+    of every member ending with ``text_suffix``.
+
+    Args:
+        tar_paths (list): paths of uncompressed tar archives (see :func:`decompress_archive`)
+        member_to_path (callable, optional): maps a member name to the path the member is addressed by
+        text_suffix (str): suffix of the members whose contents are kept in the index
+        encoding (str): encoding of text members
+
+    Returns:
+        archive_index (ArchiveIndex): index of the archives
+    """
+    paths, archive_ids, offsets, sizes = list(), list(), list(), list()
+    text_paths, texts = list(), list()
+
+    for archive_id, tar_path in enumerate(tar_paths):
+        logger.info(f"Index {tar_path}")
+        with tarfile.open(tar_path, mode="r:") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                path = member_to_path(member.name) if member_to_path is not None else member.name
+
+                if member.name.endswith(AUDIO_EXTENSIONS):
+                    paths.append(path)
+                    archive_ids.append(archive_id)
+                    offsets.append(member.offset_data)
+                    sizes.append(member.size)
+                elif member.name.endswith(text_suffix):
+                    text_paths.append(path)
+                    texts.append(tar.extractfile(member).read().decode(encoding))
+
+    return ArchiveIndex(
+        tar_paths=tar_paths,
+        paths=PackedStrings.from_list(paths),
+        archive_ids=np.asarray(archive_ids, dtype=np.int32),
+        offsets=np.asarray(offsets, dtype=np.int64),
+        sizes=np.asarray(sizes, dtype=np.int64),
+        text_paths=PackedStrings.from_list(text_paths),
+        texts=PackedStrings.from_list(texts),
+    )
+
+
+def load_or_build_archive_index(
+    archive_paths: list,
+    index_path: str,
+    member_to_path: Optional[Callable[[str], str]] = None,
+    text_suffix: str = ".txt",
+    remove_compressed: bool = False,
+) -> ArchiveIndex:
+    r"""
+    Returns the index of ``archive_paths`` saved at ``index_path``, decompressing the archives and building the
+    index first if it is missing or the archives changed since it was built.
+
+    Args:
+        archive_paths (list): paths of ``.tar``, ``.tar.gz`` or ``.tgz`` archives
+        index_path (str): path of the index file
+        member_to_path (callable, optional): maps a member name to the path the member is addressed by
+        text_suffix (str): suffix of the members whose contents are kept in the index
+        remove_compressed (bool): remove compressed archives after decompression
+
+    Returns:
+        archive_index (ArchiveIndex): index of the archives
+    """
+    tar_paths = [decompress_archive(archive_path, remove_compressed) for archive_path in archive_paths]
+    fingerprint = _fingerprint(tar_paths)
+
+    if os.path.exists(index_path):
+        archive_index, index_fingerprint = ArchiveIndex.load(index_path)
+        if index_fingerprint == fingerprint:
+            return archive_index
+        logger.info(f"{index_path} is out of date. Rebuild archive index..")
+
+    archive_index = build_archive_index(tar_paths, member_to_path=member_to_path, text_suffix=text_suffix)
+    archive_index.save(index_path, fingerprint=fingerprint)
+    return archive_index
+
+
+class _MemberFile(io.RawIOBase):
+    r"""Read-only file object over one archive member, so that headers can be parsed without reading the member."""
+
+    def __init__(self, fd: int, offset: int, size: int) -> None:
+        super(_MemberFile, self).__init__()
+        self.fd = fd
+        self.offset = offset
+        self.size = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = min(max(offset, 0), self.size)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        data = os.pread(self.fd, length, self.offset + self.position)
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class ArchiveReader(object):
+    r"""
+    Reads audio members of indexed tar archives by offset, as a drop-in replacement of the file based
+    ``load_audio``, ``get_audio_length`` and ``get_non_silence_indices`` (see ``openspeech.data.audio.load``).
+    Audio paths are given the same way, joined with ``dataset_path``.
+
+    Archives are opened lazily and kept in a pool of at most ``max_open_files`` descriptors (least recently used
+    is closed first). Members are read with ``os.pread``, so descriptors are safe to share between threads and
+    forked DataLoader workers. The reader is picklable; descriptors are reopened in the unpickling process.
+
+    Args:
+        archive_index (ArchiveIndex): index of the archives
+        dataset_path (str): path the audio paths are joined with
+        max_open_files (int): the maximum number of archives kept open
+    """
+
+    def __init__(self, archive_index: ArchiveIndex, dataset_path: str = "", max_open_files: int = 64) -> None:
+        self.archive_index = archive_index
+        self.dataset_path = dataset_path
+        self.max_open_files = max_open_files
+        self._prefix = os.path.join(dataset_path, "") if dataset_path else ""
+        self._handles = OrderedDict()
+        self._users = dict()
+        self._evicted = set()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_handles"] = OrderedDict()
+        state["_users"] = dict()
+        state["_evicted"] = set()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __del__(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for fd in getattr(self, "_handles", dict()).values():
+            os.close(fd)
+        self._handles = OrderedDict()
+
+    @contextmanager
+    def _open(self, audio_path: str) -> Iterator[Tuple[int, int, int]]:
+        r"""
+        Yields ``(fd, offset, size)`` of the member at ``audio_path``. A descriptor evicted from the pool while it is
+        in use by another thread is closed once that thread is done with it.
+        """
+        if self._prefix and audio_path.startswith(self._prefix):
+            audio_path = audio_path[len(self._prefix) :]
+        archive_id, offset, size = self.archive_index.lookup(audio_path)
+
+        with self._lock:
+            fd = self._handles.get(archive_id)
+            if fd is None:
+                fd = os.open(self.archive_index.tar_paths[archive_id], os.O_RDONLY)
+                self._handles[archive_id] = fd
+            else:
+                self._handles.move_to_end(archive_id)
+            self._users[fd] = self._users.get(fd, 0) + 1
+
+            while len(self._handles) > self.max_open_files:
+                _, evicted_fd = self._handles.popitem(last=False)
+                if evicted_fd in self._users:
+                    self._evicted.add(evicted_fd)
+                else:
+                    os.close(evicted_fd)
+
+        try:
+            yield fd, offset, size
+        finally:
+            with self._lock:
+                self._users[fd] -= 1
+                if self._users[fd] == 0:
+                    del self._users[fd]
+                    if fd in self._evicted:
+                        self._evicted.discard(fd)
+                        os.close(fd)
+
+    def read(self, audio_path: str) -> bytes:
+        r"""Returns the contents of the member at ``audio_path``. Raises KeyError if it is not in the archives."""
+        with self._open(audio_path) as (fd, offset, size):
+            return os.pread(fd, size, offset)
+
+    def load_audio(
+        self,
+        audio_path: str,
+        sample_rate: int,
+        del_silence: bool = False,
+        non_silence_indices: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Same as ``load_audio``, reading the archive member. If the member can not be read, return None."""
+        try:
+            data = self.read(audio_path)
+        except (KeyError, OSError):
+            logger.warning("{0} can not be read from archives".format(audio_path))
+            return None
+
+        if audio_path.endswith("pcm") and del_silence and non_silence_indices is not None:
+            signal = np.frombuffer(data, dtype="h")
+            signal = np.concatenate([signal[start:end] for start, end in non_silence_indices]).astype("float32")
+            return signal / 32767  # normalize audio
+
+        return load_audio_bytes(data, audio_path, sample_rate, del_silence=del_silence)
+
+    def get_audio_length(self, audio_path: str, sample_rate: int) -> int:
+        """Same as ``get_audio_length``, reading the header of the archive member. If it can not be read, return 0."""
+        try:
+            with self._open(audio_path) as (fd, offset, size):
+                if audio_path.endswith("pcm"):
+                    return size // 2
+
+                elif audio_path.endswith("wav") or audio_path.endswith("flac"):
+                    info = sf.info(_MemberFile(fd, offset, size))
+                    return int(np.ceil(info.frames * sample_rate / info.samplerate))
+
+        except KeyError:
+            logger.warning("{0} is not in archives".format(audio_path))
+        except RuntimeError:
+            logger.warning("RuntimeError in {0}".format(audio_path))
+        except IOError:
+            logger.warning("IOError in {0}".format(audio_path))
+
+        return 0
+
+    def get_non_silence_indices(self, audio_path: str, sample_rate: int, top_db: float = 30) -> np.ndarray:
+        """Same as ``get_non_silence_indices``, reading the archive member. If it can not be read, return empty."""
+        try:
+            if audio_path.endswith("pcm"):
+                signal = np.frombuffer(self.read(audio_path), dtype="h").astype("float32")
+                return librosa.effects.split(signal, top_db=top_db).astype(np.int64)
+
+            elif audio_path.endswith("wav") or audio_path.endswith("flac"):
+                audio_length = self.get_audio_length(audio_path, sample_rate)
+                if audio_length > 0:
+                    return np.array([[0, audio_length]], dtype=np.int64)
+
+        except KeyError:
+            logger.warning("{0} is not in archives".format(audio_path))
+        except IOError:
+            logger.warning("IOError in {0}".format(audio_path))
+
+        return np.zeros((0, 2), dtype=np.int64)
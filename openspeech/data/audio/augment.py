@@ -23,12 +23,16 @@
 import logging
 import os
 import random
+from fractions import Fraction
+from typing import Optional
 
 import librosa
 import numpy as np
+import torch
+from scipy.signal import resample_poly
 from torch import Tensor
 
-from ..audio.load import load_audio
+from ..audio.noise_bank import NoiseBank
 
 logger = logging.getLogger(__name__)
 
@@ -76,19 +80,89 @@ class SpecAugment(object):
         return feature
 
 
+class BatchSpecAugment(object):
+    """
+    Provides Spec Augment for a padded feature batch. All time and frequency masks of the batch are built at once
+    with tensor ops, so it can run in the collate function or on the model device.
+    Time mask widths are drawn per sample from ``[0, time_mask_ratio * length)``, and time masks are placed
+    inside the valid (non padded) frames of each sample.
+
+    Args:
+        freq_mask_para (int): maximum frequency masking length
+        time_mask_num (int): how many times to apply time masking
+        freq_mask_num (int): how many times to apply frequency masking
+        time_mask_ratio (float): maximum time masking length relative to the length of the sample
+
+    Inputs: features, feature_lengths, apply_mask
+        - **features** (torch.FloatTensor): padded feature batch of size ``(batch, seq_length, dimension)``
+        - **feature_lengths** (torch.IntTensor): lengths of features ``(batch)``
+        - **apply_mask** (torch.BoolTensor, optional): samples to augment ``(batch)``. Default: all samples
+
+    Returns: features
+        - **features**: masked feature batch.
+    """
+
+    def __init__(
+        self,
+        freq_mask_para: int = 18,
+        time_mask_num: int = 10,
+        freq_mask_num: int = 2,
+        time_mask_ratio: float = 0.05,
+    ) -> None:
+        self.freq_mask_para = freq_mask_para
+        self.time_mask_num = time_mask_num
+        self.freq_mask_num = freq_mask_num
+        self.time_mask_ratio = time_mask_ratio
+
+    @staticmethod
+    def _spans(widths: Tensor, limits: Tensor, size: int) -> Tensor:
+        """Returns a mask ``(batch, size)`` of random spans of ``widths`` ``(batch, num_masks)`` within ``limits``"""
+        starts = (torch.rand(widths.shape, device=widths.device) * (limits - widths + 1).clamp_min(1)).long()
+        positions = torch.arange(size, device=widths.device).view(1, 1, -1)
+        spans = (positions >= starts.unsqueeze(2)) & (positions < (starts + widths).unsqueeze(2))
+        return spans.any(dim=1)
+
+    def __call__(self, features: Tensor, feature_lengths: Tensor, apply_mask: Optional[Tensor] = None) -> Tensor:
+        batch_size, seq_length, dimension = features.size()
+        device = features.device
+        feature_lengths = feature_lengths.to(device).long().view(-1, 1)
+
+        time_mask_para = feature_lengths.float() * self.time_mask_ratio
+        time_widths = (torch.rand(batch_size, self.time_mask_num, device=device) * time_mask_para).long()
+        time_mask = self._spans(time_widths, feature_lengths, seq_length)
+
+        freq_widths = (torch.rand(batch_size, self.freq_mask_num, device=device) * self.freq_mask_para).long()
+        freq_widths = freq_widths.clamp_max(dimension)
+        freq_mask = self._spans(freq_widths, torch.full_like(freq_widths, dimension), dimension)
+
+        mask = time_mask.unsqueeze(2) | freq_mask.unsqueeze(1)
+        if apply_mask is not None:
+            mask &= apply_mask.to(device).view(-1, 1, 1)
+
+        return features.masked_fill(mask, 0.0)
+
+
 class NoiseInjector(object):
     """
     Provides noise injection for noise augmentation.
 
     The noise augmentation process is as follows:
-        1: Randomly sample audios by `noise_size` from dataset
-        2: Extract noise from `audio_paths`
+        1: Decode noise files of `noise_dataset_dir` once into a shared, memory-mapped noise bank
+        2: Randomly sample a noise clip from the bank
         3: Add noise to sound
 
+    With ``min_snr`` / ``max_snr`` the noise is scaled to a signal-to-noise ratio drawn from that range (dB),
+    using the RMS of the noise clip stored in the bank. Otherwise it is scaled by a level drawn from
+    ``[0, noise_level)``.
+
     Args:
         noise_dataset_dir (str): path of noise dataset
         sample_rate (int): sampling rate
         noise_level (float): level of noise
+        noise_bank_path (str, optional): path prefix of the noise bank files
+        noise_bank_dtype (str): storage dtype of the noise bank (int16 or float32)
+        min_snr (float, optional): minimum signal-to-noise ratio (dB)
+        max_snr (float, optional): maximum signal-to-noise ratio (dB)
 
     Inputs: signal
         - **signal**: signal from audio file
@@ -102,6 +176,10 @@ class NoiseInjector(object):
         noise_dataset_dir: str,
         sample_rate: int = 16000,
         noise_level: float = 0.7,
+        noise_bank_path: Optional[str] = None,
+        noise_bank_dtype: str = "int16",
+        min_snr: Optional[float] = None,
+        max_snr: Optional[float] = None,
     ) -> None:
         if not os.path.exists(noise_dataset_dir):
             logger.info("Directory doesn`t exist: {0}".format(noise_dataset_dir))
@@ -111,15 +189,31 @@ class NoiseInjector(object):
 
         self.sample_rate = sample_rate
         self.noise_level = noise_level
-        self._load_audio = load_audio
-        self.audio_paths = self.create_audio_paths(noise_dataset_dir)
-        self.dataset = self.create_noiseset(noise_dataset_dir)
+        self.min_snr = min_snr
+        self.max_snr = max_snr
+        self.noise_bank = NoiseBank.open(
+            noise_dataset_dir,
+            bank_path=noise_bank_path,
+            sample_rate=sample_rate,
+            dtype=noise_bank_dtype,
+        )
+        if len(self.noise_bank) == 0:
+            raise ValueError(f"No noise clip could be loaded from {noise_dataset_dir}")
 
         logger.info("Create Noise injector complete !!")
 
+    def _noise_scale(self, signal: np.ndarray, noise_idx: int) -> float:
+        if self.min_snr is None or self.max_snr is None:
+            return np.random.uniform(0, self.noise_level)
+
+        snr = np.random.uniform(self.min_snr, self.max_snr)
+        signal_rms = np.sqrt(np.dot(signal, signal) / max(len(signal), 1))
+        return signal_rms / (self.noise_bank.rms[noise_idx] * 10 ** (snr / 20))
+
     def __call__(self, signal):
-        noise = np.random.choice(self.dataset)
-        noise_level = np.random.uniform(0, self.noise_level)
+        noise_idx = np.random.randint(len(self.noise_bank))
+        noise = self.noise_bank[noise_idx]
+        noise_level = self._noise_scale(signal, noise_idx)
 
         signal_length = len(signal)
         noise_length = len(noise)
@@ -134,33 +228,6 @@ class NoiseInjector(object):
 
         return signal
 
-    def create_audio_paths(self, dataset_path) -> list:
-        audio_paths = list()
-        noise_audio_paths = os.listdir(dataset_path)
-        num_noise_audio_data = len(noise_audio_paths)
-
-        for idx in range(num_noise_audio_data):
-            if (
-                noise_audio_paths[idx].endswith(".pcm")
-                or noise_audio_paths[idx].endswith(".wav")
-                or noise_audio_paths[idx].endswith(".flac")
-            ):
-                audio_paths.append(noise_audio_paths[idx])
-
-        return audio_paths
-
-    def create_noiseset(self, dataset_path):
-        dataset = list()
-
-        for audio_path in self.audio_paths:
-            audio_path = os.path.join(dataset_path, audio_path)
-            noise = self._load_audio(audio_path, self.sample_rate, del_silence=False)
-
-            if noise is not None:
-                dataset.append(noise)
-
-        return dataset
-
 
 class TimeStretchAugment(object):
     """
@@ -179,7 +246,42 @@ class TimeStretchAugment(object):
         self.max_rate = max_rate
 
     def __call__(self, signal: np.array):
-        return librosa.effects.time_stretch(signal, random.uniform(self.min_rate, self.max_rate))
+        return librosa.effects.time_stretch(signal, rate=random.uniform(self.min_rate, self.max_rate))
+
+
+class SpeedPerturbAugment(object):
+    """
+    Speed perturbation by polyphase resampling (https://www.danielpovey.com/files/2015_interspeech_augmentation.pdf).
+    Changes tempo and pitch together, and is much cheaper than the phase vocoder of ``TimeStretchAugment``.
+    The rate is drawn from a small fixed set, so perturbed features can be cached per rate.
+
+    Args:
+        rates (tuple): speed rates to choose from. A rate of 1.1 makes the signal 1.1 times faster (shorter).
+
+    Inputs:
+        signal: np.ndarray [shape=(n,)] audio time series
+        rate (float, optional): speed rate. Default: randomly chosen from ``rates``
+
+    Returns:
+        y_perturbed: np.ndarray [shape=(ceil(n/rate),)] speed perturbed audio time series
+    """
+
+    def __init__(self, rates: tuple = (0.9, 1.0, 1.1)):
+        super(SpeedPerturbAugment, self).__init__()
+        self.rates = tuple(float(rate) for rate in rates)
+        # resampling by up / down with the smallest integers approximating 1 / rate
+        self._ratios = {rate: Fraction(rate).limit_denominator(100) for rate in self.rates}
+
+    def choose_rate(self) -> float:
+        return random.choice(self.rates)
+
+    def __call__(self, signal: np.ndarray, rate: Optional[float] = None) -> np.ndarray:
+        rate = self.choose_rate() if rate is None else rate
+        if rate == 1.0:
+            return signal
+
+        ratio = self._ratios.get(rate) or Fraction(rate).limit_denominator(100)
+        return resample_poly(signal, ratio.denominator, ratio.numerator).astype(signal.dtype, copy=False)
 
 
 class JoiningAugment(object):
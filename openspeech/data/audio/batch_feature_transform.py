@@ -0,0 +1,272 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+from omegaconf import DictConfig
+from torch import Tensor
+
+from ...utils import LIBROSA_IMPORT_ERROR
+
+
+class BatchFeatureTransform(nn.Module):
+    r"""
+    Super class of batched feature transforms. Computes features for a zero padded waveform batch with
+    batched ``torch.stft`` and applies the per-utterance normalization of ``SpeechToTextDataset``,
+    or the global statistics of ``cmvn`` if given (see :meth:`set_cmvn`).
+    Frames that depend only on the valid part of an utterance are identical to the features of the
+    registered (single utterance) transform.
+
+    Note:
+        Do not use this class directly, use one of the sub classes.
+
+    Args:
+        configs (DictConfig): configuraion set
+        cmvn (CMVN, optional): global normalization statistics
+
+    Inputs: waveforms, waveform_lengths
+        - **waveforms** (torch.FloatTensor): zero padded waveforms of size ``(batch, num_samples)``
+        - **waveform_lengths** (torch.IntTensor): lengths of waveforms ``(batch)``
+
+    Returns: features, feature_lengths
+        - **features** (torch.FloatTensor): normalized features of size ``(batch, seq_length, num_features)``,
+            zero padded.
+        - **feature_lengths** (torch.IntTensor): lengths of features ``(batch)``
+    """
+
+    def __init__(self, configs: DictConfig, cmvn=None) -> None:
+        super(BatchFeatureTransform, self).__init__()
+        self.sample_rate = configs.audio.sample_rate
+        self.num_mels = configs.audio.num_mels
+        self.n_fft = int(round(configs.audio.sample_rate * 0.001 * configs.audio.frame_length))
+        self.hop_length = int(round(configs.audio.sample_rate * 0.001 * configs.audio.frame_shift))
+        self.register_buffer("cmvn_scale", None, persistent=False)
+        self.register_buffer("cmvn_bias", None, persistent=False)
+        self.set_cmvn(cmvn)
+
+    def set_cmvn(self, cmvn=None) -> None:
+        r"""Normalizes features with the global statistics of ``cmvn``, or per utterance if it is None"""
+        if cmvn is None:
+            self.cmvn_scale = self.cmvn_bias = None
+            return
+        device = self.cmvn_scale.device if self.cmvn_scale is not None else "cpu"
+        self.cmvn_scale = torch.from_numpy(cmvn._scale.copy()).to(device)
+        self.cmvn_bias = torch.from_numpy(cmvn._bias.copy()).to(device)
+
+    def _transform(self, waveforms: Tensor) -> Tensor:
+        raise NotImplementedError
+
+    def get_feature_lengths(self, waveform_lengths: Tensor) -> Tensor:
+        r"""Number of frames computed for a waveform of each length (``center=True``)"""
+        return torch.div(waveform_lengths, self.hop_length, rounding_mode="floor") + 1
+
+    def forward(self, waveforms: Tensor, waveform_lengths: Tensor) -> Tuple[Tensor, Tensor]:
+        with torch.autocast(waveforms.device.type, enabled=False):
+            features = self._transform(waveforms.float())
+
+        feature_lengths = self.get_feature_lengths(waveform_lengths.to(features.device)).clamp(0, features.size(1))
+        mask = (torch.arange(features.size(1), device=features.device) < feature_lengths.unsqueeze(1)).unsqueeze(2)
+
+        if self.cmvn_scale is not None:
+            features = torch.addcmul(self.cmvn_bias, features, self.cmvn_scale).masked_fill(~mask, 0.0)
+            return features, feature_lengths.int()
+
+        num_elements = (feature_lengths * features.size(2)).clamp_min(1).to(features.dtype).view(-1, 1, 1)
+        features = features.masked_fill(~mask, 0.0)
+        mean = features.sum(dim=(1, 2), keepdim=True) / num_elements
+        var = ((features - mean).masked_fill(~mask, 0.0) ** 2).sum(dim=(1, 2), keepdim=True) / num_elements
+        features = ((features - mean) / var.sqrt().clamp_min(1e-10)).masked_fill(~mask, 0.0)
+
+        return features, feature_lengths.int()
+
+
+def _power_to_db(spectrogram: Tensor, ref_max: bool, amin: float = 1e-10, top_db: float = 80.0) -> Tensor:
+    r"""Batched ``librosa.power_to_db``. ``spectrogram`` is ``(batch, ..., time)``."""
+    dims = tuple(range(1, spectrogram.dim()))
+    log_spec = 10.0 * torch.log10(spectrogram.clamp_min(amin))
+    if ref_max:
+        ref = spectrogram.amax(dim=dims, keepdim=True).clamp_min(amin)
+        log_spec = log_spec - 10.0 * torch.log10(ref)
+    return torch.maximum(log_spec, log_spec.amax(dim=dims, keepdim=True) - top_db)
+
+
+def _mel_filters(sample_rate: int, n_fft: int, n_mels: int) -> Tensor:
+    try:
+        import librosa
+    except ImportError:
+        raise ImportError(LIBROSA_IMPORT_ERROR)
+    return torch.from_numpy(librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=n_mels)).float()
+
+
+class BatchSpectrogramTransform(BatchFeatureTransform):
+    r"""
+    Batched version of :class:`~openspeech.data.audio.spectrogram.SpectrogramFeatureTransform`
+    (log1p of the STFT magnitude with a hamming window, ``center=False``).
+    """
+
+    def __init__(self, configs: DictConfig, cmvn=None) -> None:
+        super(BatchSpectrogramTransform, self).__init__(configs, cmvn=cmvn)
+        self.register_buffer("window", torch.hamming_window(self.n_fft), persistent=False)
+
+    def get_feature_lengths(self, waveform_lengths: Tensor) -> Tensor:
+        return (torch.div(waveform_lengths - self.n_fft, self.hop_length, rounding_mode="floor") + 1).clamp_min(0)
+
+    def _transform(self, waveforms: Tensor) -> Tensor:
+        spectrogram = torch.stft(
+            waveforms,
+            self.n_fft,
+            hop_length=self.hop_length,
+            win_length=self.n_fft,
+            window=self.window,
+            center=False,
+            normalized=False,
+            onesided=True,
+            return_complex=True,
+        )
+        return torch.log1p(spectrogram.abs()).transpose(1, 2)
+
+
+class BatchMelSpectrogramTransform(BatchFeatureTransform):
+    r"""
+    Batched version of :class:`~openspeech.data.audio.melspectrogram.MelSpectrogramFeatureTransform`
+    (power mel spectrogram in decibels relative to the utterance maximum).
+    """
+    NUM_MEL_BANDS = None
+
+    def __init__(self, configs: DictConfig, cmvn=None) -> None:
+        super(BatchMelSpectrogramTransform, self).__init__(configs, cmvn=cmvn)
+        num_mel_bands = self.NUM_MEL_BANDS or self.num_mels
+        self.register_buffer("window", torch.hann_window(self.n_fft), persistent=False)
+        self.register_buffer("mel_filters", _mel_filters(self.sample_rate, self.n_fft, num_mel_bands), persistent=False)
+
+    def _power_mel(self, waveforms: Tensor) -> Tensor:
+        spectrogram = torch.stft(
+            waveforms,
+            self.n_fft,
+            hop_length=self.hop_length,
+            win_length=self.n_fft,
+            window=self.window,
+            center=True,
+            pad_mode="constant",
+            return_complex=True,
+        )
+        return torch.matmul(self.mel_filters, spectrogram.abs().pow(2))
+
+    def _transform(self, waveforms: Tensor) -> Tensor:
+        return _power_to_db(self._power_mel(waveforms), ref_max=True).transpose(1, 2)
+
+
+class BatchMFCCTransform(BatchMelSpectrogramTransform):
+    r"""
+    Batched version of :class:`~openspeech.data.audio.mfcc.MFCCFeatureTransform`
+    (orthonormal DCT-II of a 128 band log mel spectrogram).
+    """
+    NUM_MEL_BANDS = 128
+
+    def __init__(self, configs: DictConfig, cmvn=None) -> None:
+        super(BatchMFCCTransform, self).__init__(configs, cmvn=cmvn)
+        n = torch.arange(self.NUM_MEL_BANDS, dtype=torch.float64)
+        k = torch.arange(self.num_mels, dtype=torch.float64).unsqueeze(1)
+        dct = torch.cos(math.pi / self.NUM_MEL_BANDS * (n + 0.5) * k) * math.sqrt(2.0 / self.NUM_MEL_BANDS)
+        dct[0] /= math.sqrt(2.0)
+        self.register_buffer("dct", dct.float(), persistent=False)
+
+    def _transform(self, waveforms: Tensor) -> Tensor:
+        log_mel = _power_to_db(self._power_mel(waveforms), ref_max=False)
+        return torch.matmul(self.dct, log_mel).transpose(1, 2)
+
+
+class BatchFilterBankTransform(BatchFeatureTransform):
+    r"""
+    Batched version of :class:`~openspeech.data.audio.filter_bank.FilterBankFeatureTransform`
+    (Kaldi compatible log mel filter bank with default options: povey window, pre-emphasis 0.97,
+    DC offset removal, ``snip_edges=True``). Does not require torchaudio.
+    """
+    PREEMPHASIS_COEFFICIENT = 0.97
+    LOW_FREQ = 20.0
+
+    def __init__(self, configs: DictConfig, cmvn=None) -> None:
+        super(BatchFilterBankTransform, self).__init__(configs, cmvn=cmvn)
+        self.window_size = int(self.sample_rate * configs.audio.frame_length * 0.001)
+        self.window_shift = int(self.sample_rate * configs.audio.frame_shift * 0.001)
+        self.padded_window_size = 1 << (self.window_size - 1).bit_length()
+        self.register_buffer("window", torch.hann_window(self.window_size, periodic=False).pow(0.85), persistent=False)
+        self.register_buffer("mel_filters", self._kaldi_mel_filters(), persistent=False)
+
+    def _kaldi_mel_filters(self) -> Tensor:
+        def mel_scale(freq):
+            return 1127.0 * np.log(1.0 + freq / 700.0)
+
+        mel_low_freq = mel_scale(self.LOW_FREQ)
+        mel_high_freq = mel_scale(0.5 * self.sample_rate)
+        mel_freq_delta = (mel_high_freq - mel_low_freq) / (self.num_mels + 1)
+
+        bins = np.arange(self.num_mels)[:, None]
+        left_mel = mel_low_freq + bins * mel_freq_delta
+        center_mel = mel_low_freq + (bins + 1.0) * mel_freq_delta
+        right_mel = mel_low_freq + (bins + 2.0) * mel_freq_delta
+
+        mel = mel_scale(self.sample_rate / self.padded_window_size * np.arange(self.padded_window_size // 2))[None]
+        up_slope = (mel - left_mel) / (center_mel - left_mel)
+        down_slope = (right_mel - mel) / (right_mel - center_mel)
+        filters = np.maximum(0.0, np.minimum(up_slope, down_slope))
+
+        return torch.from_numpy(np.pad(filters, ((0, 0), (0, 1)))).float()
+
+    def get_feature_lengths(self, waveform_lengths: Tensor) -> Tensor:
+        lengths = torch.div(waveform_lengths - self.window_size, self.window_shift, rounding_mode="floor") + 1
+        return lengths.clamp_min(0)
+
+    def _transform(self, waveforms: Tensor) -> Tensor:
+        if waveforms.size(1) < self.window_size:
+            waveforms = nn.functional.pad(waveforms, (0, self.window_size - waveforms.size(1)))
+
+        frames = waveforms.unfold(1, self.window_size, self.window_shift)
+        frames = frames - frames.mean(dim=2, keepdim=True)
+        frames = frames - self.PREEMPHASIS_COEFFICIENT * torch.cat([frames[..., :1], frames[..., :-1]], dim=2)
+        frames = nn.functional.pad(frames * self.window, (0, self.padded_window_size - self.window_size))
+
+        power_spectrum = torch.fft.rfft(frames).abs().pow(2)
+        mel_energies = torch.matmul(power_spectrum, self.mel_filters.t())
+        return mel_energies.clamp_min(torch.finfo(mel_energies.dtype).eps).log()
+
+
+BATCH_FEATURE_TRANSFORMS = {
+    "spectrogram": BatchSpectrogramTransform,
+    "melspectrogram": BatchMelSpectrogramTransform,
+    "mfcc": BatchMFCCTransform,
+    "fbank": BatchFilterBankTransform,
+}
+
+
+def build_batch_feature_transform(configs: DictConfig, cmvn=None) -> BatchFeatureTransform:
+    r"""
+    Returns the batched counterpart of the audio feature transform selected by ``configs.audio.name``.
+    Features are normalized with the global statistics of ``cmvn`` if given (speaker statistics are not used).
+    """
+    if configs.audio.name not in BATCH_FEATURE_TRANSFORMS:
+        raise ValueError(f"Unsupported batched audio feature transform: {configs.audio.name}")
+    return BATCH_FEATURE_TRANSFORMS[configs.audio.name](configs, cmvn=cmvn)
@@ -0,0 +1,173 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from typing import Optional
+
+from omegaconf import DictConfig
+
+from openspeech.data.audio.archive import ArchiveReader
+from openspeech.data.audio.cmvn import get_cmvn_path, load_or_compute_cmvn
+from openspeech.data.audio.dataset import SpeechToTextDataset
+from openspeech.data.audio.index import filter_by_duration, load_audio_lengths, load_non_silence_indices
+from openspeech.data.audio.tar_dataset import SpeechToTextTarDataset, load_or_write_tar_shards
+
+TAR_SHARD_UNSUPPORTED_AUGMENTS = (
+    "apply_noise_augment",
+    "apply_time_stretch_augment",
+    "apply_joining_augment",
+    "apply_speed_perturb_augment",
+)
+
+
+def _check_tar_shard_configs(configs: DictConfig) -> None:
+    r"""Raises a ValueError rather than silently training another recipe from tar shards"""
+    unsupported = [augment for augment in TAR_SHARD_UNSUPPORTED_AUGMENTS if configs.audio.get(augment, False)]
+    if configs.audio.normalization == "speaker":
+        unsupported.append("speaker normalization")
+
+    if unsupported:
+        raise ValueError(
+            f"Tar shards (audio.train_shard_dir) do not support {', '.join(unsupported)}. "
+            "Disable them or train from the manifest without tar shards."
+        )
+
+
+def build_speech_to_text_datasets(
+    configs: DictConfig,
+    audio_paths: dict,
+    transcripts: dict,
+    dataset_paths: dict,
+    manifest_audio_lengths: Optional[dict] = None,
+    audio_reader: Optional[ArchiveReader] = None,
+) -> dict:
+    r"""
+    Builds the datasets of the splits of a manifest. Every data module splits its manifest its own way and passes
+    the splits here, keyed by stage (`train`, `valid`, `test`), with `train` first.
+
+    Audio lengths are taken from the (binary) manifest or the length index of the split. The train split is
+    filtered by duration (after silence trimming with ``configs.audio.del_silence``), provides the CMVN
+    statistics of every split and is augmented. It is streamed from tar shards if ``configs.audio.train_shard_dir``
+    is set, which supports spec augment (both augment policies) and silence trimming only.
+
+    Args:
+        configs (DictConfig): configuraion set
+        audio_paths (dict): stage -> audio paths of the split
+        transcripts (dict): stage -> transcripts of the split
+        dataset_paths (dict): stage -> dataset path the audio paths of the split are relative to
+        manifest_audio_lengths (dict, optional): stage -> audio lengths of the split read from a binary manifest
+        audio_reader (ArchiveReader, optional): reads the audio from archives instead of the dataset path
+
+    Returns:
+        datasets (dict): stage -> dataset
+
+    Raises:
+        ValueError: if tar shards are combined with a feature the tar dataset does not support
+    """
+    if configs.audio.train_shard_dir is not None:
+        _check_tar_shard_configs(configs)
+
+    datasets = dict()
+    manifest_file_path = configs.dataset.manifest_file_path
+
+    cmvn = None
+    for stage in audio_paths.keys():
+        dataset_path = dataset_paths[stage]
+
+        if manifest_audio_lengths is not None:
+            audio_lengths = manifest_audio_lengths[stage]
+        else:
+            audio_lengths = load_audio_lengths(
+                dataset_path=dataset_path,
+                audio_paths=audio_paths[stage],
+                sample_rate=configs.audio.sample_rate,
+                index_path=f"{manifest_file_path}.{stage}.lengths.npz",
+                audio_reader=audio_reader,
+            )
+        non_silence_indices = None
+        if stage == "train" and configs.audio.del_silence:
+            non_silence_indices = load_non_silence_indices(
+                dataset_path=dataset_path,
+                audio_paths=audio_paths[stage],
+                sample_rate=configs.audio.sample_rate,
+                index_path=f"{manifest_file_path}.{stage}.silence.npz",
+                audio_reader=audio_reader,
+            )
+
+        if stage == "train":
+            audio_paths[stage], transcripts[stage], audio_lengths, non_silence_indices = filter_by_duration(
+                audio_paths[stage],
+                transcripts[stage],
+                audio_lengths,
+                sample_rate=configs.audio.sample_rate,
+                min_duration=configs.audio.min_duration,
+                max_duration=configs.audio.max_duration,
+                non_silence_indices=non_silence_indices,
+            )
+
+        if stage == "train" and configs.audio.normalization != "utterance":
+            cmvn = load_or_compute_cmvn(
+                configs,
+                dataset_path=dataset_path,
+                audio_paths=audio_paths[stage],
+                cmvn_path=get_cmvn_path(configs),
+                audio_reader=audio_reader,
+            )
+
+        if stage == "train" and configs.audio.train_shard_dir is not None:
+            shard_paths, shard_sizes = load_or_write_tar_shards(
+                dataset_path=dataset_path,
+                audio_paths=audio_paths[stage],
+                transcripts=transcripts[stage],
+                shard_dir=configs.audio.train_shard_dir,
+                seed=configs.trainer.seed,
+                audio_reader=audio_reader,
+                non_silence_indices=non_silence_indices,
+            )
+            datasets[stage] = SpeechToTextTarDataset(
+                configs=configs,
+                shard_paths=shard_paths,
+                shard_sizes=shard_sizes,
+                del_silence=configs.audio.del_silence,
+                apply_spec_augment=configs.audio.apply_spec_augment,
+                seed=configs.trainer.seed,
+                cmvn=cmvn,
+            )
+            continue
+
+        datasets[stage] = SpeechToTextDataset(
+            configs=configs,
+            dataset_path=dataset_path,
+            audio_paths=audio_paths[stage],
+            transcripts=transcripts[stage],
+            apply_spec_augment=configs.audio.apply_spec_augment if stage == "train" else False,
+            apply_noise_augment=configs.audio.apply_noise_augment if stage == "train" else False,
+            apply_time_stretch_augment=configs.audio.apply_time_stretch_augment if stage == "train" else False,
+            apply_joining_augment=configs.audio.apply_joining_augment if stage == "train" else False,
+            apply_speed_perturb_augment=configs.audio.apply_speed_perturb_augment if stage == "train" else False,
+            del_silence=configs.audio.del_silence if stage == "train" else False,
+            audio_lengths=audio_lengths,
+            non_silence_indices=non_silence_indices,
+            cmvn=cmvn,
+            audio_reader=audio_reader,
+        )
+
+    return datasets
@@ -0,0 +1,262 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional
+
+import numpy as np
+import torch
+from omegaconf import DictConfig
+from torch import Tensor
+
+from openspeech.data.audio.archive import ArchiveReader
+from openspeech.data.audio.load import load_audio
+
+logger = logging.getLogger(__name__)
+
+NORMALIZATIONS = ("utterance", "global", "speaker")
+
+
+def get_speaker(audio_path: str) -> str:
+    r"""Speaker (or session) key of an audio path relative to the dataset: its directory."""
+    return os.path.dirname(audio_path)
+
+
+class CMVN(object):
+    r"""
+    Cepstral mean and variance normalization with statistics accumulated over a training set.
+    Normalization is one fused multiply-add per element, ``feature * scale + bias`` with
+    ``scale = 1 / std`` and ``bias = -mean / std`` computed once.
+
+    Args:
+        mean (np.ndarray): global mean of each feature dimension
+        std (np.ndarray): global standard deviation of each feature dimension
+        speaker_stats (dict, optional): speaker -> (mean, std). Unknown speakers use the global statistics.
+    """
+
+    def __init__(self, mean: np.ndarray, std: np.ndarray, speaker_stats: Optional[dict] = None) -> None:
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+        self.speaker_stats = speaker_stats or dict()
+        self._scale, self._bias = self._affine(self.mean, self.std)
+        self._speaker_affines = {
+            speaker: self._affine(mean, std) for speaker, (mean, std) in self.speaker_stats.items()
+        }
+
+    @staticmethod
+    def _affine(mean: np.ndarray, std: np.ndarray):
+        scale = (1.0 / np.maximum(np.asarray(std, dtype=np.float32), 1e-10)).astype(np.float32)
+        return scale, (-np.asarray(mean, dtype=np.float32) * scale).astype(np.float32)
+
+    @staticmethod
+    def _stats(count: float, total: np.ndarray, total_square: np.ndarray):
+        mean = total / max(count, 1)
+        var = np.maximum(total_square / max(count, 1) - mean**2, 0.0)
+        return mean.astype(np.float32), np.sqrt(var).astype(np.float32)
+
+    @classmethod
+    def from_accumulators(cls, accumulators: dict, per_speaker: bool = False) -> "CMVN":
+        r"""
+        Creates statistics from accumulators ``speaker -> (count, sum, sum of squares)`` in float64.
+        """
+        count = sum(accumulator[0] for accumulator in accumulators.values())
+        total = sum(accumulator[1] for accumulator in accumulators.values())
+        total_square = sum(accumulator[2] for accumulator in accumulators.values())
+        mean, std = cls._stats(count, total, total_square)
+
+        speaker_stats = None
+        if per_speaker:
+            speaker_stats = {speaker: cls._stats(*accumulator) for speaker, accumulator in accumulators.items()}
+
+        return cls(mean, std, speaker_stats)
+
+    def normalize(self, feature: np.ndarray, speaker: Optional[str] = None) -> np.ndarray:
+        r"""Normalizes a feature of shape ``(seq_length, num_features)`` in place"""
+        scale, bias = self._speaker_affines.get(speaker, (self._scale, self._bias))
+        feature *= scale
+        feature += bias
+        return feature
+
+    def normalize_tensor(self, features: Tensor) -> Tensor:
+        r"""Normalizes features ``(..., num_features)`` with the global statistics"""
+        scale = torch.as_tensor(self._scale, device=features.device, dtype=features.dtype)
+        bias = torch.as_tensor(self._bias, device=features.device, dtype=features.dtype)
+        return torch.addcmul(bias, features, scale)
+
+    def state_dict(self) -> dict:
+        speakers = sorted(self.speaker_stats)
+        return {
+            "mean": self.mean,
+            "std": self.std,
+            "speakers": np.array(speakers, dtype=str),
+            "speaker_mean": np.array([self.speaker_stats[speaker][0] for speaker in speakers], dtype=np.float32),
+            "speaker_std": np.array([self.speaker_stats[speaker][1] for speaker in speakers], dtype=np.float32),
+        }
+
+    @classmethod
+    def from_state_dict(cls, state_dict: dict) -> "CMVN":
+        speaker_stats = {
+            str(speaker): (mean, std)
+            for speaker, mean, std in zip(state_dict["speakers"], state_dict["speaker_mean"], state_dict["speaker_std"])
+        }
+        return cls(state_dict["mean"], state_dict["std"], speaker_stats)
+
+    def save(self, path: str, fingerprint: str = "") -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, fingerprint=np.array(fingerprint), **self.state_dict())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CMVN":
+        with np.load(path) as stats:
+            return cls.from_state_dict(dict(stats))
+
+
+def get_cmvn_path(configs: DictConfig) -> Optional[str]:
+    r"""Path of the CMVN statistics: ``configs.audio.cmvn_path``, or next to the training manifest."""
+    if configs.audio.get("cmvn_path", None) is not None:
+        return configs.audio.cmvn_path
+    if hasattr(configs, "dataset") and configs.dataset.get("manifest_file_path", None) is not None:
+        return f"{configs.dataset.manifest_file_path}.cmvn.npz"
+    return None
+
+
+def _accumulate(
+    audio_paths: list,
+    configs: DictConfig,
+    dataset_path: str,
+    del_silence: bool,
+    audio_reader: Optional[ArchiveReader] = None,
+) -> dict:
+    from openspeech.data import AUDIO_FEATURE_TRANSFORM_REGISTRY
+
+    transforms = AUDIO_FEATURE_TRANSFORM_REGISTRY[configs.audio.name](configs)
+    load_fn = audio_reader.load_audio if audio_reader is not None else load_audio
+    accumulators = dict()
+
+    for audio_path in audio_paths:
+        signal = load_fn(os.path.join(dataset_path, audio_path), configs.audio.sample_rate, del_silence)
+        if signal is None:
+            continue
+
+        feature = transforms(signal).transpose().astype(np.float64)
+        speaker = get_speaker(audio_path)
+        count, total, total_square = accumulators.get(speaker, (0, 0.0, 0.0))
+        accumulators[speaker] = (
+            count + feature.shape[0],
+            total + feature.sum(axis=0),
+            total_square + np.square(feature).sum(axis=0),
+        )
+
+    return accumulators
+
+
+def compute_cmvn(
+    configs: DictConfig,
+    dataset_path: str,
+    audio_paths: list,
+    per_speaker: bool = False,
+    num_workers: Optional[int] = None,
+    chunk_size: int = 256,
+    audio_reader: Optional[ArchiveReader] = None,
+) -> CMVN:
+    r"""
+    Accumulates feature statistics over ``audio_paths`` with parallel worker processes. Every worker streams
+    its chunk of files and returns per-speaker sums, which are then reduced.
+
+    Args:
+        configs (DictConfig): configuration set (``configs.audio`` selects the feature transform)
+        dataset_path (str): path of dataset
+        audio_paths (list): list of audio path, relative to ``dataset_path``
+        per_speaker (bool): keep per-speaker statistics too
+        num_workers (int, optional): the number of worker processes (default: the number of CPUs)
+        chunk_size (int): the number of files per task
+        audio_reader (ArchiveReader, optional): reads the audio from archives instead of files
+
+    Returns:
+        cmvn (CMVN): statistics
+    """
+    audio_paths = list(audio_paths)
+    chunks = [audio_paths[start : start + chunk_size] for start in range(0, len(audio_paths), chunk_size)]
+    function = partial(
+        _accumulate,
+        configs=configs,
+        dataset_path=dataset_path,
+        del_silence=configs.audio.del_silence,
+        audio_reader=audio_reader,
+    )
+
+    accumulators = dict()
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        for partial_accumulators in executor.map(function, chunks):
+            for speaker, (count, total, total_square) in partial_accumulators.items():
+                accumulator = accumulators.get(speaker, (0, 0.0, 0.0))
+                accumulators[speaker] = (accumulator[0] + count, accumulator[1] + total, accumulator[2] + total_square)
+
+    return CMVN.from_accumulators(accumulators, per_speaker=per_speaker)
+
+
+def load_or_compute_cmvn(
+    configs: DictConfig,
+    dataset_path: str,
+    audio_paths: list,
+    cmvn_path: str,
+    num_workers: Optional[int] = None,
+    audio_reader: Optional[ArchiveReader] = None,
+) -> CMVN:
+    r"""
+    Returns the CMVN statistics of ``audio_paths`` saved at ``cmvn_path``, computing and saving them first if they
+    are missing or were computed for other files or feature settings.
+    """
+    sha1 = hashlib.sha1(
+        "|".join(
+            str(configs.audio[attribute])
+            for attribute in ("name", "sample_rate", "frame_length", "frame_shift", "num_mels", "del_silence")
+        ).encode("utf-8")
+    )
+    sha1.update(configs.audio.normalization.encode("utf-8"))
+    for audio_path in audio_paths:
+        sha1.update(b"\0")
+        sha1.update(audio_path.encode("utf-8"))
+    fingerprint = sha1.hexdigest()
+
+    if os.path.exists(cmvn_path):
+        with np.load(cmvn_path) as stats:
+            if str(stats["fingerprint"]) == fingerprint:
+                return CMVN.from_state_dict(dict(stats))
+        logger.info(f"{cmvn_path} is out of date. Recompute CMVN statistics..")
+
+    cmvn = compute_cmvn(
+        configs,
+        dataset_path,
+        audio_paths,
+        per_speaker=configs.audio.normalization == "speaker",
+        num_workers=num_workers,
+        audio_reader=audio_reader,
+    )
+    cmvn.save(cmvn_path, fingerprint=fingerprint)
+    return cmvn
@@ -26,6 +26,8 @@ import numpy as np
 import torch
 from torch.utils.data import DataLoader, Sampler
 
+from openspeech.data.manifest import load_manifest
+
 
 def _collate_fn(batch, pad_id: int = 0):
     r"""
@@ -75,7 +77,7 @@ def _collate_fn(batch, pad_id: int = 0):
         seq_length = tensor.size(0)
 
         seqs[x].narrow(0, 0, seq_length).copy_(tensor)
-        targets[x].narrow(0, 0, len(target)).copy_(torch.LongTensor(target))
+        targets[x].narrow(0, 0, len(target)).copy_(torch.as_tensor(target, dtype=torch.long))
 
     seq_lengths = torch.IntTensor(seq_lengths)
     target_lengths = torch.IntTensor(target_lengths)
@@ -83,9 +85,70 @@ def _collate_fn(batch, pad_id: int = 0):
     return seqs, targets, seq_lengths, target_lengths
 
 
+def _collate_waveform_fn(batch, pad_id: int = 0):
+    r"""
+    Functions that pad waveforms and targets to the maximum length. Used when features are extracted from
+    the waveform batch (``audio.feature_extraction`` is `collate` or `model`).
+
+    Args:
+        batch (tuple): tuple contains waveform, target and spec augment flag
+        pad_id (int): identification of pad token
+
+    Returns:
+        waveforms (torch.FloatTensor): tensor contains zero padded waveforms.
+        target (torch.IntTensor): tensor contains target sequences.
+        waveform_lengths (torch.IntTensor): tensor contains waveform lengths
+        target_lengths (torch.IntTensor): tensor contains target sequence lengths
+        spec_augment (torch.BoolTensor): flag of utterances to apply spec augment
+    """
+    # sort by sequence length for rnn.pack_padded_sequence()
+    batch = sorted(batch, key=lambda sample: sample[0].size(0), reverse=True)
+
+    waveform_lengths = torch.IntTensor([len(s[0]) for s in batch])
+    target_lengths = torch.IntTensor([len(s[1]) - 1 for s in batch])
+
+    waveforms = torch.zeros(len(batch), int(waveform_lengths.max()))
+    targets = torch.full((len(batch), max(len(s[1]) for s in batch)), pad_id, dtype=torch.long)
+
+    for x, (waveform, target, _) in enumerate(batch):
+        waveforms[x].narrow(0, 0, waveform.size(0)).copy_(waveform)
+        targets[x].narrow(0, 0, len(target)).copy_(torch.as_tensor(target, dtype=torch.long))
+
+    spec_augment = torch.BoolTensor([s[2] for s in batch])
+
+    return waveforms, targets, waveform_lengths, target_lengths, spec_augment
+
+
+class FeatureCollator(object):
+    r"""
+    Collate function that pads waveforms and extracts features of the whole batch at once.
+
+    Args:
+        transform (torch.nn.Module): batched feature transform
+        spec_augment (BatchSpecAugment, optional): spec augment applied to flagged utterances
+
+    Returns: same as ``_collate_fn``
+    """
+
+    def __init__(self, transform, spec_augment=None) -> None:
+        self.transform = transform
+        self.spec_augment = spec_augment
+
+    def __call__(self, batch):
+        waveforms, targets, waveform_lengths, target_lengths, spec_augment = _collate_waveform_fn(batch)
+
+        with torch.no_grad():
+            seqs, seq_lengths = self.transform(waveforms, waveform_lengths)
+
+        if self.spec_augment is not None and spec_augment.any():
+            seqs = self.spec_augment(seqs, seq_lengths, spec_augment)
+
+        return seqs, targets, seq_lengths, target_lengths
+
+
 class AudioDataLoader(DataLoader):
     r"""
-    Audio Data Loader
+    Audio Data Loader. Uses the ``collate_fn`` of the dataset if it provides one.
 
     Args:
         dataset (torch.utils.data.Dataset): dataset from which to load the data.
@@ -106,7 +169,7 @@ class AudioDataLoader(DataLoader):
             batch_sampler=batch_sampler,
             **kwargs,
         )
-        self.collate_fn = _collate_fn
+        self.collate_fn = getattr(dataset, "collate_fn", _collate_fn)
 
 
 def load_dataset(manifest_file_path: str) -> Tuple[list, list]:
@@ -114,20 +177,10 @@ def load_dataset(manifest_file_path: str) -> Tuple[list, list]:
     Provides dictionary of filename and labels.
 
     Args:
-        manifest_file_path (str): evaluation manifest file path.
+        manifest_file_path (str): evaluation manifest file path. A fresh binary manifest next to it is preferred.
 
     Returns: target_dict
         * target_dict (dict): dictionary of filename and labels
     """
-    audio_paths = list()
-    transcripts = list()
-
-    with open(manifest_file_path) as f:
-        for idx, line in enumerate(f.readlines()):
-            audio_path, korean_transcript, transcript = line.split("\t")
-            transcript = transcript.replace("\n", "")
-
-            audio_paths.append(audio_path)
-            transcripts.append(transcript)
-
+    audio_paths, transcripts, _ = load_manifest(manifest_file_path)
     return audio_paths, transcripts
@@ -20,9 +20,11 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import ast
 import logging
 import os
 import random
+from typing import Optional
 
 import numpy as np
 import torch
@@ -31,8 +33,22 @@ from torch import Tensor
 from torch.utils.data import Dataset
 
 from openspeech.data import AUDIO_FEATURE_TRANSFORM_REGISTRY
-from openspeech.data.audio.augment import JoiningAugment, NoiseInjector, SpecAugment, TimeStretchAugment
-from openspeech.data.audio.load import load_audio
+from openspeech.data.audio.archive import ArchiveReader
+from openspeech.data.audio.augment import (
+    BatchSpecAugment,
+    JoiningAugment,
+    NoiseInjector,
+    SpecAugment,
+    SpeedPerturbAugment,
+    TimeStretchAugment,
+)
+from openspeech.data.audio.batch_feature_transform import build_batch_feature_transform
+from openspeech.data.audio.cmvn import CMVN, NORMALIZATIONS, get_cmvn_path, get_speaker
+from openspeech.data.audio.data_loader import FeatureCollator, _collate_waveform_fn
+from openspeech.data.audio.feature_cache import FeatureCache
+from openspeech.data.audio.index import non_silence_lengths
+from openspeech.data.audio.load import get_audio_length, load_audio
+from openspeech.data.packed import PackedSequences, PackedStrings
 
 logger = logging.getLogger(__name__)
 
@@ -46,8 +62,8 @@ class SpeechToTextDataset(Dataset):
 
     Args:
         dataset_path (str): path of librispeech dataset
-        audio_paths (list): list of audio path
-        transcripts (list): list of transript
+        audio_paths (list): list of audio path (or ``PackedStrings``)
+        transcripts (list): list of transript, token ids separated by a space (or ``PackedSequences``)
         sos_id (int): identification of <startofsentence>
         eos_id (int): identification of <endofsentence>
         del_silence (bool): flag indication whether to apply delete silence or not
@@ -55,12 +71,23 @@ class SpeechToTextDataset(Dataset):
         apply_noise_augment (bool): flag indication whether to apply noise augment or not
         apply_time_stretch_augment (bool): flag indication whether to apply time stretch augment or not
         apply_joining_augment (bool): flag indication whether to apply audio joining augment or not
+        apply_speed_perturb_augment (bool): flag indication whether to apply speed perturbation augment or not
+        audio_lengths (list, optional): length of each audio file (number of samples), aligned with ``audio_paths``
+        non_silence_indices (PackedSequences, optional): precomputed non-silent intervals of each audio file
+            (see ``load_non_silence_indices``). With ``del_silence``, silence is removed by slicing them.
+        cmvn (CMVN, optional): statistics for ``configs.audio.normalization`` `global` / `speaker`.
+            Loaded from ``configs.audio.cmvn_path`` if not given.
+        audio_reader (ArchiveReader, optional): reads the audio members of indexed tar archives instead of files
+
+    If ``configs.audio.feature_extraction`` is not `dataset`, items are ``(waveform, transcript, spec_augment)``
+    and features are extracted from the padded waveform batch (see ``collate_fn``).
     """
     NONE_AUGMENT = 0
     SPEC_AUGMENT = 1
     NOISE_AUGMENT = 2
     TIME_STRETCH = 3
     AUDIO_JOINING = 4
+    SPEED_PERTURB = 5
 
     def __init__(
         self,
@@ -75,24 +102,70 @@ class SpeechToTextDataset(Dataset):
         apply_noise_augment: bool = False,
         apply_time_stretch_augment: bool = False,
         apply_joining_augment: bool = False,
+        apply_speed_perturb_augment: bool = False,
+        audio_lengths: Optional[list] = None,
+        non_silence_indices: Optional[PackedSequences] = None,
+        cmvn: Optional[CMVN] = None,
+        audio_reader: Optional[ArchiveReader] = None,
     ) -> None:
         super(SpeechToTextDataset, self).__init__()
         self.dataset_path = dataset_path
-        self.audio_paths = list(audio_paths)
-        self.transcripts = list(transcripts)
-        self.augments = [self.NONE_AUGMENT] * len(self.audio_paths)
+        self.audio_paths = PackedStrings.from_list(audio_paths)
+        self.transcripts = PackedSequences.from_transcripts(transcripts)
+        self.audio_lengths = np.asarray(audio_lengths, dtype=np.int64) if audio_lengths is not None else None
+        self.non_silence_indices = non_silence_indices if del_silence else None
+        if self.non_silence_indices is not None:
+            if len(self.non_silence_indices) != len(self.audio_paths):
+                raise ValueError("`non_silence_indices` should be aligned with `audio_paths`.")
+            self.audio_lengths = non_silence_lengths(self.non_silence_indices)
         self.dataset_size = len(self.audio_paths)
+        # utterance index and augment identification of each item, one array per copy of the dataset
+        self._item_indices = [np.arange(self.dataset_size)]
+        self._item_augments = [np.full(self.dataset_size, self.NONE_AUGMENT, dtype=np.int8)]
         self.sos_id = sos_id
         self.eos_id = eos_id
         self.sample_rate = configs.audio.sample_rate
         self.num_mels = configs.audio.num_mels
+        self.hop_length = int(round(configs.audio.sample_rate * 0.001 * configs.audio.frame_shift))
         self.del_silence = del_silence
         self.apply_spec_augment = apply_spec_augment
         self.apply_noise_augment = apply_noise_augment
         self.apply_time_stretch_augment = apply_time_stretch_augment
         self.apply_joining_augment = apply_joining_augment
+        self.apply_speed_perturb_augment = apply_speed_perturb_augment
         self.transforms = AUDIO_FEATURE_TRANSFORM_REGISTRY[configs.audio.name](configs)
-        self._load_audio = load_audio
+        self.audio_reader = audio_reader
+        self._load_audio = audio_reader.load_audio if audio_reader is not None else load_audio
+        self._get_audio_length = audio_reader.get_audio_length if audio_reader is not None else get_audio_length
+        self._feature_cache = None
+        self.feature_extraction = configs.audio.feature_extraction
+        self.normalization = configs.audio.normalization
+        self.cmvn = None
+
+        if self.normalization not in NORMALIZATIONS:
+            raise ValueError(f"Unsupported normalization: {self.normalization}")
+        if self.normalization != "utterance":
+            cmvn_path = get_cmvn_path(configs)
+            if cmvn is None and (cmvn_path is None or not os.path.exists(cmvn_path)):
+                raise ValueError(f"{self.normalization} normalization requires CMVN statistics.")
+            self.cmvn = cmvn if cmvn is not None else CMVN.load(cmvn_path)
+
+        if configs.audio.feature_cache_dir is not None:
+            self._feature_cache = FeatureCache(
+                cache_dir=configs.audio.feature_cache_dir,
+                configs=configs,
+                num_shards=configs.audio.feature_cache_num_shards,
+                dtype=configs.audio.feature_cache_dtype,
+            )
+
+        # evaluation configs have no augment group, their datasets are not augmented
+        augment_configs = configs.get("augment")
+        self.augment_policy = augment_configs.augment_policy if augment_configs is not None else "duplicate"
+        if self.augment_policy not in ("duplicate", "online"):
+            raise ValueError(f"Unsupported augment policy: {self.augment_policy}")
+
+        # augment identification -> probability of applying it to an item (online policy)
+        self.augment_probs = dict()
 
         if self.apply_spec_augment:
             self._spec_augment = SpecAugment(
@@ -100,106 +173,255 @@ class SpeechToTextDataset(Dataset):
                 freq_mask_num=configs.augment.freq_mask_num,
                 time_mask_num=configs.augment.time_mask_num,
             )
-            for idx in range(self.dataset_size):
-                self.audio_paths.append(self.audio_paths[idx])
-                self.transcripts.append(self.transcripts[idx])
-                self.augments.append(self.SPEC_AUGMENT)
+            self._add_augment(self.SPEC_AUGMENT, configs.augment.spec_augment_prob)
 
         if self.apply_noise_augment:
-            if eval(configs.augment.noise_dataset_dir) is None:
+            if configs.augment.noise_dataset_dir in (None, "None"):
                 raise ValueError("`noise_dataset_dir` should be contain audio files.")
 
             self._noise_injector = NoiseInjector(
                 noise_dataset_dir=configs.augment.noise_dataset_dir,
-                sample_rate=configs.augment.noise_sample_rate,
+                sample_rate=configs.audio.sample_rate,
                 noise_level=configs.augment.noise_level,
+                noise_bank_path=None
+                if configs.augment.noise_bank_path in (None, "None")
+                else configs.augment.noise_bank_path,
+                noise_bank_dtype=configs.augment.noise_bank_dtype,
+                min_snr=configs.augment.noise_min_snr,
+                max_snr=configs.augment.noise_max_snr,
             )
-            for idx in range(self.dataset_size):
-                self.audio_paths.append(self.audio_paths[idx])
-                self.transcripts.append(self.transcripts[idx])
-                self.augments.append(self.NONE_AUGMENT)
+            self._add_augment(self.NOISE_AUGMENT, configs.augment.noise_augment_prob)
 
         if self.apply_time_stretch_augment:
             self._time_stretch_augment = TimeStretchAugment(
-                min_rate=configs.time_stretch_min_rate,
-                max_rate=configs.time_stretch_max_rate,
+                min_rate=configs.augment.time_stretch_min_rate,
+                max_rate=configs.augment.time_stretch_max_rate,
             )
-            for idx in range(self.dataset_size):
-                self.audio_paths.append(self.audio_paths[idx])
-                self.transcripts.append(self.transcripts[idx])
-                self.augments.append(self.TIME_STRETCH)
+            self._add_augment(self.TIME_STRETCH, configs.augment.time_stretch_augment_prob)
 
         if self.apply_joining_augment:
             self._joining_augment = JoiningAugment()
-            for idx in range(self.dataset_size):
-                self.audio_paths.append(self.audio_paths[idx])
-                self.transcripts.append(self.transcripts[idx])
-                self.augments.append(self.AUDIO_JOINING)
+            self._add_augment(self.AUDIO_JOINING, configs.augment.joining_augment_prob)
+
+        self.cache_speed_perturb = False
+        if self.apply_speed_perturb_augment:
+            rates = configs.augment.speed_perturb_rates
+            if isinstance(rates, str):
+                rates = ast.literal_eval(rates)
+            self._speed_perturb_augment = SpeedPerturbAugment(rates=tuple(float(rate) for rate in rates))
+            self.cache_speed_perturb = configs.augment.cache_speed_perturb
+            self._add_augment(self.SPEED_PERTURB, configs.augment.speed_perturb_augment_prob)
+
+        if self.feature_extraction == "collate":
+            self.collate_fn = FeatureCollator(
+                transform=build_batch_feature_transform(configs, cmvn=self.cmvn),
+                spec_augment=BatchSpecAugment(
+                    freq_mask_para=configs.augment.freq_mask_para,
+                    freq_mask_num=configs.augment.freq_mask_num,
+                    time_mask_num=configs.augment.time_mask_num,
+                    time_mask_ratio=configs.augment.time_mask_ratio,
+                )
+                if self.apply_spec_augment
+                else None,
+            )
+        elif self.feature_extraction == "model":
+            self.collate_fn = _collate_waveform_fn
+        elif self.feature_extraction != "dataset":
+            raise ValueError(f"Unsupported feature extraction: {self.feature_extraction}")
+
+        order = np.random.permutation(sum(len(indices) for indices in self._item_indices))
+        indices = np.concatenate(self._item_indices)[order]
+        self.augments = np.concatenate(self._item_augments)[order]
+        del self._item_indices, self._item_augments
+
+        self.audio_paths = self.audio_paths.take(indices)
+        self.transcripts = self.transcripts.take(indices)
+        if self.audio_lengths is not None:
+            self.audio_lengths = self.audio_lengths[indices]
+        if self.non_silence_indices is not None:
+            self.non_silence_indices = self.non_silence_indices.take(indices)
 
         self.total_size = len(self.audio_paths)
 
-        tmp = list(zip(self.audio_paths, self.transcripts, self.augments))
-        random.shuffle(tmp)
+    def _add_augment(self, augment: int, prob: float) -> None:
+        """
+        Registers an augmentation. With the `duplicate` policy, every utterance is appended once more with the
+        augmentation. With the `online` policy, the augmentation is sampled per item with probability ``prob``.
+        """
+        if self.augment_policy == "online":
+            self.augment_probs[augment] = prob
+            return
 
-        for i, x in enumerate(tmp):
-            self.audio_paths[i] = x[0]
-            self.transcripts[i] = x[1]
-            self.augments[i] = x[2]
+        self._item_indices.append(np.arange(self.dataset_size))
+        self._item_augments.append(np.full(self.dataset_size, augment, dtype=np.int8))
 
-    def _parse_audio(self, audio_path: str, augment: int = None, joining_idx: int = 0) -> Tensor:
-        """
-        Parses audio.
+    def _sample_augments(self, idx: int) -> frozenset:
+        """Returns the augmentations to apply to an item"""
+        if self.augment_policy == "duplicate":
+            return frozenset((int(self.augments[idx]),))
+        return frozenset(augment for augment, prob in self.augment_probs.items() if random.random() < prob)
 
-        Args:
-            audio_path (str): path of audio file
-            augment (int): augmentation identification
+    def _parse_signal(
+        self,
+        audio_path: str,
+        augments: frozenset = frozenset(),
+        joining_idx: int = 0,
+        speed_rate: Optional[float] = None,
+        non_silence_indices: Optional[np.ndarray] = None,
+    ):
+        """
+        Loads audio and applies waveform augmentation. ``speed_rate`` fixes the rate of speed perturbation.
+        ``non_silence_indices`` are the precomputed non-silent intervals of the audio, if any.
 
         Returns:
-            feature (np.ndarray): feature extract by sub-class
+            signal (np.ndarray): audio signal, None if audio is not valid
         """
-        signal = self._load_audio(audio_path, sample_rate=self.sample_rate, del_silence=self.del_silence)
+        signal = self._load_audio(
+            audio_path,
+            sample_rate=self.sample_rate,
+            del_silence=self.del_silence,
+            non_silence_indices=non_silence_indices,
+        )
 
         if signal is None:
             logger.warning(f"{audio_path} is not Valid!!")
-            return torch.zeros(1000, self.num_mels)
+            return None
 
-        if augment == self.AUDIO_JOINING:
-            joining_signal = self._load_audio(self.audio_paths[joining_idx], sample_rate=self.sample_rate)
-            signal = self._joining_augment((signal, joining_signal))
+        if self.AUDIO_JOINING in augments:
+            joining_path = os.path.join(self.dataset_path, self.audio_paths[joining_idx])
+            joining_signal = self._load_audio(joining_path, sample_rate=self.sample_rate)
+            if joining_signal is not None:
+                signal = self._joining_augment((signal, joining_signal))
 
-        if augment == self.TIME_STRETCH:
+        if self.SPEED_PERTURB in augments:
+            signal = self._speed_perturb_augment(signal, rate=speed_rate)
+
+        if self.TIME_STRETCH in augments:
             signal = self._time_stretch_augment(signal)
 
-        if augment == self.NOISE_AUGMENT:
+        if self.NOISE_AUGMENT in augments:
             signal = self._noise_injector(signal)
 
-        feature = self.transforms(signal)
+        return signal
 
-        feature -= feature.mean()
-        feature /= np.std(feature)
+    def _extract_feature(
+        self,
+        audio_path: str,
+        augments: frozenset = frozenset(),
+        joining_idx: int = 0,
+        speed_rate: Optional[float] = None,
+        non_silence_indices: Optional[np.ndarray] = None,
+    ):
+        """
+        Loads audio and extracts a feature with the registered audio feature transform.
+
+        Returns:
+            feature (np.ndarray): feature of shape ``(seq_length, num_features)``, None if audio is not valid
+        """
+        signal = self._parse_signal(audio_path, augments, joining_idx, speed_rate, non_silence_indices)
 
-        feature = torch.FloatTensor(feature).transpose(0, 1)
+        if signal is None:
+            return None
+
+        return self.transforms(signal).transpose()
 
-        if augment == self.SPEC_AUGMENT:
+    def _parse_audio(
+        self,
+        audio_path: str,
+        augments: frozenset = frozenset(),
+        joining_idx: int = 0,
+        non_silence_indices: Optional[np.ndarray] = None,
+    ) -> Tensor:
+        """
+        Parses audio.
+
+        Args:
+            audio_path (str): path of audio file
+            augments (frozenset): augmentation identifications to apply
+            non_silence_indices (np.ndarray, optional): precomputed non-silent intervals of the audio
+
+        Returns:
+            feature (np.ndarray): feature extract by sub-class
+        """
+        if self._feature_cache is not None and augments <= {self.NONE_AUGMENT, self.SPEC_AUGMENT}:
+            # SpecAugment is applied on top of the cached feature, so both share one cache entry.
+            feature = self._feature_cache.get_or_compute(
+                audio_path, lambda: self._extract_feature(audio_path, non_silence_indices=non_silence_indices)
+            )
+        elif (
+            self._feature_cache is not None
+            and self.cache_speed_perturb
+            and augments <= {self.NONE_AUGMENT, self.SPEC_AUGMENT, self.SPEED_PERTURB}
+        ):
+            # speed rates come from a small fixed set, so every perturbed variant is cached once per rate
+            speed_rate = self._speed_perturb_augment.choose_rate()
+            feature = self._feature_cache.get_or_compute(
+                audio_path,
+                lambda: self._extract_feature(
+                    audio_path,
+                    frozenset((self.SPEED_PERTURB,)),
+                    speed_rate=speed_rate,
+                    non_silence_indices=non_silence_indices,
+                ),
+                variant="" if speed_rate == 1.0 else f"speed_perturb={speed_rate}",
+            )
+        else:
+            feature = self._extract_feature(audio_path, augments, joining_idx, non_silence_indices=non_silence_indices)
+
+        if feature is None:
+            return torch.zeros(1000, self.num_mels)
+
+        if self.cmvn is None:
+            feature -= feature.mean()
+            feature /= np.std(feature)
+        else:
+            speaker = get_speaker(os.path.relpath(audio_path, self.dataset_path))
+            feature = self.cmvn.normalize(feature, speaker if self.normalization == "speaker" else None)
+
+        feature = torch.FloatTensor(feature)
+
+        if self.SPEC_AUGMENT in augments:
             feature = self._spec_augment(feature)
 
         return feature
 
-    def _parse_transcript(self, transcript: str) -> list:
+    def _parse_waveform(
+        self,
+        audio_path: str,
+        augments: frozenset = frozenset(),
+        joining_idx: int = 0,
+        non_silence_indices: Optional[np.ndarray] = None,
+    ) -> Tensor:
+        """
+        Parses audio into a waveform, for datasets whose features are extracted from the waveform batch.
+
+        Args:
+            audio_path (str): path of audio file
+            augments (frozenset): augmentation identifications to apply
+            non_silence_indices (np.ndarray, optional): precomputed non-silent intervals of the audio
+
+        Returns:
+            signal (torch.FloatTensor): audio signal
+        """
+        signal = self._parse_signal(audio_path, augments, joining_idx, non_silence_indices=non_silence_indices)
+
+        if signal is None:
+            return torch.zeros(1000 * self.hop_length)
+
+        return torch.from_numpy(np.ascontiguousarray(signal, dtype=np.float32))
+
+    def _parse_transcript(self, tokens: np.ndarray) -> Tensor:
         """
         Parses transcript
         Args:
-            transcript (str): transcript of audio file
+            tokens (np.ndarray): token ids of transcript
         Returns
-            transcript (list): transcript that added <sos> and <eos> tokens
+            transcript (torch.LongTensor): transcript that added <sos> and <eos> tokens
         """
-        tokens = transcript.split(" ")
-        transcript = list()
-
-        transcript.append(int(self.sos_id))
-        for token in tokens:
-            transcript.append(int(token))
-        transcript.append(int(self.eos_id))
+        transcript = torch.empty(len(tokens) + 2, dtype=torch.long)
+        transcript[0] = self.sos_id
+        transcript[1:-1] = torch.from_numpy(tokens)
+        transcript[-1] = self.eos_id
 
         return transcript
 
@@ -207,17 +429,46 @@ class SpeechToTextDataset(Dataset):
         """Provides paif of audio & transcript"""
         audio_path = os.path.join(self.dataset_path, self.audio_paths[idx])
 
-        if self.augments[idx] == self.AUDIO_JOINING:
-            joining_idx = random.randint(0, self.total_size)
-            feature = self._parse_audio(audio_path, self.augments[idx], joining_idx)
-            transcript = self._parse_transcript(f"{self.transcripts[idx]} {self.transcripts[joining_idx]}")
+        parse = self._parse_audio if self.feature_extraction == "dataset" else self._parse_waveform
+        augments = self._sample_augments(idx)
+        non_silence_indices = None
+        if self.non_silence_indices is not None:
+            non_silence_indices = self.non_silence_indices[idx].reshape(-1, 2)
+
+        if self.AUDIO_JOINING in augments:
+            joining_idx = random.randint(0, self.total_size - 1)
+            feature = parse(audio_path, augments, joining_idx, non_silence_indices)
+            transcript = self._parse_transcript(np.concatenate((self.transcripts[idx], self.transcripts[joining_idx])))
 
         else:
-            feature = self._parse_audio(audio_path, self.augments[idx])
+            feature = parse(audio_path, augments, non_silence_indices=non_silence_indices)
             transcript = self._parse_transcript(self.transcripts[idx])
 
+        if self.feature_extraction != "dataset":
+            return feature, transcript, self.SPEC_AUGMENT in augments
+
         return feature, transcript
 
+    def get_feature_lengths(self) -> np.ndarray:
+        """
+        Returns the number of feature frames of each item, estimated from the audio lengths without decoding.
+        Audio lengths are read from the file headers if they were not given.
+        """
+        if self.audio_lengths is None:
+            self.audio_lengths = np.fromiter(
+                (
+                    self._get_audio_length(os.path.join(self.dataset_path, audio_path), self.sample_rate)
+                    for audio_path in self.audio_paths
+                ),
+                dtype=np.int64,
+                count=len(self.audio_paths),
+            )
+        return self.audio_lengths // self.hop_length + 1
+
+    def get_target_lengths(self) -> np.ndarray:
+        """Returns the number of target tokens of each item, including <sos> and <eos>."""
+        return self.transcripts.lengths() + 2
+
     def __len__(self):
         return len(self.audio_paths)
 
@@ -0,0 +1,225 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import fcntl
+import hashlib
+import logging
+import os
+from typing import Callable, Optional
+
+import numpy as np
+from omegaconf import DictConfig
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureCache(object):
+    r"""
+    Persistent store of extracted audio features. Features are appended to sharded, memory-mapped data files
+    and located through an append-only offset index per shard. The cache fills lazily: the first request for an
+    utterance computes the feature and stores it, later requests (in any process) read it back without decoding
+    the audio file again.
+
+    Writes to a shard are serialized with a file lock, so it is safe to share one cache between
+    multiple DataLoader workers and multiple training processes.
+
+    Keys are derived from the audio path and the feature settings in ``configs.audio``
+    (name, sample_rate, frame_length, frame_shift, num_mels, del_silence), so changing any of them never
+    returns stale features.
+
+    Args:
+        cache_dir (str): directory of the shard files
+        configs (DictConfig): configuration set.
+        num_shards (int): the number of shard files
+        dtype (str): storage dtype of features (float16 or float32)
+    """
+    KEY_ATTRIBUTES = ("name", "sample_rate", "frame_length", "frame_shift", "num_mels", "del_silence")
+    INDEX_DTYPE = np.dtype(
+        [
+            ("key", "V20"),
+            ("offset", "<i8"),
+            ("num_frames", "<i4"),
+            ("num_features", "<i4"),
+        ]
+    )
+
+    def __init__(self, cache_dir: str, configs: DictConfig, num_shards: int = 16, dtype: str = "float16") -> None:
+        super(FeatureCache, self).__init__()
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported feature cache dtype: {dtype}")
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.cache_dir = cache_dir
+        self.num_shards = num_shards
+        self.dtype = np.dtype(dtype)
+        self.audio_configs = "|".join(str(configs.audio[attribute]) for attribute in self.KEY_ATTRIBUTES)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._indices = [dict() for _ in range(self.num_shards)]
+        self._index_bytes = [0] * self.num_shards
+        self._memmaps = [None] * self.num_shards
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attribute in ("_indices", "_index_bytes", "_memmaps"):
+            del state[attribute]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def _path(self, shard: int, suffix: str) -> str:
+        return os.path.join(self.cache_dir, f"shard_{shard:03d}.{self.dtype.name}.{suffix}")
+
+    def key(self, audio_path: str, variant: str = "") -> bytes:
+        r"""
+        Returns the cache key of an utterance.
+
+        Args:
+            audio_path (str): path of audio file
+            variant (str): identification of an alternative feature of the same audio (e.g. an augmentation)
+
+        Returns:
+            key (bytes): sha1 digest of the audio path and the feature settings
+        """
+        return hashlib.sha1(f"{self.audio_configs}|{variant}|{audio_path}".encode("utf-8")).digest()
+
+    def _shard(self, key: bytes) -> int:
+        return int.from_bytes(key[:4], "little") % self.num_shards
+
+    def _refresh_index(self, shard: int) -> None:
+        r"""Reads index records appended (by any process) since the last refresh."""
+        index_path = self._path(shard, "idx")
+        if not os.path.exists(index_path):
+            return
+
+        record_size = self.INDEX_DTYPE.itemsize
+        num_bytes = os.path.getsize(index_path)
+        num_bytes -= num_bytes % record_size  # ignore a record that is still being written
+
+        if num_bytes <= self._index_bytes[shard]:
+            return
+
+        with open(index_path, "rb") as f:
+            f.seek(self._index_bytes[shard])
+            records = np.frombuffer(f.read(num_bytes - self._index_bytes[shard]), dtype=self.INDEX_DTYPE)
+
+        index = self._indices[shard]
+        for key, offset, num_frames, num_features in zip(
+            records["key"].tolist(),
+            records["offset"].tolist(),
+            records["num_frames"].tolist(),
+            records["num_features"].tolist(),
+        ):
+            index[key] = (offset, num_frames, num_features)
+
+        self._index_bytes[shard] = num_bytes
+
+    def _lookup(self, shard: int, key: bytes):
+        entry = self._indices[shard].get(key)
+        if entry is None:
+            self._refresh_index(shard)
+            entry = self._indices[shard].get(key)
+        return entry
+
+    def _read(self, shard: int, offset: int, num_frames: int, num_features: int) -> np.ndarray:
+        start = offset // self.dtype.itemsize
+        end = start + num_frames * num_features
+
+        memmap = self._memmaps[shard]
+        if memmap is None or memmap.shape[0] < end:
+            memmap = np.memmap(self._path(shard, "bin"), dtype=self.dtype, mode="r")
+            self._memmaps[shard] = memmap
+
+        return memmap[start:end].reshape(num_frames, num_features).astype(np.float32)
+
+    def __contains__(self, key: bytes) -> bool:
+        return self._lookup(self._shard(key), key) is not None
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        r"""
+        Reads a cached feature.
+
+        Args:
+            key (bytes): cache key from :meth:`key`
+
+        Returns:
+            feature (np.ndarray): float32 feature of shape ``(seq_length, num_features)``, None if not cached
+        """
+        shard = self._shard(key)
+        entry = self._lookup(shard, key)
+        if entry is None:
+            return None
+        return self._read(shard, *entry)
+
+    def put(self, key: bytes, feature: np.ndarray) -> None:
+        r"""
+        Appends a feature of shape ``(seq_length, num_features)`` to the cache.
+        Concurrent writers of the same key store it only once.
+        """
+        shard = self._shard(key)
+        feature = np.ascontiguousarray(feature, dtype=self.dtype)
+
+        with open(self._path(shard, "lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._refresh_index(shard)
+                if key in self._indices[shard]:
+                    return
+
+                with open(self._path(shard, "bin"), "ab") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(feature.tobytes())
+
+                record = np.array([(key, offset, feature.shape[0], feature.shape[1])], dtype=self.INDEX_DTYPE)
+                with open(self._path(shard, "idx"), "ab") as f:
+                    f.write(record.tobytes())
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def get_or_compute(self, audio_path: str, function: Callable[[], Optional[np.ndarray]], variant: str = ""):
+        r"""
+        Returns the cached feature of `audio_path`, computing and storing it with `function` on a miss.
+
+        Args:
+            audio_path (str): path of audio file
+            function (Callable): returns the feature of shape ``(seq_length, num_features)``, or None on failure
+            variant (str): identification of an alternative feature of the same audio
+
+        Returns:
+            feature (np.ndarray): float32 feature, None if `function` failed
+        """
+        key = self.key(audio_path, variant)
+
+        feature = self.get(key)
+        if feature is not None:
+            return feature
+
+        feature = function()
+        if feature is None:
+            return None
+
+        self.put(key, feature)
+        return np.asarray(feature, dtype=self.dtype).astype(np.float32)
@@ -0,0 +1,224 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Optional, Tuple
+
+import numpy as np
+
+from openspeech.data.audio.archive import ArchiveReader
+from openspeech.data.audio.load import get_audio_length, get_non_silence_indices
+from openspeech.data.packed import PackedSequences
+
+logger = logging.getLogger(__name__)
+
+
+def _fingerprint(dataset_path: str, audio_paths: list, sample_rate: int) -> str:
+    sha1 = hashlib.sha1(f"{os.path.abspath(dataset_path)}|{sample_rate}".encode("utf-8"))
+    for audio_path in audio_paths:
+        sha1.update(b"\0")
+        sha1.update(audio_path.encode("utf-8"))
+    return sha1.hexdigest()
+
+
+def load_audio_lengths(
+    dataset_path: str,
+    audio_paths: list,
+    sample_rate: int,
+    index_path: Optional[str] = None,
+    num_workers: int = 16,
+    audio_reader: Optional[ArchiveReader] = None,
+) -> np.ndarray:
+    r"""
+    Returns the length (number of samples at ``sample_rate``) of every audio file. Lengths are read from file
+    metadata (file size for PCM, header for wav / flac), so no audio is decoded.
+
+    If ``index_path`` is given, the lengths are persisted there as a sidecar index of the manifest and read back
+    on later runs. The index is rebuilt whenever the audio paths, dataset path or sample rate change.
+
+    Args:
+        dataset_path (str): path of dataset
+        audio_paths (list): list of audio path, relative to ``dataset_path``
+        sample_rate (int): sampling rate of audio
+        index_path (str, optional): path of the length index file
+        num_workers (int): the number of threads reading file metadata
+        audio_reader (ArchiveReader, optional): reads the audio from archives instead of files
+
+    Returns:
+        audio_lengths (np.ndarray): lengths of audio files, aligned with ``audio_paths``
+    """
+    fingerprint = _fingerprint(dataset_path, audio_paths, sample_rate)
+
+    if index_path is not None and os.path.exists(index_path):
+        with np.load(index_path) as index:
+            if str(index["fingerprint"]) == fingerprint:
+                return index["audio_lengths"]
+        logger.info(f"{index_path} is out of date. Rebuild audio length index..")
+
+    length_fn = audio_reader.get_audio_length if audio_reader is not None else get_audio_length
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+        audio_lengths = np.fromiter(
+            executor.map(
+                lambda audio_path: length_fn(os.path.join(dataset_path, audio_path), sample_rate),
+                audio_paths,
+                chunksize=256,
+            ),
+            dtype=np.int64,
+            count=len(audio_paths),
+        )
+
+    if index_path is not None:
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, fingerprint=np.array(fingerprint), audio_lengths=audio_lengths)
+        os.replace(tmp_path, index_path)
+
+    return audio_lengths
+
+
+def _get_non_silence_indices(
+    audio_path: str,
+    dataset_path: str,
+    sample_rate: int,
+    top_db: float,
+    audio_reader: Optional[ArchiveReader] = None,
+) -> np.ndarray:
+    if audio_reader is not None:
+        return audio_reader.get_non_silence_indices(os.path.join(dataset_path, audio_path), sample_rate, top_db=top_db)
+    return get_non_silence_indices(os.path.join(dataset_path, audio_path), sample_rate, top_db=top_db)
+
+
+def load_non_silence_indices(
+    dataset_path: str,
+    audio_paths: list,
+    sample_rate: int,
+    index_path: Optional[str] = None,
+    num_workers: Optional[int] = None,
+    top_db: float = 30,
+    audio_reader: Optional[ArchiveReader] = None,
+) -> PackedSequences:
+    r"""
+    Returns the non-silent intervals of every audio file, so that silence removal only slices the signal
+    instead of detecting silence on every load. Intervals are detected in parallel worker processes.
+
+    If ``index_path`` is given, the intervals are persisted there as a sidecar index of the manifest and read back
+    on later runs. The index is rebuilt whenever the audio paths, dataset path, sample rate or ``top_db`` change.
+
+    Args:
+        dataset_path (str): path of dataset
+        audio_paths (list): list of audio path, relative to ``dataset_path``
+        sample_rate (int): sampling rate of audio
+        index_path (str, optional): path of the interval index file
+        num_workers (int, optional): the number of worker processes (default: the number of CPUs)
+        top_db (float): threshold (in decibels) below reference to consider as silence
+        audio_reader (ArchiveReader, optional): reads the audio from archives instead of files
+
+    Returns:
+        non_silence_indices (PackedSequences): flattened ``(start, end)`` pairs of each audio file, aligned with
+        ``audio_paths``. Use ``non_silence_indices[idx].reshape(-1, 2)`` to get the intervals of a file.
+    """
+    fingerprint = _fingerprint(dataset_path, audio_paths, sample_rate) + f"|{top_db}"
+
+    if index_path is not None and os.path.exists(index_path):
+        with np.load(index_path) as index:
+            if str(index["fingerprint"]) == fingerprint:
+                return PackedSequences(index["data"], index["starts"], index["ends"])
+        logger.info(f"{index_path} is out of date. Rebuild non-silence index..")
+
+    function = partial(
+        _get_non_silence_indices,
+        dataset_path=dataset_path,
+        sample_rate=sample_rate,
+        top_db=top_db,
+        audio_reader=audio_reader,
+    )
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        intervals = list(executor.map(function, audio_paths, chunksize=64))
+
+    non_silence_indices = PackedSequences.from_list((interval.reshape(-1) for interval in intervals), dtype=np.int64)
+
+    if index_path is not None:
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                fingerprint=np.array(fingerprint),
+                data=non_silence_indices.data,
+                starts=non_silence_indices.starts,
+                ends=non_silence_indices.ends,
+            )
+        os.replace(tmp_path, index_path)
+
+    return non_silence_indices
+
+
+def non_silence_lengths(non_silence_indices: PackedSequences) -> np.ndarray:
+    r"""Returns the number of samples left in each audio file after silence removal"""
+    interval_lengths = non_silence_indices.data[1::2] - non_silence_indices.data[0::2]
+    cumulative_lengths = np.concatenate(([0], np.cumsum(interval_lengths, dtype=np.int64)))
+    return cumulative_lengths[non_silence_indices.ends // 2] - cumulative_lengths[non_silence_indices.starts // 2]
+
+
+def filter_by_duration(
+    audio_paths: list,
+    transcripts: list,
+    audio_lengths: np.ndarray,
+    sample_rate: int,
+    min_duration: float = 0.0,
+    max_duration: Optional[float] = None,
+    non_silence_indices: Optional[PackedSequences] = None,
+) -> Tuple[list, list, np.ndarray, Optional[PackedSequences]]:
+    r"""
+    Drops utterances shorter than ``min_duration`` or longer than ``max_duration`` (seconds).
+    Unreadable files (length 0) are always dropped. If ``non_silence_indices`` are given, durations are measured
+    after silence removal and ``audio_lengths`` are replaced with the trimmed lengths.
+
+    Returns:
+        audio_paths (list), transcripts (list), audio_lengths (np.ndarray) and non_silence_indices
+        (PackedSequences or None) of kept utterances. Packed inputs (``PackedStrings`` / ``PackedSequences``) are
+        returned packed.
+    """
+    if non_silence_indices is not None:
+        audio_lengths = non_silence_lengths(non_silence_indices)
+    audio_lengths = np.asarray(audio_lengths)
+    durations = audio_lengths / sample_rate
+    mask = (audio_lengths > 0) & (durations >= min_duration)
+    if max_duration is not None:
+        mask &= durations <= max_duration
+
+    keep = np.flatnonzero(mask)
+    if len(keep) < len(audio_paths):
+        logger.info(f"Filter {len(audio_paths) - len(keep)} of {len(audio_paths)} utterances by duration")
+
+    def select(items):
+        if hasattr(items, "take"):
+            return items.take(keep)
+        return [items[i] for i in keep]
+
+    if non_silence_indices is not None:
+        non_silence_indices = non_silence_indices.take(keep)
+
+    return select(audio_paths), select(transcripts), audio_lengths[keep], non_silence_indices
@@ -20,27 +20,41 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import io
 import logging
+import os
+
+from typing import Optional
 
 import librosa
 import numpy as np
+import soundfile as sf
 
 logger = logging.getLogger(__name__)
 
 
-def load_audio(audio_path: str, sample_rate: int, del_silence: bool = False) -> np.ndarray:
+def load_audio(
+    audio_path: str,
+    sample_rate: int,
+    del_silence: bool = False,
+    non_silence_indices: Optional[np.ndarray] = None,
+) -> np.ndarray:
     """
     Load audio file (PCM) to sound. if del_silence is True, Eliminate all sounds below 30dB.
+    Precomputed ``non_silence_indices`` (see ``get_non_silence_indices``) are sliced instead of detecting silence.
     If exception occurs in numpy.memmap(), return None.
     """
     try:
         if audio_path.endswith("pcm"):
-            signal = np.memmap(audio_path, dtype="h", mode="r").astype("float32")
+            signal = np.memmap(audio_path, dtype="h", mode="r")
 
             if del_silence:
-                non_silence_indices = librosa.effects.split(signal, top_db=30)
+                if non_silence_indices is None:
+                    non_silence_indices = librosa.effects.split(signal.astype("float32"), top_db=30)
                 signal = np.concatenate([signal[start:end] for start, end in non_silence_indices])
 
+            signal = signal.astype("float32")
+
             return signal / 32767  # normalize audio
 
         elif audio_path.endswith("wav") or audio_path.endswith("flac"):
@@ -56,3 +70,88 @@ def load_audio(audio_path: str, sample_rate: int, del_silence: bool = False) ->
     except IOError:
         logger.warning("IOError in {0}".format(audio_path))
         return None
+
+
+def get_non_silence_indices(audio_path: str, sample_rate: int, top_db: float = 30) -> np.ndarray:
+    """
+    Returns the non-silent intervals ``(num_intervals, 2)`` that ``load_audio`` keeps with del_silence.
+    Silence is only removed from PCM, so other formats return one interval spanning the whole file.
+    If the file can not be read, return an empty array.
+    """
+    try:
+        if audio_path.endswith("pcm"):
+            signal = np.memmap(audio_path, dtype="h", mode="r").astype("float32")
+            return librosa.effects.split(signal, top_db=top_db).astype(np.int64)
+
+        elif audio_path.endswith("wav") or audio_path.endswith("flac"):
+            return np.array([[0, get_audio_length(audio_path, sample_rate)]], dtype=np.int64)
+
+    except ValueError:
+        logger.warning("ValueError in {0}".format(audio_path))
+    except RuntimeError:
+        logger.warning("RuntimeError in {0}".format(audio_path))
+    except IOError:
+        logger.warning("IOError in {0}".format(audio_path))
+
+    return np.zeros((0, 2), dtype=np.int64)
+
+
+def load_audio_bytes(
+    data: bytes,
+    extension: str,
+    sample_rate: int,
+    del_silence: bool = False,
+    non_silence_indices: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Decode audio file contents (e.g. a member of a tar shard) the same way ``load_audio`` decodes the file.
+    Precomputed ``non_silence_indices`` are sliced instead of detecting silence.
+    If the contents can not be decoded, return None.
+    """
+    try:
+        if extension.endswith("pcm"):
+            signal = np.frombuffer(data, dtype="h").astype("float32")
+
+            if del_silence:
+                if non_silence_indices is None:
+                    non_silence_indices = librosa.effects.split(signal, top_db=30)
+                signal = np.concatenate([signal[start:end] for start, end in non_silence_indices])
+
+            return signal / 32767  # normalize audio
+
+        elif extension.endswith("wav") or extension.endswith("flac"):
+            signal, file_sample_rate = sf.read(io.BytesIO(data), dtype="float32")
+            if signal.ndim > 1:
+                signal = signal.mean(axis=1)
+            if file_sample_rate != sample_rate:
+                signal = librosa.resample(signal, orig_sr=file_sample_rate, target_sr=sample_rate)
+            return signal
+
+    except ValueError:
+        logger.warning("ValueError in {0} bytes".format(extension))
+        return None
+    except RuntimeError:
+        logger.warning("RuntimeError in {0} bytes".format(extension))
+        return None
+
+
+def get_audio_length(audio_path: str, sample_rate: int) -> int:
+    """
+    Returns the number of samples ``load_audio`` would return for the file, without decoding it.
+    The length of PCM (16 bit) is taken from the file size, and the length of wav / flac from the header,
+    rescaled to ``sample_rate``. If the file can not be read, return 0.
+    """
+    try:
+        if audio_path.endswith("pcm"):
+            return os.path.getsize(audio_path) // 2
+
+        elif audio_path.endswith("wav") or audio_path.endswith("flac"):
+            info = sf.info(audio_path)
+            return int(np.ceil(info.frames * sample_rate / info.samplerate))
+
+    except RuntimeError:
+        logger.warning("RuntimeError in {0}".format(audio_path))
+    except IOError:
+        logger.warning("IOError in {0}".format(audio_path))
+
+    return 0
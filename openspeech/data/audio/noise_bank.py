@@ -0,0 +1,189 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import fcntl
+import hashlib
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+from openspeech.data.audio.load import load_audio
+
+logger = logging.getLogger(__name__)
+
+NOISE_EXTENSIONS = (".pcm", ".wav", ".flac")
+
+
+class NoiseBank(object):
+    r"""
+    Read-only bank of decoded noise clips. All clips are stored back to back in one memory-mapped file
+    (``<bank_path>.bin``) with an offset table and the RMS of every clip (``<bank_path>.idx.npz``), so
+    DataLoader workers and training processes share the page cache instead of holding their own decoded copies.
+
+    Use :meth:`open` to build the bank on first use. The bank is rebuilt when the noise files or the sample rate
+    change.
+
+    Args:
+        bank_path (str): path prefix of the bank files
+
+    Attributes:
+        offsets (np.ndarray): start of each clip in the data file, followed by the total length ``(num_clips + 1)``
+        rms (np.ndarray): root mean square of each clip (float32)
+    """
+
+    def __init__(self, bank_path: str) -> None:
+        super(NoiseBank, self).__init__()
+        self.bank_path = bank_path
+
+        with np.load(f"{bank_path}.idx.npz") as index:
+            self.offsets = index["offsets"]
+            self.rms = index["rms"]
+            self.scale = float(index["scale"])
+            self.dtype = np.dtype(str(index["dtype"]))
+            self.fingerprint = str(index["fingerprint"])
+
+        self._data = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    @property
+    def data(self) -> np.ndarray:
+        if self._data is None:
+            if self.offsets[-1] == 0:
+                self._data = np.zeros(0, dtype=self.dtype)
+            else:
+                self._data = np.memmap(f"{self.bank_path}.bin", dtype=self.dtype, mode="r")
+        return self._data
+
+    def __len__(self) -> int:
+        return len(self.rms)
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        r"""Returns noise clip ``idx`` as a float32 array"""
+        clip = self.data[self.offsets[idx] : self.offsets[idx + 1]]
+        if self.scale != 1.0:
+            return clip.astype(np.float32) / self.scale
+        return np.array(clip, dtype=np.float32)
+
+    @staticmethod
+    def list_noise_files(noise_dataset_dir: str) -> list:
+        return sorted(filename for filename in os.listdir(noise_dataset_dir) if filename.endswith(NOISE_EXTENSIONS))
+
+    @classmethod
+    def compute_fingerprint(cls, noise_dataset_dir: str, sample_rate: int, dtype: str) -> str:
+        sha1 = hashlib.sha1(f"{sample_rate}|{dtype}".encode("utf-8"))
+        for filename in cls.list_noise_files(noise_dataset_dir):
+            stat = os.stat(os.path.join(noise_dataset_dir, filename))
+            sha1.update(f"\0{filename}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+        return sha1.hexdigest()
+
+    @classmethod
+    def build(cls, noise_dataset_dir: str, bank_path: str, sample_rate: int = 16000, dtype: str = "int16") -> None:
+        r"""
+        Decodes every noise file of ``noise_dataset_dir`` once and writes the bank files.
+
+        Args:
+            noise_dataset_dir (str): path of noise dataset
+            bank_path (str): path prefix of the bank files
+            sample_rate (int): sampling rate
+            dtype (str): storage dtype of samples (int16 or float32)
+        """
+        if dtype not in ("int16", "float32"):
+            raise ValueError(f"Unsupported noise bank dtype: {dtype}")
+
+        scale = 32767.0 if dtype == "int16" else 1.0
+        fingerprint = cls.compute_fingerprint(noise_dataset_dir, sample_rate, dtype)
+        offsets, rms = [0], list()
+
+        data_tmp_path = f"{bank_path}.bin.{os.getpid()}.tmp"
+        with open(data_tmp_path, "wb") as f:
+            for filename in cls.list_noise_files(noise_dataset_dir):
+                noise = load_audio(os.path.join(noise_dataset_dir, filename), sample_rate, del_silence=False)
+                if noise is None or len(noise) == 0:
+                    continue
+
+                noise_rms = float(np.sqrt(np.mean(np.square(noise, dtype=np.float64))))
+                if noise_rms == 0.0:
+                    continue
+
+                if dtype == "int16":
+                    noise = np.round(np.clip(noise, -1.0, 1.0) * scale)
+                f.write(np.asarray(noise, dtype=dtype).tobytes())
+                offsets.append(offsets[-1] + len(noise))
+                rms.append(noise_rms)
+
+        index_tmp_path = f"{bank_path}.idx.{os.getpid()}.tmp.npz"
+        np.savez(
+            index_tmp_path,
+            offsets=np.array(offsets, dtype=np.int64),
+            rms=np.array(rms, dtype=np.float32),
+            scale=np.array(scale),
+            dtype=np.array(dtype),
+            fingerprint=np.array(fingerprint),
+        )
+        os.replace(data_tmp_path, f"{bank_path}.bin")
+        os.replace(index_tmp_path, f"{bank_path}.idx.npz")
+
+        logger.info(f"Noise bank of {len(rms)} clips is saved at {bank_path}")
+
+    @classmethod
+    def open(
+        cls,
+        noise_dataset_dir: str,
+        bank_path: Optional[str] = None,
+        sample_rate: int = 16000,
+        dtype: str = "int16",
+    ) -> "NoiseBank":
+        r"""
+        Opens the noise bank of ``noise_dataset_dir``, building it first if it is missing or out of date.
+        Concurrent callers are serialized with a file lock, so the bank is built once.
+
+        Args:
+            noise_dataset_dir (str): path of noise dataset
+            bank_path (str, optional): path prefix of the bank files
+                (default: ``noise_bank.<sample_rate>.<dtype>`` in ``noise_dataset_dir``)
+            sample_rate (int): sampling rate
+            dtype (str): storage dtype of samples (int16 or float32)
+        """
+        if bank_path is None:
+            bank_path = os.path.join(noise_dataset_dir, f"noise_bank.{sample_rate}.{dtype}")
+
+        fingerprint = cls.compute_fingerprint(noise_dataset_dir, sample_rate, dtype)
+
+        with open(f"{bank_path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(f"{bank_path}.idx.npz"):
+                    noise_bank = cls(bank_path)
+                    if noise_bank.fingerprint == fingerprint:
+                        return noise_bank
+                    logger.info(f"{bank_path} is out of date. Rebuild noise bank..")
+
+                cls.build(noise_dataset_dir, bank_path, sample_rate, dtype)
+                return cls(bank_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
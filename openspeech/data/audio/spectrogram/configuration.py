@@ -22,18 +22,18 @@
 
 from dataclasses import dataclass, field
 
-from ....dataclass.configurations import OpenspeechDataclass
+from ....dataclass.configurations import AudioFeatureConfigs
 
 
 @dataclass
-class SpectrogramConfigs(OpenspeechDataclass):
+class SpectrogramConfigs(AudioFeatureConfigs):
     r"""
     This is the configuration class to store the configuration of
     a :class:`~openspeech.data.audio.SpectrogramTransform`.
 
     It is used to initiated an `SpectrogramTransform` feature transform.
 
-    Configuration objects inherit from :class: `~openspeech.dataclass.OpenspeechDataclass`.
+    Configuration objects inherit from :class: `~openspeech.dataclass.AudioFeatureConfigs`.
 
     Args:
         name (str): name of feature transform. (default: spectrogram)
@@ -46,6 +46,16 @@ class SpectrogramConfigs(OpenspeechDataclass):
         apply_noise_augment (bool): flag indication whether to apply noise augment or not (default: False)
         apply_time_stretch_augment (bool): flag indication whether to apply time stretch augment or not (default: False)
         apply_joining_augment (bool): flag indication whether to apply audio joining augment or not (default: False)
+        feature_cache_dir (str, optional): directory of the persistent feature cache (default: None)
+        feature_cache_dtype (str): storage dtype of cached features (default: float16)
+        feature_cache_num_shards (int): the number of feature cache shard files (default: 16)
+        feature_extraction (str): where features are extracted (dataset, collate, model) (default: dataset)
+        min_duration (float): training utterances shorter than this (seconds) are dropped (default: 0.0)
+        max_duration (float, optional): training utterances longer than this (seconds) are dropped (default: None)
+        apply_speed_perturb_augment (bool): flag indication whether to apply speed perturbation augment or not
+            (default: False)
+        normalization (str): feature normalization (utterance, global, speaker) (default: utterance)
+        cmvn_path (str, optional): path of CMVN statistics for global / speaker normalization (default: None)
     """
     name: str = field(default="spectrogram", metadata={"help": "Name of dataset."})
     sample_rate: int = field(default=16000, metadata={"help": "Sampling rate of audio"})
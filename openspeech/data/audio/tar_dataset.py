@@ -0,0 +1,472 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import glob
+import hashlib
+import io
+import logging
+import os
+import random
+import tarfile
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.distributed as dist
+from omegaconf import DictConfig
+from torch import Tensor
+from torch.utils.data import IterableDataset, get_worker_info
+
+from openspeech.data import AUDIO_FEATURE_TRANSFORM_REGISTRY
+from openspeech.data.audio.archive import ArchiveReader
+from openspeech.data.audio.augment import BatchSpecAugment, SpecAugment
+from openspeech.data.audio.batch_feature_transform import build_batch_feature_transform
+from openspeech.data.audio.cmvn import CMVN
+from openspeech.data.audio.data_loader import FeatureCollator, _collate_waveform_fn
+from openspeech.data.audio.load import load_audio_bytes
+from openspeech.data.manifest import load_manifest
+from openspeech.data.packed import PackedSequences
+
+logger = logging.getLogger(__name__)
+
+TOKENS_EXTENSION = "tokens"
+NON_SILENCE_EXTENSION = "spans"
+
+
+def write_tar_shards(
+    manifest_file_path: str,
+    dataset_path: str,
+    output_dir: str,
+    shard_size: int = 1000,
+    shuffle: bool = True,
+    seed: int = 1,
+    encoding: str = "utf-8",
+) -> list:
+    r"""
+    Packs the utterances of a manifest into tar shards for :class:`SpeechToTextTarDataset`.
+    Each utterance is stored as two consecutive members: ``<key>.<audio extension>`` with the original file
+    contents and ``<key>.tokens`` with the token ids (int32, little endian).
+
+    Args:
+        manifest_file_path (str): path of manifest file (TSV or binary manifest)
+        dataset_path (str): path of dataset, audio paths of the manifest are relative to it
+        output_dir (str): directory of tar shards
+        shard_size (int): the number of utterances per shard
+        shuffle (bool): shuffle utterances before packing, so that consecutive utterances are unrelated
+        seed (int): seed of the shuffle
+        encoding (str): encoding of manifest file
+
+    Returns:
+        shard_paths (list): paths of the written shards
+    """
+    audio_paths, transcripts, _ = load_manifest(manifest_file_path, encoding=encoding)
+    shard_paths, _ = pack_tar_shards(audio_paths, transcripts, dataset_path, output_dir, shard_size, shuffle, seed)
+    return shard_paths
+
+
+def pack_tar_shards(
+    audio_paths: list,
+    transcripts: list,
+    dataset_path: str,
+    output_dir: str,
+    shard_size: int = 1000,
+    shuffle: bool = True,
+    seed: int = 1,
+    audio_reader: Optional[ArchiveReader] = None,
+    non_silence_indices: Optional[PackedSequences] = None,
+) -> Tuple[list, list]:
+    r"""
+    Packs utterances into tar shards, same as :func:`write_tar_shards` from lists of audio paths and transcripts.
+    Audio is read from the archives of ``audio_reader`` if it is given. Precomputed ``non_silence_indices``
+    (see ``load_non_silence_indices``) are stored as a ``<key>.spans`` member (int64, little endian) between the
+    audio and the token ids, so that silence is not detected again while streaming.
+
+    Returns:
+        shard_paths (list): paths of the written shards
+        shard_sizes (list): the number of utterances of each shard
+    """
+    transcripts = PackedSequences.from_transcripts(transcripts)
+
+    order = np.arange(len(audio_paths))
+    if shuffle:
+        np.random.RandomState(seed).shuffle(order)
+
+    os.makedirs(output_dir, exist_ok=True)
+    shard_paths = list()
+    shard_sizes = list()
+
+    for shard_idx, shard_start in enumerate(range(0, len(order), shard_size)):
+        shard_path = os.path.join(output_dir, f"shard_{shard_idx:06d}.tar")
+        tmp_path = f"{shard_path}.{os.getpid()}.tmp"
+        shard_order = order[shard_start : shard_start + shard_size]
+
+        with tarfile.open(tmp_path, "w") as tar:
+            for idx in shard_order:
+                audio_path = audio_paths[idx]
+                key = f"{idx:09d}"
+                extension = os.path.splitext(audio_path)[1].lstrip(".")
+
+                if audio_reader is None:
+                    tar.add(os.path.join(dataset_path, audio_path), arcname=f"{key}.{extension}")
+                else:
+                    _add_bytes(tar, f"{key}.{extension}", audio_reader.read(os.path.join(dataset_path, audio_path)))
+
+                if non_silence_indices is not None:
+                    spans = np.asarray(non_silence_indices[idx], dtype="<i8").tobytes()
+                    _add_bytes(tar, f"{key}.{NON_SILENCE_EXTENSION}", spans)
+
+                _add_bytes(tar, f"{key}.{TOKENS_EXTENSION}", np.asarray(transcripts[idx], dtype="<i4").tobytes())
+
+        os.replace(tmp_path, shard_path)
+        shard_paths.append(shard_path)
+        shard_sizes.append(len(shard_order))
+
+    logger.info(f"{len(order)} utterances are packed into {len(shard_paths)} shards at {output_dir}")
+    return shard_paths, shard_sizes
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def load_or_write_tar_shards(
+    dataset_path: str,
+    audio_paths: list,
+    transcripts: list,
+    shard_dir: str,
+    shard_size: int = 1000,
+    seed: int = 1,
+    audio_reader: Optional[ArchiveReader] = None,
+    non_silence_indices: Optional[PackedSequences] = None,
+) -> Tuple[list, list]:
+    r"""
+    Returns the tar shards of ``audio_paths`` in ``shard_dir`` and their sizes, packing them first if they are
+    missing or were packed from other utterances (or other ``non_silence_indices``). The shards are listed in
+    ``shard_dir/shards.npz``.
+    """
+    # transcripts of binary manifests are token id arrays, fingerprint the token ids of both manifest formats
+    transcripts = PackedSequences.from_transcripts(transcripts)
+
+    sha1 = hashlib.sha1(str(shard_size).encode("utf-8"))
+    for idx, (audio_path, transcript) in enumerate(zip(audio_paths, transcripts)):
+        sha1.update(b"\0")
+        sha1.update(audio_path.encode("utf-8"))
+        sha1.update(b"\t")
+        sha1.update(np.asarray(transcript, dtype="<i4").tobytes())
+        if non_silence_indices is not None:
+            sha1.update(b"\t")
+            sha1.update(np.asarray(non_silence_indices[idx], dtype="<i8").tobytes())
+    fingerprint = sha1.hexdigest()
+
+    index_path = os.path.join(shard_dir, "shards.npz")
+    if os.path.exists(index_path):
+        with np.load(index_path) as index:
+            if str(index["fingerprint"]) == fingerprint:
+                shard_paths = [os.path.join(shard_dir, name) for name in index["shard_names"].tolist()]
+                return shard_paths, index["shard_sizes"].tolist()
+        logger.info(f"{shard_dir} is out of date. Repack tar shards..")
+
+    for shard_path in list_tar_shards(shard_dir):
+        os.remove(shard_path)
+
+    shard_paths, shard_sizes = pack_tar_shards(
+        audio_paths,
+        transcripts,
+        dataset_path,
+        shard_dir,
+        shard_size=shard_size,
+        seed=seed,
+        audio_reader=audio_reader,
+        non_silence_indices=non_silence_indices,
+    )
+
+    tmp_path = f"{index_path}.{os.getpid()}.tmp.npz"
+    np.savez(
+        tmp_path,
+        fingerprint=np.array(fingerprint),
+        shard_names=np.array([os.path.basename(shard_path) for shard_path in shard_paths]),
+        shard_sizes=np.array(shard_sizes, dtype=np.int64),
+    )
+    os.replace(tmp_path, index_path)
+
+    return shard_paths, shard_sizes
+
+
+def list_tar_shards(shard_dir: str) -> list:
+    r"""Returns the tar shards of ``shard_dir`` in a stable order"""
+    return sorted(glob.glob(os.path.join(shard_dir, "*.tar")))
+
+
+def count_tar_shard(shard_path: str) -> int:
+    r"""Returns the number of utterances of a tar shard, reading only the member headers."""
+    with tarfile.open(shard_path, "r:") as tar:
+        return sum(1 for name in tar.getnames() if name.endswith(f".{TOKENS_EXTENSION}"))
+
+
+class SpeechToTextTarDataset(IterableDataset):
+    r"""
+    Streaming dataset that reads utterances sequentially from tar shards written by :func:`write_tar_shards`,
+    instead of opening one small file per utterance.
+
+    Shards are split between distributed ranks and DataLoader workers (readers). Every reader yields the same
+    number of utterances per epoch, ``ceil(total / readers)``, so that distributed ranks run the same number of
+    steps: a reader whose shards hold fewer utterances reads them again from the start, and one whose shards hold
+    more stops early. Shards are read once per epoch if they split evenly between readers.
+    With ``shuffle``, the shard order is permuted every epoch (call :meth:`set_epoch` before each epoch, see
+    ``DatasetEpochCallback``) and utterances are shuffled within a buffer of ``shuffle_buffer_size`` items.
+
+    Args:
+        configs (DictConfig): configuration set.
+        shard_paths (list): paths of tar shards
+        shard_sizes (list, optional): the number of utterances of each shard. Counted from the shards if None.
+        sos_id (int): identification of <startofsentence>
+        eos_id (int): identification of <endofsentence>
+        del_silence (bool): flag indication whether to apply delete silence or not. The non-silent intervals
+            stored in the shards are used if they were packed with them.
+        apply_spec_augment (bool): flag indication whether to apply spec augment or not.
+            With the `duplicate` policy (``configs.augment.augment_policy``), every utterance is yielded twice, as is
+            and spec augmented, like ``SpeechToTextDataset``. With `online`, spec augment is sampled per item with
+            ``configs.augment.spec_augment_prob``.
+        shuffle (bool): flag indication whether to shuffle shards and utterances or not
+        shuffle_buffer_size (int): the number of utterances buffered for shuffling
+        seed (int): seed of the shuffle
+        cmvn (CMVN, optional): global normalization statistics. Features are normalized per utterance if None.
+
+    If ``configs.audio.feature_extraction`` is not `dataset`, items are ``(waveform, transcript, spec_augment)``
+    and features are extracted from the padded waveform batch (see ``collate_fn``).
+    """
+
+    def __init__(
+        self,
+        configs: DictConfig,
+        shard_paths: list,
+        shard_sizes: Optional[list] = None,
+        sos_id: int = 1,
+        eos_id: int = 2,
+        del_silence: bool = False,
+        apply_spec_augment: bool = False,
+        shuffle: bool = True,
+        shuffle_buffer_size: int = 1000,
+        seed: int = 1,
+        cmvn: Optional[CMVN] = None,
+    ) -> None:
+        super(SpeechToTextTarDataset, self).__init__()
+        self.shard_paths = list(shard_paths)
+        if shard_sizes is None:
+            shard_sizes = [count_tar_shard(shard_path) for shard_path in self.shard_paths]
+        self.num_samples = int(sum(shard_sizes))
+        self.sos_id = sos_id
+        self.eos_id = eos_id
+        self.sample_rate = configs.audio.sample_rate
+        self.num_mels = configs.audio.num_mels
+        self.hop_length = int(round(configs.audio.sample_rate * 0.001 * configs.audio.frame_shift))
+        self.del_silence = del_silence
+        self.apply_spec_augment = apply_spec_augment
+        self.augment_policy = configs.augment.augment_policy
+        self.spec_augment_prob = configs.augment.spec_augment_prob
+        self.shuffle = shuffle
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.seed = seed
+        self.epoch = 0
+        self.cmvn = cmvn
+        self.transforms = AUDIO_FEATURE_TRANSFORM_REGISTRY[configs.audio.name](configs)
+        self.feature_extraction = configs.audio.feature_extraction
+
+        if self.apply_spec_augment:
+            self._spec_augment = SpecAugment(
+                freq_mask_para=configs.augment.freq_mask_para,
+                freq_mask_num=configs.augment.freq_mask_num,
+                time_mask_num=configs.augment.time_mask_num,
+            )
+
+        if self.feature_extraction == "collate":
+            self.collate_fn = FeatureCollator(
+                transform=build_batch_feature_transform(configs, cmvn=cmvn),
+                spec_augment=BatchSpecAugment(
+                    freq_mask_para=configs.augment.freq_mask_para,
+                    freq_mask_num=configs.augment.freq_mask_num,
+                    time_mask_num=configs.augment.time_mask_num,
+                    time_mask_ratio=configs.augment.time_mask_ratio,
+                )
+                if self.apply_spec_augment
+                else None,
+            )
+        elif self.feature_extraction == "model":
+            self.collate_fn = _collate_waveform_fn
+        elif self.feature_extraction != "dataset":
+            raise ValueError(f"Unsupported feature extraction: {self.feature_extraction}")
+
+        if self.augment_policy not in ("duplicate", "online"):
+            raise ValueError(f"Unsupported augment policy: {self.augment_policy}")
+
+    def set_epoch(self, epoch: int) -> None:
+        r"""Sets the epoch, which seeds the shard order and the buffer shuffle."""
+        self.epoch = epoch
+
+    @staticmethod
+    def _reader() -> tuple:
+        r"""Returns the index of this reader (rank and DataLoader worker) and the number of readers."""
+        rank, world_size = 0, 1
+        if dist.is_available() and dist.is_initialized():
+            rank, world_size = dist.get_rank(), dist.get_world_size()
+
+        worker_info = get_worker_info()
+        worker_id, num_workers = (worker_info.id, worker_info.num_workers) if worker_info is not None else (0, 1)
+
+        return rank * num_workers + worker_id, world_size * num_workers
+
+    def _reader_shards(self, reader_id: int, num_readers: int) -> list:
+        r"""Returns the shards of a reader for the current epoch."""
+        shard_paths = list(self.shard_paths)
+        if self.shuffle:
+            np.random.RandomState(self.seed + self.epoch).shuffle(shard_paths)
+
+        if 0 < len(shard_paths) < num_readers:
+            logger.warning(f"{len(shard_paths)} shards are split into {num_readers} readers, some shards are repeated")
+            return [shard_paths[reader_id % len(shard_paths)]]
+
+        return shard_paths[reader_id::num_readers]
+
+    def _reader_samples(self, reader_id: int, num_readers: int) -> Iterator[tuple]:
+        r"""Yields ``ceil(total / num_readers)`` samples from the shards of a reader, repeating them if needed."""
+        num_samples = -(-self.num_samples // num_readers)
+        shard_paths = self._reader_shards(reader_id, num_readers)
+
+        count = 0
+        while count < num_samples:
+            for shard_path in shard_paths:
+                for sample in self._read_shard(shard_path):
+                    yield sample
+                    count += 1
+                    if count == num_samples:
+                        return
+            if count == 0:
+                raise ValueError(f"Shards of reader {reader_id} have no utterances: {shard_paths}")
+
+    @staticmethod
+    def _read_shard(shard_path: str) -> Iterator[tuple]:
+        r"""
+        Yields ``(audio bytes, audio extension, token ids, non-silent intervals)`` of the utterances of a shard,
+        in order. The intervals are None if the shard was packed without them.
+        """
+        audio = None
+        non_silence_indices = None
+
+        with tarfile.open(shard_path, "r|") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+
+                key, extension = member.name.rsplit(".", 1)
+                data = tar.extractfile(member).read()
+
+                if extension == NON_SILENCE_EXTENSION:
+                    non_silence_indices = (key, np.frombuffer(data, dtype="<i8").reshape(-1, 2))
+                elif extension != TOKENS_EXTENSION:
+                    audio = (key, data, extension)
+                    non_silence_indices = None
+                elif audio is not None and audio[0] == key:
+                    spans = non_silence_indices[1] if non_silence_indices and non_silence_indices[0] == key else None
+                    yield audio[1], audio[2], np.frombuffer(data, dtype="<i4"), spans
+                    audio, non_silence_indices = None, None
+                else:
+                    logger.warning(f"{member.name} in {shard_path} has no audio")
+
+    def _sample_spec_augment(self, samples: Iterator[tuple], rng: random.Random) -> Iterator[tuple]:
+        r"""Appends whether to spec augment to every sample, yielding it twice with the `duplicate` policy."""
+        for sample in samples:
+            if not self.apply_spec_augment:
+                yield (*sample, False)
+            elif self.augment_policy == "duplicate":
+                yield (*sample, False)
+                yield (*sample, True)
+            else:
+                yield (*sample, rng.random() < self.spec_augment_prob)
+
+    def _shuffle_buffer(self, samples: Iterator[tuple], rng: random.Random) -> Iterator[tuple]:
+        buffer = list()
+        for sample in samples:
+            if len(buffer) < self.shuffle_buffer_size:
+                buffer.append(sample)
+                continue
+            idx = rng.randrange(len(buffer))
+            yield buffer[idx]
+            buffer[idx] = sample
+
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def _parse_transcript(self, tokens: np.ndarray) -> Tensor:
+        transcript = torch.empty(len(tokens) + 2, dtype=torch.long)
+        transcript[0] = self.sos_id
+        transcript[1:-1] = torch.from_numpy(tokens.astype(np.int64))
+        transcript[-1] = self.eos_id
+        return transcript
+
+    def _parse_audio(self, signal: Optional[np.ndarray], spec_augment: bool) -> Tensor:
+        if signal is None:
+            return torch.zeros(1000, self.num_mels)
+
+        feature = self.transforms(signal).transpose()
+        if self.cmvn is None:
+            feature -= feature.mean()
+            feature /= np.std(feature)
+        else:
+            feature = self.cmvn.normalize(feature)
+
+        feature = torch.FloatTensor(feature)
+
+        if spec_augment:
+            feature = self._spec_augment(feature)
+
+        return feature
+
+    def _parse_waveform(self, signal: Optional[np.ndarray]) -> Tensor:
+        if signal is None:
+            return torch.zeros(1000 * self.hop_length)
+        return torch.from_numpy(np.ascontiguousarray(signal, dtype=np.float32))
+
+    def __iter__(self):
+        reader_id, num_readers = self._reader()
+        samples = self._reader_samples(reader_id, num_readers)
+        rng = random.Random(f"{self.seed}|{self.epoch}|{reader_id}")
+        samples = self._sample_spec_augment(samples, rng)
+
+        if self.shuffle and self.shuffle_buffer_size > 1:
+            samples = self._shuffle_buffer(samples, rng)
+
+        for data, extension, tokens, non_silence_indices, spec_augment in samples:
+            signal = load_audio_bytes(
+                data,
+                extension,
+                sample_rate=self.sample_rate,
+                del_silence=self.del_silence,
+                non_silence_indices=non_silence_indices,
+            )
+            transcript = self._parse_transcript(tokens)
+
+            if self.feature_extraction == "dataset":
+                yield self._parse_audio(signal, spec_augment), transcript
+            else:
+                yield self._parse_waveform(signal), transcript, spec_augment
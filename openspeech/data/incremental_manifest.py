@@ -0,0 +1,232 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from joblib import Parallel, cpu_count, delayed
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(file_path: str) -> str:
+    r"""Returns the sha1 of the contents of a file"""
+    sha1 = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def split_by_key(audio_paths: Iterable[str], ratio: float) -> np.ndarray:
+    r"""
+    Returns a mask of the utterances that fall into a split of ``ratio``, decided by the sha1 of each audio path.
+    Unlike slicing by fixed counts, the split of an utterance does not change when others are added or removed.
+    """
+    return np.array(
+        [
+            int(hashlib.sha1(audio_path.encode("utf-8")).hexdigest()[:8], 16) < ratio * (1 << 32)
+            for audio_path in audio_paths
+        ],
+        dtype=bool,
+    )
+
+
+class IncrementalManifestBuilder(object):
+    r"""
+    Builds a manifest from many source directories, re-processing only what changed since the last build.
+
+    Every source (a directory, or any group of transcript files) is stored as a transcript shard named after the
+    sha1 of its file listing (path, size and mtime of every file) and of ``version`` (e.g. the preprocess mode).
+    An unchanged source is reused without reading any of its files. In a changed source only new or modified files
+    are processed again, the others are taken from the previous shard. Transcript shards are tokenized into
+    manifest shards once per vocabulary, and the manifest is the concatenation of the manifest shards.
+
+    Shards live in ``cache_dir`` (``<key>.jsonl`` transcripts, ``<key>.<vocab digest>.tsv`` manifest lines)
+    along with ``index.json``, which maps every source to its current shard. Manifest shards of other vocabularies
+    are removed when the manifest is written.
+
+    Args:
+        cache_dir (str): directory of the shards
+        version (str): anything that changes the transcripts of unchanged files (e.g. the preprocess mode)
+        n_jobs (int, optional): the number of processes reading changed files (default: the number of CPUs - 1)
+    """
+
+    def __init__(self, cache_dir: str, version: str = "", n_jobs: Optional[int] = None) -> None:
+        self.cache_dir = cache_dir
+        self.version = version
+        self.n_jobs = n_jobs or max(cpu_count() - 1, 1)
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.index = dict()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+
+    def _shard_path(self, key: str, suffix: str = "jsonl") -> str:
+        return os.path.join(self.cache_dir, f"{key}.{suffix}")
+
+    def _listing(self, file_paths: Iterable[str]) -> List[Tuple[str, int, int]]:
+        listing = list()
+        for file_path in sorted(file_paths):
+            stat = os.stat(file_path)
+            listing.append((file_path, stat.st_size, stat.st_mtime_ns))
+        return listing
+
+    def _source_key(self, source: str, listing: list) -> str:
+        sha1 = hashlib.sha1(f"{self.version}|{source}".encode("utf-8"))
+        for file_path, size, mtime_ns in listing:
+            sha1.update(f"\0{file_path}|{size}|{mtime_ns}".encode("utf-8"))
+        return sha1.hexdigest()
+
+    def _read_shard(self, key: str) -> dict:
+        records = dict()
+        shard_path = self._shard_path(key)
+        if os.path.exists(shard_path):
+            with open(shard_path, encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    records[record["file"]] = record
+        return records
+
+    def _write_index(self) -> None:
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def _remove_shards(self, key: str) -> None:
+        for filename in os.listdir(self.cache_dir):
+            if filename.startswith(f"{key}."):
+                os.remove(os.path.join(self.cache_dir, filename))
+
+    def _remove_stale_manifest_shards(self, vocab_digest: str) -> None:
+        suffix = f".{vocab_digest[:16]}.tsv"
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".tsv") and not filename.endswith(suffix):
+                os.remove(os.path.join(self.cache_dir, filename))
+
+    def update(self, source: str, file_paths: Iterable[str], process_file: Callable[[str], list]) -> str:
+        r"""
+        Brings the transcript shard of ``source`` up to date.
+
+        Args:
+            source (str): name of the source (e.g. directory path relative to the dataset)
+            file_paths (iterable): transcript files of the source
+            process_file (callable): picklable function returning the ``(audio_path, transcript)`` pairs of a file
+
+        Returns:
+            key (str): key of the transcript shard
+        """
+        listing = self._listing(file_paths)
+        key = self._source_key(source, listing)
+        if os.path.exists(self._shard_path(key)):
+            if self.index.get(source) != key:
+                self.index[source] = key
+                self._write_index()
+            return key
+
+        previous_key = self.index.get(source)
+        previous = self._read_shard(previous_key) if previous_key is not None else dict()
+        changed = [
+            file_path
+            for file_path, size, mtime_ns in listing
+            if file_path not in previous
+            or (previous[file_path]["size"], previous[file_path]["mtime_ns"]) != (size, mtime_ns)
+        ]
+        logger.info(f"{source}: process {len(changed)} of {len(listing)} files")
+
+        with Parallel(n_jobs=min(self.n_jobs, max(len(changed), 1))) as parallel:
+            processed = dict(zip(changed, parallel(delayed(process_file)(file_path) for file_path in changed)))
+
+        tmp_path = f"{self._shard_path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for file_path, size, mtime_ns in listing:
+                entries = processed[file_path] if file_path in processed else previous[file_path]["entries"]
+                record = {"file": file_path, "size": size, "mtime_ns": mtime_ns, "entries": [list(e) for e in entries]}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self._shard_path(key))
+
+        if previous_key is not None and previous_key != key:
+            self._remove_shards(previous_key)
+        self.index[source] = key
+        self._write_index()
+        return key
+
+    def remove_missing_sources(self, sources: Iterable[str]) -> None:
+        r"""Drops the shards of sources that are not in ``sources`` any more"""
+        sources = set(sources)
+        for source in [source for source in self.index if source not in sources]:
+            self._remove_shards(self.index.pop(source))
+        self._write_index()
+
+    def load_transcripts(self, keys: Iterable[str]) -> Tuple[list, list]:
+        r"""Returns the audio paths and transcripts of transcript shards ``keys``, in order"""
+        audio_paths, transcripts = list(), list()
+        for key in keys:
+            for record in self._read_shard(key).values():
+                for audio_path, transcript in record["entries"]:
+                    audio_paths.append(audio_path)
+                    transcripts.append(transcript)
+        return audio_paths, transcripts
+
+    def write_manifest(
+        self,
+        keys: Iterable[str],
+        manifest_file_path: str,
+        write_manifest_shard: Callable[[list, list, str], None],
+        vocab_digest: str,
+    ) -> None:
+        r"""
+        Writes the manifest of transcript shards ``keys``. Missing manifest shards are written with
+        ``write_manifest_shard(audio_paths, transcripts, shard_path)`` (one of the manifest writers of the dataset).
+
+        Args:
+            keys (iterable): keys of transcript shards, in manifest order
+            manifest_file_path (str): path of manifest file
+            write_manifest_shard (callable): writes the manifest lines of a transcript shard
+            vocab_digest (str): digest of the vocabulary (or tokenizer model) the manifest lines depend on
+        """
+        keys = list(keys)
+        for key in keys:
+            shard_path = self._shard_path(key, f"{vocab_digest[:16]}.tsv")
+            if not os.path.exists(shard_path):
+                audio_paths, transcripts = self.load_transcripts([key])
+                tmp_path = f"{shard_path}.{os.getpid()}.tmp"
+                write_manifest_shard(audio_paths, transcripts, tmp_path)
+                os.replace(tmp_path, shard_path)
+
+        tmp_path = f"{manifest_file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as manifest:
+            for key in keys:
+                with open(self._shard_path(key, f"{vocab_digest[:16]}.tsv"), "rb") as f:
+                    shutil.copyfileobj(f, manifest)
+        os.replace(tmp_path, manifest_file_path)
+        self._remove_stale_manifest_shards(vocab_digest)
+
+        logger.info(f"Manifest of {len(keys)} shards is saved at {manifest_file_path}")
@@ -0,0 +1,266 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import os
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+from openspeech.data.packed import PackedSequences, PackedStrings
+
+BINARY_MANIFEST_MAGIC = b"OSPMANIF"
+BINARY_MANIFEST_VERSION = 1
+BINARY_MANIFEST_SUFFIX = ".bin"
+_ALIGNMENT = 64
+
+
+def parse_manifest_line(line: str) -> Tuple[str, str, str]:
+    r"""Splits a TSV manifest line into ``(audio_path, text, tokens)``"""
+    audio_path, text, tokens = line.rstrip("\n").split("\t")
+    return audio_path, text, tokens
+
+
+def write_binary_manifest(
+    output_path: str,
+    audio_paths: list,
+    texts: list,
+    transcripts: list,
+    audio_lengths: Optional[np.ndarray] = None,
+    sample_rate: Optional[int] = None,
+) -> None:
+    r"""
+    Writes a binary manifest. The file is a JSON header followed by aligned, memory-mappable columns:
+    audio paths and texts (utf-8 bytes + offsets), token ids (int32 + offsets) and audio lengths
+    (number of samples at ``sample_rate``, -1 if unknown).
+
+    Args:
+        output_path (str): path of binary manifest
+        audio_paths (list): list of audio path
+        texts (list): list of raw transcript text
+        transcripts (list): list of transcript, token ids separated by a space (or ``PackedSequences``)
+        audio_lengths (np.ndarray, optional): length of each audio file
+        sample_rate (int, optional): sampling rate the audio lengths are measured in
+    """
+    # packed inputs may be views (``take``) over a larger buffer, so always write compact copies
+    packed_paths = PackedStrings.from_list(list(audio_paths))
+    packed_texts = PackedStrings.from_list(list(texts))
+    if isinstance(transcripts, PackedSequences):
+        packed_tokens = PackedSequences.from_list(list(transcripts))
+    else:
+        packed_tokens = PackedSequences.from_transcripts(transcripts)
+
+    if audio_lengths is None:
+        audio_lengths = np.full(len(packed_paths), -1, dtype=np.int64)
+
+    def offsets(packed):
+        return np.concatenate(([0], packed.ends)).astype(np.int64)
+
+    columns = {
+        "audio_path_data": packed_paths.data,
+        "audio_path_offsets": offsets(packed_paths),
+        "text_data": packed_texts.data,
+        "text_offsets": offsets(packed_texts),
+        "token_data": packed_tokens.data.astype(np.int32),
+        "token_offsets": offsets(packed_tokens),
+        "audio_lengths": np.asarray(audio_lengths, dtype=np.int64),
+    }
+
+    header = {
+        "version": BINARY_MANIFEST_VERSION,
+        "num_rows": len(packed_paths),
+        "sample_rate": sample_rate,
+        "columns": dict(),
+    }
+    position = 0
+    for name, column in columns.items():
+        header["columns"][name] = {"dtype": column.dtype.str, "offset": position, "length": len(column)}
+        position += -(-column.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+    encoded_header = json.dumps(header).encode("utf-8")
+    data_offset = -(-(len(BINARY_MANIFEST_MAGIC) + 8 + len(encoded_header)) // _ALIGNMENT) * _ALIGNMENT
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BINARY_MANIFEST_MAGIC)
+        f.write(struct.pack("<Q", len(encoded_header)))
+        f.write(encoded_header)
+        for name, column in columns.items():
+            f.seek(data_offset + header["columns"][name]["offset"])
+            f.write(np.ascontiguousarray(column).tobytes())
+        f.truncate(data_offset + position)
+    os.replace(tmp_path, output_path)
+
+
+class BinaryManifest(object):
+    r"""
+    Memory-mapped binary manifest written by :func:`write_binary_manifest`. Opening it only reads the header,
+    columns are paged in on access.
+
+    Args:
+        manifest_path (str): path of binary manifest
+
+    Attributes:
+        audio_paths (PackedStrings): audio paths
+        texts (PackedStrings): raw transcript texts
+        tokens (PackedSequences): token ids of transcripts
+        audio_lengths (np.ndarray): length of each audio file (number of samples), -1 if unknown
+        sample_rate (int): sampling rate of ``audio_lengths``, None if unknown
+    """
+
+    def __init__(self, manifest_path: str) -> None:
+        with open(manifest_path, "rb") as f:
+            if f.read(len(BINARY_MANIFEST_MAGIC)) != BINARY_MANIFEST_MAGIC:
+                raise ValueError(f"{manifest_path} is not a binary manifest")
+            (header_length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length).decode("utf-8"))
+
+        if header["version"] != BINARY_MANIFEST_VERSION:
+            raise ValueError(f"Unsupported binary manifest version: {header['version']}")
+
+        data_offset = -(-(len(BINARY_MANIFEST_MAGIC) + 8 + header_length) // _ALIGNMENT) * _ALIGNMENT
+        columns = dict()
+        for name, column in header["columns"].items():
+            if column["length"] == 0:
+                columns[name] = np.zeros(0, dtype=column["dtype"])
+                continue
+            columns[name] = np.memmap(
+                manifest_path,
+                dtype=column["dtype"],
+                mode="r",
+                offset=data_offset + column["offset"],
+                shape=(column["length"],),
+            )
+
+        self.num_rows = header["num_rows"]
+        self.audio_paths = PackedStrings(
+            columns["audio_path_data"], columns["audio_path_offsets"][:-1], columns["audio_path_offsets"][1:]
+        )
+        self.texts = PackedStrings(columns["text_data"], columns["text_offsets"][:-1], columns["text_offsets"][1:])
+        self.tokens = PackedSequences(
+            columns["token_data"], columns["token_offsets"][:-1], columns["token_offsets"][1:]
+        )
+        self.audio_lengths = columns["audio_lengths"]
+        self.sample_rate = header.get("sample_rate")
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+
+def convert_manifest(
+    manifest_file_path: str,
+    output_path: Optional[str] = None,
+    dataset_path: Optional[str] = None,
+    sample_rate: int = 16000,
+    encoding: str = "utf-8",
+) -> str:
+    r"""
+    Converts a TSV manifest (``audio_path \t text \t token ids``) to a binary manifest.
+
+    Args:
+        manifest_file_path (str): path of TSV manifest
+        output_path (str, optional): path of binary manifest (default: ``manifest_file_path + ".bin"``)
+        dataset_path (str, optional): if given, audio lengths are read from the file headers under it
+        sample_rate (int): sampling rate the audio lengths are measured in
+        encoding (str): encoding of TSV manifest
+
+    Returns:
+        output_path (str): path of binary manifest
+    """
+    from openspeech.data.audio.index import load_audio_lengths
+
+    output_path = output_path or manifest_file_path + BINARY_MANIFEST_SUFFIX
+
+    audio_paths, texts, transcripts = list(), list(), list()
+    with open(manifest_file_path, encoding=encoding) as f:
+        for line in f:
+            audio_path, text, tokens = parse_manifest_line(line)
+            audio_paths.append(audio_path)
+            texts.append(text)
+            transcripts.append(tokens)
+
+    audio_lengths = None
+    if dataset_path is not None:
+        audio_lengths = load_audio_lengths(dataset_path, audio_paths, sample_rate)
+
+    write_binary_manifest(output_path, audio_paths, texts, transcripts, audio_lengths, sample_rate=sample_rate)
+    return output_path
+
+
+def find_binary_manifest(manifest_file_path: str) -> Optional[str]:
+    r"""
+    Returns the binary manifest to read instead of ``manifest_file_path``: the path itself if it is a binary
+    manifest, or ``manifest_file_path + ".bin"`` if it exists and is not older than the TSV. Otherwise None.
+    """
+    if manifest_file_path.endswith(BINARY_MANIFEST_SUFFIX):
+        return manifest_file_path
+
+    binary_manifest_path = manifest_file_path + BINARY_MANIFEST_SUFFIX
+    if not os.path.exists(binary_manifest_path):
+        return None
+    if os.path.exists(manifest_file_path) and os.path.getmtime(binary_manifest_path) < os.path.getmtime(
+        manifest_file_path
+    ):
+        return None
+    return binary_manifest_path
+
+
+def load_manifest(
+    manifest_file_path: str,
+    encoding: str = "utf-8",
+    sample_rate: Optional[int] = None,
+) -> Tuple[list, list, Optional[np.ndarray]]:
+    r"""
+    Reads audio paths and transcripts of a manifest. A binary manifest found by :func:`find_binary_manifest`
+    is memory-mapped instead of parsing the TSV, and its audio lengths are returned too, so that they don't have
+    to be read from the audio files.
+
+    Args:
+        manifest_file_path (str): path of manifest
+        encoding (str): encoding of TSV manifest
+        sample_rate (int, optional): sampling rate the audio lengths should be measured in
+
+    Returns:
+        audio_paths (list or PackedStrings): list of audio path
+        transcripts (list or PackedSequences): list of transcript of audio
+        audio_lengths (np.ndarray, optional): length of each audio file, None unless a binary manifest stores the
+            lengths of all files at ``sample_rate``
+    """
+    binary_manifest_path = find_binary_manifest(manifest_file_path)
+    if binary_manifest_path is not None:
+        manifest = BinaryManifest(binary_manifest_path)
+        audio_lengths = None
+        if (sample_rate is None or manifest.sample_rate == sample_rate) and (manifest.audio_lengths >= 0).all():
+            audio_lengths = manifest.audio_lengths
+        return manifest.audio_paths, manifest.tokens, audio_lengths
+
+    audio_paths = list()
+    transcripts = list()
+
+    with open(manifest_file_path, encoding=encoding) as f:
+        for line in f:
+            audio_path, _, transcript = parse_manifest_line(line)
+            audio_paths.append(audio_path)
+            transcripts.append(transcript)
+
+    return audio_paths, transcripts, None
@@ -0,0 +1,130 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+class PackedStrings(object):
+    r"""
+    Sequence of strings stored in one utf-8 byte buffer with start / end offsets. Holds no Python objects per
+    string, so forked DataLoader workers share its pages instead of copying them on refcount updates.
+    ``take`` (and slicing) reorders or repeats strings by indexing the offsets only; the byte buffer is shared.
+
+    Args:
+        data (np.ndarray): utf-8 bytes of all strings (uint8)
+        starts (np.ndarray): start offset of each string (int64)
+        ends (np.ndarray): end offset of each string (int64)
+    """
+
+    def __init__(self, data: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> None:
+        self.data = data
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def from_list(cls, strings: Iterable[str]) -> "PackedStrings":
+        if isinstance(strings, cls):
+            return strings
+        encoded = [string.encode("utf-8") for string in strings]
+        lengths = np.fromiter((len(string) for string in encoded), dtype=np.int64, count=len(encoded))
+        ends = np.cumsum(lengths)
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, ends - lengths, ends)
+
+    def take(self, indices: np.ndarray) -> "PackedStrings":
+        return PackedStrings(self.data, self.starts[indices], self.ends[indices])
+
+    def __getitem__(self, idx: int) -> str:
+        if isinstance(idx, slice):
+            return self.take(idx)
+        return self.data[self.starts[idx] : self.ends[idx]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class PackedSequences(object):
+    r"""
+    Sequence of token id sequences stored in one int32 array with start / end offsets.
+    ``take`` (and slicing) reorders or repeats sequences by indexing the offsets only; the token array is shared.
+
+    Args:
+        data (np.ndarray): token ids of all sequences (int32)
+        starts (np.ndarray): start offset of each sequence (int64)
+        ends (np.ndarray): end offset of each sequence (int64)
+    """
+
+    def __init__(self, data: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> None:
+        self.data = data
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def from_transcripts(cls, transcripts: Iterable[str]) -> "PackedSequences":
+        r"""Packs transcripts of space separated token ids (the manifest format)"""
+        if isinstance(transcripts, cls):
+            return transcripts
+        transcripts = list(transcripts)
+        # an empty transcript is a sequence of no tokens
+        lengths = np.fromiter(
+            (transcript.count(" ") + 1 if transcript else 0 for transcript in transcripts),
+            dtype=np.int64,
+            count=len(transcripts),
+        )
+        joined = " ".join(transcript for transcript in transcripts if transcript)
+        data = np.array(joined.split(" ") if joined else [], dtype=np.int32)
+        ends = np.cumsum(lengths)
+        if len(data) != (ends[-1] if len(ends) else 0):
+            raise ValueError("Transcripts should be token ids separated by a single space.")
+        return cls(data, ends - lengths, ends)
+
+    @classmethod
+    def from_list(cls, sequences: Iterable[Iterable[int]], dtype: Optional[np.dtype] = np.int32) -> "PackedSequences":
+        sequences = [np.asarray(sequence, dtype=dtype) for sequence in sequences]
+        lengths = np.fromiter((len(sequence) for sequence in sequences), dtype=np.int64, count=len(sequences))
+        ends = np.cumsum(lengths)
+        data = np.concatenate(sequences) if sequences else np.zeros(0, dtype=dtype)
+        return cls(data, ends - lengths, ends)
+
+    def take(self, indices: np.ndarray) -> "PackedSequences":
+        return PackedSequences(self.data, self.starts[indices], self.ends[indices])
+
+    def lengths(self) -> np.ndarray:
+        return self.ends - self.starts
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        if isinstance(idx, slice):
+            return self.take(idx)
+        return self.data[self.starts[idx] : self.ends[idx]]
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __len__(self) -> int:
+        return len(self.starts)
@@ -20,15 +20,137 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import logging
 import os
+from typing import Optional, Tuple
 
 import numpy as np
+import torch.distributed as dist
+from omegaconf import DictConfig
 from torch.utils.data import Sampler
 
-from .audio.load import load_audio
+from .audio.load import get_audio_length
 
+logger = logging.getLogger(__name__)
 
-class RandomSampler(Sampler):
+
+class ResumableBatchSampler(Sampler):
+    r"""
+    Super class of batch samplers whose progress can be saved in checkpoints. The state holds the seed, the epoch,
+    the order of bins in the epoch and the number of batches of the epoch already consumed (``position``).
+    After :meth:`load_state_dict`, the next iteration continues the interrupted epoch from the first unseen batch
+    without touching the skipped data.
+
+    ``position`` counts consumed batches, not batches handed to the DataLoader (which prefetches ahead), so it is
+    advanced by the training loop through :meth:`advance` (see ``SamplerStateCallback``).
+
+    With ``num_replicas`` > 1, every rank iterates a disjoint share of the bins of the same order. Shares have the
+    same number of bins, so the epoch is padded with bins from its start (or truncated when ``drop_last``).
+
+    Note:
+        Do not use this class directly, use one of the sub classes.
+    """
+
+    def _init_state(self, seed: int = 1, num_replicas: int = 1, rank: int = 0) -> None:
+        if not 0 <= rank < num_replicas:
+            raise ValueError(f"Invalid rank {rank}, rank should be in the interval [0, {num_replicas - 1}]")
+        self.seed = seed
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.epoch = 0
+        self.position = 0
+        self.bin_order = self._rank_share(np.arange(len(self.bins)))
+        self._resume_position = 0
+        self._resume_bin_order = None
+
+    def _epoch_bin_order(self) -> np.ndarray:
+        r"""Returns the order of bins of ``self.epoch``"""
+        return self.bin_order
+
+    def _num_rank_bins(self, num_bins: Optional[int] = None) -> int:
+        r"""Returns the number of bins of each rank, out of ``num_bins`` bins (default: ``len(self.bins)``)"""
+        num_bins = len(self.bins) if num_bins is None else num_bins
+        if self.drop_last:
+            return num_bins // self.num_replicas
+        return -(-num_bins // self.num_replicas)
+
+    def _rank_share(self, order: np.ndarray) -> np.ndarray:
+        r"""Returns the share of this rank of the bins of ``order``"""
+        if self.num_replicas == 1:
+            return order
+        return np.resize(order, self._num_rank_bins() * self.num_replicas)[self.rank :: self.num_replicas]
+
+    def _shuffle_ids(self, ids: list) -> list:
+        np.random.shuffle(ids)
+        return ids
+
+    def _start_epoch(self) -> Tuple[np.ndarray, int]:
+        r"""Returns the order of bins of the epoch to iterate and the position to start from"""
+        bin_order = self._epoch_bin_order()
+        if self._resume_bin_order is not None:
+            bin_order = self._resume_bin_order
+
+        self.bin_order = bin_order
+        self.position = self._resume_position
+        self._resume_position, self._resume_bin_order = 0, None
+        return bin_order, self.position
+
+    def __iter__(self):
+        bin_order, start = self._start_epoch()
+        self.epoch += 1
+
+        for position, bin_idx in enumerate(bin_order.tolist()):
+            ids = self._shuffle_ids(list(self.bins[bin_idx]))
+            if position >= start:
+                yield ids
+
+    def __len__(self):
+        return self._num_rank_bins()
+
+    def advance(self, num_batches: int = 1) -> None:
+        r"""Marks ``num_batches`` more batches of the current epoch as consumed"""
+        self.position += num_batches
+
+    def state_dict(self) -> dict:
+        r"""
+        Returns the sampler state. ``epoch`` is the epoch in progress (the last one iterated),
+        and ``position`` the number of its batches consumed.
+        """
+        return {
+            "seed": self.seed,
+            "epoch": max(self.epoch - 1, 0),
+            "position": self.position,
+            "bin_order": np.asarray(self.bin_order).tolist(),
+        }
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        r"""Restores a state of :meth:`state_dict`. The next iteration resumes from the first unseen batch."""
+        bin_order = np.asarray(state_dict["bin_order"], dtype=np.int64)
+
+        if state_dict["seed"] == self.seed:
+            # bins of samplers packing every epoch depend on the epoch
+            self.epoch = state_dict["epoch"]
+            epoch_bin_order = self._epoch_bin_order()
+            if self.num_replicas > 1:
+                # checkpoints hold the share of rank 0, every rank rebuilds its own
+                bin_order = epoch_bin_order
+
+        if state_dict["seed"] != self.seed or len(bin_order) != len(self):
+            logger.warning("Sampler state does not match the dataset. Restart the epoch from the first batch.")
+            self.epoch = state_dict["epoch"]
+            return
+
+        self.bin_order = bin_order
+        if state_dict["position"] >= len(bin_order):
+            self.epoch = state_dict["epoch"] + 1
+            return
+
+        self.epoch = state_dict["epoch"]
+        self._resume_position = state_dict["position"]
+        self._resume_bin_order = bin_order
+
+
+class RandomSampler(ResumableBatchSampler):
     r"""
     Implementation of a Random Sampler for sampling the dataset.
 
@@ -36,44 +158,59 @@ class RandomSampler(Sampler):
         data_source (torch.utils.data.Dataset): dataset to sample from
         batch_size (int): size of batch
         drop_last (bool): flat indication whether to drop last batch or not
+        num_replicas (int): the number of distributed ranks sharing the dataset
+        rank (int): rank of this process
     """
 
-    def __init__(self, data_source, batch_size: int = 32, drop_last: bool = False) -> None:
+    def __init__(
+        self,
+        data_source,
+        batch_size: int = 32,
+        drop_last: bool = False,
+        num_replicas: int = 1,
+        rank: int = 0,
+    ) -> None:
         super(RandomSampler, self).__init__(data_source)
         self.batch_size = batch_size
         self.data_source = data_source
         ids = list(range(0, len(data_source)))
         self.bins = [ids[i : i + batch_size] for i in range(0, len(ids), batch_size)]
         self.drop_last = drop_last
-
-    def __iter__(self):
-        for ids in self.bins:
-            np.random.shuffle(ids)
-            yield ids
-
-    def __len__(self):
-        return len(self.bins)
+        self._init_state(num_replicas=num_replicas, rank=rank)
 
     def shuffle(self, epoch):
-        np.random.shuffle(self.bins)
+        np.random.shuffle(self.bin_order)
 
 
-class SmartBatchingSampler(Sampler):
+class SmartBatchingSampler(ResumableBatchSampler):
     """
-    Batching with similar sequence length.
+    Batching with similar sequence length. Lengths are taken from ``data_source.audio_lengths`` if the dataset
+    provides them, otherwise they are read from the file headers.
 
     Args:
         data_source (torch.utils.data.Dataset): dataset to sample from
         batch_size (int): size of batch
         drop_last (bool): flat indication whether to drop last batch or not
+        num_replicas (int): the number of distributed ranks sharing the dataset
+        rank (int): rank of this process
     """
 
-    def __init__(self, data_source, batch_size: int = 32, drop_last: bool = False) -> None:
+    def __init__(
+        self,
+        data_source,
+        batch_size: int = 32,
+        drop_last: bool = False,
+        num_replicas: int = 1,
+        rank: int = 0,
+    ) -> None:
         super(SmartBatchingSampler, self).__init__(data_source)
         self.batch_size = batch_size
         self.data_source = data_source
 
-        audio_lengths = [self._get_audio_length(audio_path) for audio_path in data_source.audio_paths]
+        if getattr(data_source, "audio_lengths", None) is not None:
+            audio_lengths = data_source.audio_lengths
+        else:
+            audio_lengths = [self._get_audio_length(audio_path) for audio_path in data_source.audio_paths]
         audio_indices = [idx for idx in range(len(data_source.audio_paths))]
 
         pack_by_length = list(zip(audio_lengths, audio_indices))
@@ -82,17 +219,242 @@ class SmartBatchingSampler(Sampler):
 
         self.bins = [audio_indices[i : i + batch_size] for i in range(0, len(audio_indices), batch_size)]
         self.drop_last = drop_last
+        self._init_state(num_replicas=num_replicas, rank=rank)
 
-    def __iter__(self):
-        for ids in self.bins:
-            np.random.shuffle(list(ids))
-            yield ids
+    def _shuffle_ids(self, ids: list) -> list:
+        return ids
 
     def _get_audio_length(self, audio_path):
-        return len(load_audio(os.path.join(self.data_source.dataset_path, audio_path), sample_rate=16000))
+        audio_reader = getattr(self.data_source, "audio_reader", None)
+        length_fn = audio_reader.get_audio_length if audio_reader is not None else get_audio_length
+        return length_fn(os.path.join(self.data_source.dataset_path, audio_path), self.data_source.sample_rate)
 
-    def __len__(self):
-        return len(self.bins)
+    def shuffle(self, epoch):
+        np.random.shuffle(self.bin_order)
+
+
+class BucketingSampler(ResumableBatchSampler):
+    r"""
+    Batching with a budget of feature frames (and target tokens) instead of a fixed batch size.
+
+    Utterances are sorted by length and split into ``num_buckets`` buckets of similar length. Each bucket is
+    shuffled and packed greedily: a batch is closed when adding the next utterance would exceed ``max_frames``
+    padded frames (``batch size * longest utterance``) or ``max_tokens`` padded target tokens. Short utterances
+    therefore end up in large batches and long utterances in small ones. Every epoch, the buckets are re-shuffled
+    and re-packed and the order of batches is shuffled across buckets, all seeded by ``seed + epoch``, so the
+    number of batches may differ slightly between epochs.
+
+    Args:
+        data_source (torch.utils.data.Dataset): dataset to sample from
+        max_frames (int): maximum number of padded feature frames in a batch
+        max_tokens (int, optional): maximum number of padded target tokens in a batch
+        num_buckets (int): the number of length buckets
+        seed (int): seed for shuffling
+        drop_last (bool): flat indication whether to drop last batch or not
+    """
+
+    def __init__(
+        self,
+        data_source,
+        max_frames: int = 20000,
+        max_tokens: Optional[int] = None,
+        num_buckets: int = 30,
+        seed: int = 1,
+        drop_last: bool = False,
+    ) -> None:
+        super(BucketingSampler, self).__init__(data_source)
+        self.data_source = data_source
+        self.max_frames = max_frames
+        self.max_tokens = max_tokens
+        self.num_buckets = num_buckets
+        self.drop_last = drop_last
+
+        self.feature_lengths = np.asarray(data_source.get_feature_lengths())
+        self.target_lengths = np.asarray(data_source.get_target_lengths())
+
+        self.seed = seed
+        self._packing = None
+        self.bins = self._epoch_packing(0)[0]
+        self._init_state(seed)
+        self._rng = None
+
+    def _pack_epoch(self, rng: np.random.RandomState) -> list:
+        r"""Splits the utterances into length buckets, shuffles each bucket and packs it into bins"""
+        # random key breaks ties between equal lengths, so the buckets differ between epochs
+        sort_by_length = np.lexsort((rng.random_sample(len(self.feature_lengths)), self.feature_lengths))
+
+        bins = list()
+        for bucket in np.array_split(sort_by_length, min(self.num_buckets, max(len(sort_by_length), 1))):
+            rng.shuffle(bucket)
+            bins.extend(self._pack(bucket, self.feature_lengths, self.target_lengths))
+        return bins
+
+    def _pack(self, bucket: np.ndarray, feature_lengths: np.ndarray, target_lengths: np.ndarray) -> list:
+        bins = list()
+        ids = list()
+        max_feature_length = max_target_length = 0
+
+        for idx in bucket.tolist():
+            feature_length = max(max_feature_length, feature_lengths[idx])
+            target_length = max(max_target_length, target_lengths[idx])
+
+            over_frames = feature_length * (len(ids) + 1) > self.max_frames
+            over_tokens = self.max_tokens is not None and target_length * (len(ids) + 1) > self.max_tokens
+
+            if ids and (over_frames or over_tokens):
+                bins.append(ids)
+                ids = list()
+                feature_length = feature_lengths[idx]
+                target_length = target_lengths[idx]
+
+            ids.append(idx)
+            max_feature_length, max_target_length = feature_length, target_length
+
+        if ids:
+            bins.append(ids)
+
+        return bins
+
+    def _epoch_packing(self, epoch: int) -> Tuple[list, np.ndarray, tuple]:
+        r"""
+        Returns the bins of ``epoch``, their order and the random state to shuffle the batches with. The packing is
+        cached, so ``len()`` can be queried before the epoch is iterated without repacking it twice.
+        """
+        if self._packing is None or self._packing[0] != epoch:
+            rng = np.random.RandomState(self.seed + epoch)
+            bins = self._pack_epoch(rng)
+            order = rng.permutation(len(bins))
+            self._packing = (epoch, bins, order, rng.get_state())
+        return self._packing[1:]
+
+    def _epoch_bin_order(self) -> np.ndarray:
+        self.bins, order, rng_state = self._epoch_packing(self.epoch)
+        self._rng = np.random.RandomState()
+        self._rng.set_state(rng_state)
+        return order.copy()
+
+    def _shuffle_ids(self, ids: list) -> list:
+        self._rng.shuffle(ids)
+        return ids
 
     def shuffle(self, epoch):
-        np.random.shuffle(self.bins)
+        self.epoch = epoch
+
+    def __len__(self):
+        # the bins are re-packed every epoch, count the ones of the epoch to iterate next
+        return self._num_rank_bins(len(self._epoch_packing(self.epoch)[0]))
+
+
+class DistributedBucketingSampler(BucketingSampler):
+    r"""
+    ``BucketingSampler`` for multi-process training. Every rank builds the same bins and the same epoch order from
+    the shared seed, then takes a disjoint share of the batches. The shares are balanced by padded feature frames
+    (``batch size * longest utterance``) instead of batch count: batches are handed out from the most expensive
+    one to the rank with the fewest frames so far, and every rank gets the same number of batches so the ranks
+    stay in step. If the number of batches does not divide by the number of ranks, the epoch is padded with
+    batches from its start (or truncated when ``drop_last``).
+
+    Args:
+        data_source (torch.utils.data.Dataset): dataset to sample from
+        max_frames (int): maximum number of padded feature frames in a batch
+        max_tokens (int, optional): maximum number of padded target tokens in a batch
+        num_buckets (int): the number of length buckets
+        num_replicas (int, optional): the number of ranks (default: world size of the default process group)
+        rank (int, optional): rank of this process (default: rank in the default process group)
+        seed (int): seed for shuffling, must be the same on every rank
+        drop_last (bool): drop the tail batches instead of padding the epoch
+    """
+
+    def __init__(
+        self,
+        data_source,
+        max_frames: int = 20000,
+        max_tokens: Optional[int] = None,
+        num_buckets: int = 30,
+        num_replicas: Optional[int] = None,
+        rank: Optional[int] = None,
+        seed: int = 1,
+        drop_last: bool = False,
+    ) -> None:
+        super(DistributedBucketingSampler, self).__init__(
+            data_source,
+            max_frames=max_frames,
+            max_tokens=max_tokens,
+            num_buckets=num_buckets,
+            seed=seed,
+            drop_last=drop_last,
+        )
+        if num_replicas is None or rank is None:
+            if not (dist.is_available() and dist.is_initialized()):
+                raise RuntimeError("DistributedBucketingSampler requires an initialized process group")
+            num_replicas = dist.get_world_size() if num_replicas is None else num_replicas
+            rank = dist.get_rank() if rank is None else rank
+        if not 0 <= rank < num_replicas:
+            raise ValueError(f"Invalid rank {rank}, rank should be in the interval [0, {num_replicas - 1}]")
+
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.bin_order = self._epoch_bin_order()
+
+    def _partition(self, order: np.ndarray) -> list:
+        r"""Splits the bins of ``order`` into ``num_replicas`` shares of ``num_bins`` bins with balanced frames."""
+        loads = np.zeros(self.num_replicas, dtype=np.int64)
+        counts = np.zeros(self.num_replicas, dtype=np.int64)
+        positions = [list() for _ in range(self.num_replicas)]
+
+        for position in np.argsort(-self.bin_frames[order], kind="stable").tolist():
+            rank = int(np.argmin(np.where(counts < self.num_bins, loads, np.iinfo(np.int64).max)))
+            loads[rank] += self.bin_frames[order[position]]
+            counts[rank] += 1
+            positions[rank].append(position)
+
+        # keep the shuffled epoch order within each share
+        return [order[sorted(share)] for share in positions]
+
+    def _epoch_bin_order(self) -> np.ndarray:
+        order = super(DistributedBucketingSampler, self)._epoch_bin_order()
+        self.bin_frames = np.array([self.feature_lengths[ids].max() * len(ids) for ids in self.bins], dtype=np.int64)
+        self.num_bins = self._num_rank_bins()
+
+        order = np.resize(order, self.num_bins * self.num_replicas)
+        return self._partition(order)[self.rank]
+
+
+def build_sampler(configs: DictConfig, data_source) -> Sampler:
+    r"""
+    Returns the batch sampler selected by ``configs.trainer.sampler``.
+
+    Args:
+        configs (DictConfig): configuraion set
+        data_source (torch.utils.data.Dataset): dataset to sample from
+
+    Returns:
+        sampler (Sampler): ``BucketingSampler`` for `bucketing` (``DistributedBucketingSampler`` when a process
+            group of more than one rank is initialized), ``SmartBatchingSampler`` for `smart`,
+            ``RandomSampler`` otherwise. Under distributed training, every rank samples its own share of the dataset.
+    """
+    num_replicas, rank = 1, 0
+    if dist.is_available() and dist.is_initialized():
+        num_replicas, rank = dist.get_world_size(), dist.get_rank()
+
+    if configs.trainer.sampler == "bucketing":
+        if num_replicas > 1:
+            return DistributedBucketingSampler(
+                data_source,
+                max_frames=configs.trainer.max_frames,
+                max_tokens=configs.trainer.max_tokens,
+                num_buckets=configs.trainer.num_buckets,
+                seed=configs.trainer.seed,
+            )
+        return BucketingSampler(
+            data_source,
+            max_frames=configs.trainer.max_frames,
+            max_tokens=configs.trainer.max_tokens,
+            num_buckets=configs.trainer.num_buckets,
+            seed=configs.trainer.seed,
+        )
+    elif configs.trainer.sampler == "smart":
+        return SmartBatchingSampler(
+            data_source, batch_size=configs.trainer.batch_size, num_replicas=num_replicas, rank=rank
+        )
+    return RandomSampler(data_source, batch_size=configs.trainer.batch_size, num_replicas=num_replicas, rank=rank)
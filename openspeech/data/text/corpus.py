@@ -0,0 +1,164 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Optional, Tuple
+
+import numpy as np
+
+from openspeech.data.packed import PackedSequences
+
+logger = logging.getLogger(__name__)
+
+# bump when the token ids a tokenizer produces change, so that corpora tokenized before are rebuilt
+TOKENIZED_CORPUS_VERSION = 2
+
+_tokenizer = None
+
+
+def _init_worker(tokenizer) -> None:
+    global _tokenizer
+    _tokenizer = tokenizer
+
+
+def _tokenize_lines(lines: list) -> Tuple[np.ndarray, np.ndarray]:
+    values, offsets = _tokenizer.encode_batch([line.rstrip("\n") for line in lines], ragged=True)
+    lengths = np.diff(offsets)
+    return values.astype(np.int32), lengths[lengths > 0]
+
+
+def _fingerprint(corpus_path: str, tokenizer) -> str:
+    stat = os.stat(corpus_path)
+    vocab_size = len(tokenizer) if hasattr(tokenizer, "__len__") else None
+    return hashlib.sha1(
+        f"{TOKENIZED_CORPUS_VERSION}|{os.path.abspath(corpus_path)}|{stat.st_size}|{stat.st_mtime_ns}|"
+        f"{type(tokenizer).__module__}.{type(tokenizer).__qualname__}|{vocab_size}".encode("utf-8")
+    ).hexdigest()
+
+
+def tokenize_corpus(
+    corpus_path: str,
+    tokenizer,
+    output_path: Optional[str] = None,
+    encoding: str = "utf-8",
+    num_workers: Optional[int] = None,
+    chunk_size: int = 10000,
+) -> str:
+    r"""
+    Tokenizes a text corpus (one sentence per line) once, in parallel, into an int32 token stream
+    (``<output_path>.bin``) and the sentence offsets (``<output_path>.idx.npz``). Chunks of ``chunk_size`` lines
+    are tokenized by a process pool and written in corpus order, so memory does not grow with the corpus size.
+    Lines that tokenize to nothing are skipped.
+
+    Args:
+        corpus_path (str): path of text corpus
+        tokenizer (Tokenizer): tokenizer converting sentences to token ids (see ``Tokenizer.encode_batch``)
+        output_path (str, optional): path prefix of the tokenized corpus (default: ``<corpus_path>.tokens``)
+        encoding (str): encoding of text corpus
+        num_workers (int, optional): the number of processes (default: the number of CPUs)
+        chunk_size (int): the number of lines tokenized per task
+
+    Returns:
+        output_path (str): path prefix of the tokenized corpus
+    """
+    if output_path is None:
+        output_path = f"{corpus_path}.tokens"
+
+    num_workers = num_workers or os.cpu_count() or 1
+    fingerprint = _fingerprint(corpus_path, tokenizer)
+    lengths = list()
+
+    data_tmp_path = f"{output_path}.bin.{os.getpid()}.tmp"
+    with open(corpus_path, encoding=encoding) as corpus, open(data_tmp_path, "wb") as f, ProcessPoolExecutor(
+        max_workers=num_workers, initializer=_init_worker, initargs=(tokenizer,)
+    ) as executor:
+        pending = deque()
+        while True:
+            lines = list(islice(corpus, chunk_size))
+            if lines:
+                pending.append(executor.submit(_tokenize_lines, lines))
+            if pending and (not lines or len(pending) >= 2 * num_workers):
+                data, chunk_lengths = pending.popleft().result()
+                f.write(data.tobytes())
+                lengths.append(chunk_lengths)
+            if not lines and not pending:
+                break
+
+    lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    index_tmp_path = f"{output_path}.idx.{os.getpid()}.tmp.npz"
+    np.savez(index_tmp_path, offsets=offsets, fingerprint=np.array(fingerprint))
+    os.replace(data_tmp_path, f"{output_path}.bin")
+    os.replace(index_tmp_path, f"{output_path}.idx.npz")
+
+    logger.info(f"{len(lengths)} sentences ({offsets[-1]} tokens) are saved at {output_path}")
+    return output_path
+
+
+def load_tokenized_corpus(output_path: str) -> PackedSequences:
+    r"""
+    Opens a corpus written by :func:`tokenize_corpus`. The token stream is memory-mapped, so DataLoader workers
+    share its pages.
+
+    Returns:
+        sentences (PackedSequences): token ids of every sentence
+    """
+    with np.load(f"{output_path}.idx.npz") as index:
+        offsets = index["offsets"]
+
+    if offsets[-1] == 0:
+        data = np.zeros(0, dtype=np.int32)
+    else:
+        data = np.memmap(f"{output_path}.bin", dtype=np.int32, mode="r")
+
+    return PackedSequences(data, offsets[:-1], offsets[1:])
+
+
+def load_or_tokenize_corpus(
+    corpus_path: str,
+    tokenizer,
+    output_path: Optional[str] = None,
+    encoding: str = "utf-8",
+    num_workers: Optional[int] = None,
+) -> PackedSequences:
+    r"""
+    Loads the tokenized corpus of ``corpus_path``, tokenizing it first if it is missing or out of date
+    (the corpus file or the tokenizer changed).
+    """
+    if output_path is None:
+        output_path = f"{corpus_path}.tokens"
+
+    if os.path.exists(f"{output_path}.idx.npz"):
+        with np.load(f"{output_path}.idx.npz") as index:
+            if str(index["fingerprint"]) == _fingerprint(corpus_path, tokenizer):
+                return load_tokenized_corpus(output_path)
+        logger.info(f"{output_path} is out of date. Tokenize corpus again..")
+
+    tokenize_corpus(corpus_path, tokenizer, output_path, encoding=encoding, num_workers=num_workers)
+    return load_tokenized_corpus(output_path)
@@ -22,9 +22,12 @@
 
 import logging
 
+import numpy as np
 import torch
 from torch.utils.data import Dataset
 
+from openspeech.data.packed import PackedSequences
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,7 +36,8 @@ class TextDataset(Dataset):
     Dataset for language modeling.
 
     Args:
-        transcripts (list): list of transcript
+        transcripts (list): list of transcript, or ``PackedSequences`` of token ids of a tokenized corpus
+            (see ``openspeech.data.text.corpus``), which are used without tokenizing again
         tokenizer (Tokenizer): tokenizer is in charge of preparing the inputs for a model.
     """
 
@@ -44,34 +48,71 @@ class TextDataset(Dataset):
         self.sos_id = tokenizer.sos_id
         self.eos_id = tokenizer.eos_id
 
-    def _get_inputs(self, transcript):
-        tokens = transcript.split(" ")
-        transcript = [int(self.sos_id)]
+    def __getitem__(self, idx):
+        if isinstance(self.transcripts, PackedSequences):
+            tokens = self.transcripts[idx]
+        else:
+            tokens = self.tokenizer.encode_batch([self.transcripts[idx]])[0]
+
+        tokens = torch.from_numpy(tokens.astype(np.int64))
+        inputs = torch.cat((torch.LongTensor([self.sos_id]), tokens))
+        targets = torch.cat((tokens, torch.LongTensor([self.eos_id])))
+        return inputs, targets
+
+    def __len__(self):
+        return len(self.transcripts)
+
+    def count(self):
+        return len(self.transcripts)
+
 
-        for token in tokens:
-            transcript.append(int(token))
+class PackedTextDataset(Dataset):
+    r"""
+    Dataset for language modeling that packs consecutive sentences into blocks of ``block_size`` tokens,
+    so batches carry no padding except in the last block. Sentences are joined into one stream with ``eos``
+    after every sentence; item ``i`` is the ``i``-th block of the stream as inputs and the same block shifted by
+    one token as targets. The stream is never materialized: blocks are gathered from the sentences they overlap.
 
-        return transcript
+    Args:
+        sentences (PackedSequences): token ids of every sentence (see ``openspeech.data.text.corpus``)
+        tokenizer (Tokenizer): tokenizer is in charge of preparing the inputs for a model.
+        block_size (int): the number of input tokens of a block
+    """
 
-    def _get_targets(self, transcript):
-        tokens = transcript.split(" ")
-        transcript = list()
+    def __init__(self, sentences: PackedSequences, tokenizer, block_size: int = 512):
+        super(PackedTextDataset, self).__init__()
+        if block_size < 1:
+            raise ValueError(f"block_size should be positive, got {block_size}")
+        self.sentences = sentences
+        self.tokenizer = tokenizer
+        self.block_size = block_size
+        self.eos_id = tokenizer.eos_id
+        # end of every sentence (with its eos) in the stream
+        self.stream_ends = np.cumsum(sentences.lengths() + 1)
+        self.num_tokens = int(self.stream_ends[-1]) if len(self.stream_ends) else 0
 
-        for token in tokens:
-            transcript.append(int(token))
+    def _read(self, start: int, stop: int) -> np.ndarray:
+        r"""Returns tokens ``[start, stop)`` of the stream"""
+        pieces = list()
+        idx = int(np.searchsorted(self.stream_ends, start, side="right"))
 
-        transcript.append(int(self.eos_id))
+        while start < stop:
+            sentence_start = int(self.stream_ends[idx]) - len(self.sentences[idx]) - 1
+            sentence = np.append(self.sentences[idx], self.eos_id)
+            piece = sentence[start - sentence_start : stop - sentence_start]
+            pieces.append(piece)
+            start += len(piece)
+            idx += 1
 
-        return transcript
+        return np.concatenate(pieces).astype(np.int64)
 
     def __getitem__(self, idx):
-        transcript = self.tokenizer(self.transcripts[idx])
-        inputs = torch.LongTensor(self._get_inputs(transcript))
-        targets = torch.LongTensor(self._get_targets(transcript))
-        return inputs, targets
+        start = idx * self.block_size
+        block = torch.from_numpy(self._read(start, min(start + self.block_size + 1, self.num_tokens)))
+        return block[:-1], block[1:]
 
     def __len__(self):
-        return len(self.transcripts)
+        return -(-max(self.num_tokens - 1, 0) // self.block_size)
 
     def count(self):
-        return len(self.transcripts)
+        return len(self)
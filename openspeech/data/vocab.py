@@ -0,0 +1,112 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SPECIAL_TOKENS = ["<pad>", "<sos>", "<eos>", "<blank>"]
+
+
+def _count_shard(transcripts: list, split: Optional[Callable[[str], list]] = None) -> Counter:
+    if split is None:
+        return Counter("".join(transcripts))
+    counter = Counter()
+    for transcript in transcripts:
+        counter.update(split(transcript))
+    return counter
+
+
+def count_units(
+    transcripts: Iterable[str],
+    split: Optional[Callable[[str], list]] = None,
+    num_workers: Optional[int] = None,
+    shard_size: int = 50000,
+) -> Counter:
+    r"""
+    Counts the units of transcripts: shards of ``shard_size`` transcripts are counted in worker processes and the
+    counters are merged. Small inputs are counted in the calling process.
+
+    Args:
+        transcripts (iterable): transcripts
+        split (callable, optional): picklable function splitting a transcript into units (default: characters)
+        num_workers (int, optional): the number of worker processes (default: the number of CPUs)
+        shard_size (int): the number of transcripts counted per task
+
+    Returns:
+        counter (Counter): frequency of every unit
+    """
+    transcripts = list(transcripts)
+    shards = [transcripts[i : i + shard_size] for i in range(0, len(transcripts), shard_size)]
+
+    if len(shards) <= 1 or num_workers == 1:
+        return _count_shard(transcripts, split)
+
+    counter = Counter()
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        for shard_counter in executor.map(partial(_count_shard, split=split), shards):
+            counter.update(shard_counter)
+    return counter
+
+
+def generate_vocab_labels(
+    transcripts: Iterable[str],
+    vocab_path: str,
+    unit_column: str = "char",
+    max_size: Optional[int] = None,
+    split: Optional[Callable[[str], list]] = None,
+    num_workers: Optional[int] = None,
+) -> None:
+    r"""
+    Writes the vocabulary csv of transcripts: the special tokens (``<pad>``, ``<sos>``, ``<eos>``, ``<blank>``)
+    followed by the units sorted by descending frequency (ties by descending unit), with ``id``, ``unit_column``
+    and ``freq`` columns.
+
+    Args:
+        transcripts (iterable): transcripts
+        vocab_path (str): path of vocabulary csv
+        unit_column (str): name of the unit column (e.g. `char`, `grpm`)
+        max_size (int, optional): maximum number of rows, special tokens included
+        split (callable, optional): picklable function splitting a transcript into units (default: characters)
+        num_workers (int, optional): the number of worker processes (default: the number of CPUs)
+    """
+    counter = count_units(transcripts, split=split, num_workers=num_workers)
+    units = sorted(counter.items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    label = {
+        "id": list(range(len(SPECIAL_TOKENS) + len(units))),
+        unit_column: SPECIAL_TOKENS + [unit for unit, _ in units],
+        "freq": [0] * len(SPECIAL_TOKENS) + [freq for _, freq in units],
+    }
+    if max_size is not None:
+        label = {key: values[:max_size] for key, values in label.items()}
+
+    label_df = pd.DataFrame(label)
+    label_df.to_csv(vocab_path, encoding="utf-8", index=False)
+
+    logger.info(f"Vocabulary of {len(label_df)} units is saved at {vocab_path}")
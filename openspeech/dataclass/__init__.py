@@ -22,6 +22,7 @@
 
 from .configurations import (
     AIShellConfigs,
+    AudioFeatureConfigs,
     AugmentConfigs,
     CPUResumeTrainerConfigs,
     CPUTrainerConfigs,
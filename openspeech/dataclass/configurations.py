@@ -74,6 +74,13 @@ class LibriSpeechConfigs(OpenspeechDataclass):
     manifest_file_path: str = field(
         default="../../../LibriSpeech/libri_subword_manifest.txt", metadata={"help": "Path of manifest file"}
     )
+    archive_index: bool = field(
+        default=False,
+        metadata={
+            "help": "Flag indication whether to read audio from the LibriSpeech tar archives in `dataset_path` "
+            "instead of extracting them. Compressed archives are decompressed once and indexed by member offset"
+        },
+    )
 
 
 @dataclass
@@ -95,6 +102,14 @@ class KsponSpeechConfigs(OpenspeechDataclass):
         default="phonetic",
         metadata={"help": "KsponSpeech preprocess mode {phonetic, spelling}"},
     )
+    incremental_manifest: bool = field(
+        default=False,
+        metadata={
+            "help": "Flag indication whether to update the manifest incrementally on every run, preprocessing only "
+            "new or changed transcript files. The vocabulary is built once, delete it to rebuild"
+        },
+    )
+
 
 @dataclass
 class ForeignKoreanConfigs(OpenspeechDataclass):
@@ -115,6 +130,14 @@ class ForeignKoreanConfigs(OpenspeechDataclass):
         default="chracter",
         metadata={"help": "KsponSpeech preprocess mode (character)"},
     )
+    incremental_manifest: bool = field(
+        default=False,
+        metadata={
+            "help": "Flag indication whether to update the manifest incrementally on every run, preprocessing only "
+            "new or changed transcript files. The vocabulary is built once, delete it to rebuild"
+        },
+    )
+
 
 @dataclass
 class AIShellConfigs(OpenspeechDataclass):
@@ -140,6 +163,23 @@ class LMConfigs(OpenspeechDataclass):
     dataset_path: str = field(default=MISSING, metadata={"help": "Path of dataset"})
     valid_ratio: float = field(default=0.05, metadata={"help": "Ratio of validation data"})
     test_ratio: float = field(default=0.05, metadata={"help": "Ratio of test data"})
+    pretokenize: bool = field(
+        default=False,
+        metadata={
+            "help": "Flag indication whether to tokenize the corpus once into a memory-mapped token stream "
+            "instead of tokenizing every sentence each time it is seen"
+        },
+    )
+    tokenized_corpus_path: Optional[str] = field(
+        default=None, metadata={"help": "Path prefix of tokenized corpus (default: dataset_path + .tokens)"}
+    )
+    block_size: Optional[int] = field(
+        default=None,
+        metadata={
+            "help": "Pack consecutive sentences into blocks of block_size tokens to avoid padding. "
+            "Requires `pretokenize`. None keeps one sentence per sample"
+        },
+    )
 
 
 @dataclass
@@ -170,10 +210,62 @@ class AugmentConfigs(OpenspeechDataclass):
     )
     freq_mask_num: int = field(default=2, metadata={"help": "How many freq-masked area to make"})
     time_mask_num: int = field(default=4, metadata={"help": "How many time-masked area to make"})
+    time_mask_ratio: float = field(
+        default=0.05, metadata={"help": "Maximum time-masked length relative to the utterance length (batch)"}
+    )
+    apply_batch_spec_augment: bool = field(
+        default=False,
+        metadata={
+            "help": "Flag indication whether to apply vectorized spec augment to every training batch "
+            "on the model device, instead of duplicating the dataset."
+        },
+    )
     noise_dataset_dir: str = field(default="None", metadata={"help": "How many time-masked area to make"})
     noise_level: float = field(default=0.7, metadata={"help": "Noise adjustment level"})
+    noise_bank_path: str = field(
+        default="None",
+        metadata={
+            "help": "Path prefix of the memory-mapped noise bank. "
+            "If None, `noise_bank.<sample_rate>.<dtype>` in `noise_dataset_dir` is used."
+        },
+    )
+    noise_bank_dtype: str = field(default="int16", metadata={"help": "Storage dtype of noise bank (int16, float32)"})
+    noise_min_snr: Optional[float] = field(
+        default=None, metadata={"help": "Minimum SNR (dB) of noise augment. If None, `noise_level` is used"}
+    )
+    noise_max_snr: Optional[float] = field(
+        default=None, metadata={"help": "Maximum SNR (dB) of noise augment. If None, `noise_level` is used"}
+    )
     time_stretch_min_rate: float = field(default=0.7, metadata={"help": "Minimum rate of audio time stretch"})
     time_stretch_max_rate: float = field(default=1.4, metadata={"help": "Maximum rate of audio time stretch"})
+    speed_perturb_rates: str = field(
+        default="(0.9, 1.0, 1.1)", metadata={"help": "Speed rates that speed perturbation chooses from (tuple literal)"}
+    )
+    cache_speed_perturb: bool = field(
+        default=True,
+        metadata={
+            "help": "Flag indication whether to store speed perturbed features in the feature cache "
+            "(one entry per rate). Requires `audio.feature_cache_dir`."
+        },
+    )
+    augment_policy: str = field(
+        default="duplicate",
+        metadata={
+            "help": "duplicate: append an augmented copy of the dataset for each enabled augmentation. "
+            "online: visit every utterance once per epoch and sample enabled augmentations per item."
+        },
+    )
+    spec_augment_prob: float = field(default=0.5, metadata={"help": "Probability of spec augment (online policy)"})
+    noise_augment_prob: float = field(default=0.5, metadata={"help": "Probability of noise augment (online policy)"})
+    time_stretch_augment_prob: float = field(
+        default=0.5, metadata={"help": "Probability of time stretch augment (online policy)"}
+    )
+    joining_augment_prob: float = field(
+        default=0.5, metadata={"help": "Probability of joining augment (online policy)"}
+    )
+    speed_perturb_augment_prob: float = field(
+        default=0.5, metadata={"help": "Probability of speed perturbation augment (online policy)"}
+    )
 
 
 @dataclass
@@ -202,7 +294,28 @@ class BaseTrainerConfigs(OpenspeechDataclass):
         },
     )
     sampler: str = field(
-        default="else", metadata={"help": "smart: batching with similar sequence length." "else: random batch"}
+        default="else",
+        metadata={
+            "help": "smart: batching with similar sequence length. "
+            "bucketing: batching by a budget of feature frames and target tokens. "
+            "else: random batch"
+        },
+    )
+    max_frames: int = field(
+        default=20000, metadata={"help": "Maximum number of padded feature frames in a batch. (bucketing sampler)"}
+    )
+    max_tokens: Optional[int] = field(
+        default=None, metadata={"help": "Maximum number of padded target tokens in a batch. (bucketing sampler)"}
+    )
+    num_buckets: int = field(default=30, metadata={"help": "The number of length buckets. (bucketing sampler)"})
+    metric_interval: int = field(
+        default=1, metadata={"help": "Update the training WER / CER every N steps. Validation and test are exact."}
+    )
+    metric_sample_size: int = field(
+        default=0, metadata={"help": "The number of utterances of a training batch to update WER / CER from. 0: all"}
+    )
+    async_metrics: bool = field(
+        default=False, metadata={"help": "If set True, will update the training WER / CER on a background thread."}
     )
 
 
@@ -315,6 +428,62 @@ class LearningRateSchedulerConfigs(OpenspeechDataclass):
     lr: float = field(default=1e-04, metadata={"help": "Learning rate"})
 
 
+@dataclass
+class AudioFeatureConfigs(OpenspeechDataclass):
+    """Super class of audio feature transform dataclass"""
+
+    feature_cache_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Directory of the persistent feature cache. "
+            "If set, extracted features are stored on first access and read back on later epochs."
+        },
+    )
+    feature_cache_dtype: str = field(
+        default="float16", metadata={"help": "Storage dtype of cached features (float16, float32)"}
+    )
+    feature_cache_num_shards: int = field(default=16, metadata={"help": "The number of feature cache shard files"})
+    feature_extraction: str = field(
+        default="dataset",
+        metadata={
+            "help": "Where features are extracted. dataset: per utterance in the dataset. "
+            "collate: batched torch transform in the collate function. "
+            "model: batched torch transform on the model device, before the training / evaluation step."
+        },
+    )
+    train_shard_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Directory of tar shards of the training set. "
+            "If set, the training set is packed into shards on first use and streamed from them. "
+            "Noise, time stretch, joining and speed perturbation augments and speaker normalization are not supported."
+        },
+    )
+    min_duration: float = field(
+        default=0.0, metadata={"help": "Training utterances shorter than this (seconds) are dropped"}
+    )
+    max_duration: Optional[float] = field(
+        default=None, metadata={"help": "Training utterances longer than this (seconds) are dropped"}
+    )
+    apply_speed_perturb_augment: bool = field(
+        default=False, metadata={"help": "Flag indication whether to apply speed perturbation augment or not"}
+    )
+    normalization: str = field(
+        default="utterance",
+        metadata={
+            "help": "Feature normalization. utterance: mean / std of each utterance. "
+            "global: training set statistics. speaker: training set statistics per speaker (audio directory)."
+        },
+    )
+    cmvn_path: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Path of CMVN statistics for global / speaker normalization. "
+            "If None, `<manifest_file_path>.cmvn.npz` is used. The statistics are saved in model checkpoints."
+        },
+    )
+
+
 @dataclass
 class TokenizerConfigs(OpenspeechDataclass):
     """Super class of tokenizer dataclass"""
@@ -25,13 +25,16 @@ import os
 import tarfile
 from typing import Optional, Tuple
 
+import numpy as np
 import pytorch_lightning as pl
 import wget
 from omegaconf import DictConfig
+from torch.utils.data import IterableDataset
 
+from openspeech.data.audio.builder import build_speech_to_text_datasets
 from openspeech.data.audio.data_loader import AudioDataLoader
-from openspeech.data.audio.dataset import SpeechToTextDataset
-from openspeech.data.sampler import RandomSampler, SmartBatchingSampler
+from openspeech.data.manifest import load_manifest
+from openspeech.data.sampler import build_sampler
 from openspeech.datasets import register_data_module
 from openspeech.datasets.aishell.preprocess import generate_character_labels, generate_character_script
 
@@ -55,6 +58,8 @@ class LightningAIShellDataModule(pl.LightningDataModule):
         super(LightningAIShellDataModule, self).__init__()
         self.configs = configs
         self.dataset = dict()
+        self.train_sampler = None
+        self.train_sampler_state = None
         self.logger = logging.getLogger(__name__)
 
     def _download_dataset(self) -> None:
@@ -84,20 +89,9 @@ class LightningAIShellDataModule(pl.LightningDataModule):
             vocab_path=self.configs.tokenizer.vocab_path,
         )
 
-    def _parse_manifest_file(self, manifest_file_path: str) -> Tuple[list, list]:
-        """Parsing manifest file"""
-        audio_paths = list()
-        transcripts = list()
-
-        with open(manifest_file_path) as f:
-            for idx, line in enumerate(f.readlines()):
-                audio_path, _, transcript = line.split("\t")
-                transcript = transcript.replace("\n", "")
-
-                audio_paths.append(audio_path)
-                transcripts.append(transcript)
-
-        return audio_paths, transcripts
+    def _parse_manifest_file(self, manifest_file_path: str) -> Tuple[list, list, Optional[np.ndarray]]:
+        """Parsing manifest file (or its binary manifest if it is up to date, with its audio lengths)"""
+        return load_manifest(manifest_file_path, sample_rate=self.configs.audio.sample_rate)
 
     def prepare_data(self) -> None:
         r"""
@@ -127,7 +121,7 @@ class LightningAIShellDataModule(pl.LightningDataModule):
             None
         """
         valid_end_idx = self.AISHELL_TRAIN_NUM + self.AISHELL_VALID_NUM
-        audio_paths, transcripts = self._parse_manifest_file(self.configs.dataset.manifest_file_path)
+        audio_paths, transcripts, audio_lengths = self._parse_manifest_file(self.configs.dataset.manifest_file_path)
 
         audio_paths = {
             "train": audio_paths[: self.AISHELL_TRAIN_NUM],
@@ -140,28 +134,42 @@ class LightningAIShellDataModule(pl.LightningDataModule):
             "test": transcripts[valid_end_idx:],
         }
 
-        for stage in audio_paths.keys():
-            self.dataset[stage] = SpeechToTextDataset(
-                configs=self.configs,
-                dataset_path=self.configs.dataset.dataset_path,
-                audio_paths=audio_paths[stage],
-                transcripts=transcripts[stage],
-                apply_spec_augment=self.configs.audio.apply_spec_augment if stage == "train" else False,
-                del_silence=self.configs.audio.del_silence if stage == "train" else False,
-            )
+        manifest_audio_lengths = None
+        if audio_lengths is not None:
+            manifest_audio_lengths = {
+                "train": audio_lengths[: self.AISHELL_TRAIN_NUM],
+                "valid": audio_lengths[self.AISHELL_TRAIN_NUM : valid_end_idx],
+                "test": audio_lengths[valid_end_idx:],
+            }
+
+        self.dataset = build_speech_to_text_datasets(
+            self.configs,
+            audio_paths=audio_paths,
+            transcripts=transcripts,
+            dataset_paths={stage: self.configs.dataset.dataset_path for stage in audio_paths.keys()},
+            manifest_audio_lengths=manifest_audio_lengths,
+        )
 
     def train_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        train_sampler = sampler(data_source=self.dataset["train"], batch_size=self.configs.trainer.batch_size)
+        if isinstance(self.dataset["train"], IterableDataset):
+            return AudioDataLoader(
+                dataset=self.dataset["train"],
+                num_workers=self.configs.trainer.num_workers,
+                batch_sampler=None,
+                batch_size=self.configs.trainer.batch_size,
+            )
+        self.train_sampler = build_sampler(self.configs, self.dataset["train"])
+        if self.train_sampler_state is not None:
+            self.train_sampler.load_state_dict(self.train_sampler_state)
+            self.train_sampler_state = None
         return AudioDataLoader(
             dataset=self.dataset["train"],
             num_workers=self.configs.trainer.num_workers,
-            batch_sampler=train_sampler,
+            batch_sampler=self.train_sampler,
         )
 
     def val_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        valid_sampler = sampler(self.dataset["valid"], batch_size=self.configs.trainer.batch_size)
+        valid_sampler = build_sampler(self.configs, self.dataset["valid"])
         return AudioDataLoader(
             dataset=self.dataset["valid"],
             num_workers=self.configs.trainer.num_workers,
@@ -169,10 +177,18 @@ class LightningAIShellDataModule(pl.LightningDataModule):
         )
 
     def test_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        test_sampler = sampler(self.dataset["test"], batch_size=self.configs.trainer.batch_size)
+        test_sampler = build_sampler(self.configs, self.dataset["test"])
         return AudioDataLoader(
             dataset=self.dataset["test"],
             num_workers=self.configs.trainer.num_workers,
             batch_sampler=test_sampler,
         )
+
+    def on_save_checkpoint(self, checkpoint: dict) -> None:
+        r"""Store the train sampler state, so that resuming skips the batches already seen."""
+        if self.train_sampler is not None:
+            checkpoint["train_sampler"] = self.train_sampler.state_dict()
+
+    def on_load_checkpoint(self, checkpoint: dict) -> None:
+        r"""Keep the train sampler state until the train dataloader is built."""
+        self.train_sampler_state = checkpoint.get("train_sampler")
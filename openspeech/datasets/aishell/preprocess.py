@@ -26,6 +26,8 @@ import tarfile
 
 import pandas as pd
 
+from openspeech.data.vocab import generate_vocab_labels
+
 
 def load_label(filepath):
     char2id = dict()
@@ -78,7 +80,7 @@ def get_key(audio_file):
 
 
 def generate_character_labels(dataset_path, vocab_path):
-    transcripts, label_list, label_freq = list(), list(), list()
+    transcripts = list()
 
     with open(os.path.join(dataset_path, "transcript/aishell_transcript_v0.8.txt")) as f:
         for line in f.readlines():
@@ -86,29 +88,7 @@ def generate_character_labels(dataset_path, vocab_path):
             transcript = " ".join(tokens[1:])
             transcripts.append(transcript)
 
-    for transcript in transcripts:
-        for ch in transcript:
-            if ch not in label_list:
-                label_list.append(ch)
-                label_freq.append(1)
-            else:
-                label_freq[label_list.index(ch)] += 1
-
-    # sort together Using zip
-    label_freq, label_list = zip(*sorted(zip(label_freq, label_list), reverse=True))
-    label = {"id": [0, 1, 2, 3], "char": ["<pad>", "<sos>", "<eos>", "<blank>"], "freq": [0, 0, 0, 0]}
-
-    for idx, (ch, freq) in enumerate(zip(label_list, label_freq)):
-        label["id"].append(idx + 4)
-        label["char"].append(ch)
-        label["freq"].append(freq)
-
-    label["id"] = label["id"]
-    label["char"] = label["char"]
-    label["freq"] = label["freq"]
-
-    label_df = pd.DataFrame(label)
-    label_df.to_csv(vocab_path, encoding="utf-8", index=False)
+    generate_vocab_labels(transcripts, vocab_path, unit_column="char")
 
 
 def generate_character_script(dataset_path: str, manifest_file_path: str, vocab_path: str):
@@ -3,6 +3,8 @@ import logging
 
 import pandas as pd
 
+from openspeech.data.vocab import generate_vocab_labels
+
 logger = logging.getLogger()
 
 
@@ -35,33 +37,7 @@ def sentence_to_target(sentence, char2id):
 
 def generate_character_labels(transcripts, labels_dest):
     logger.info("create_char_labels started..")
-
-    label_list = list()
-    label_freq = list()
-
-    for transcript in transcripts:
-        for ch in transcript:
-            if ch not in label_list:
-                label_list.append(ch)
-                label_freq.append(1)
-            else:
-                label_freq[label_list.index(ch)] += 1
-
-    # sort together Using zip
-    label_freq, label_list = zip(*sorted(zip(label_freq, label_list), reverse=True))
-    label = {"id": [0, 1, 2, 3], "char": ["<pad>", "<sos>", "<eos>", "<blank>"], "freq": [0, 0, 0, 0]}
-
-    for idx, (ch, freq) in enumerate(zip(label_list, label_freq)):
-        label["id"].append(idx + 4)
-        label["char"].append(ch)
-        label["freq"].append(freq)
-
-    #label["id"] = label["id"][:2000]
-    #label["char"] = label["char"][:2000]
-    #label["freq"] = label["freq"][:2000]
-
-    label_df = pd.DataFrame(label)
-    label_df.to_csv(labels_dest, encoding="utf-8", index=False)
+    generate_vocab_labels(transcripts, labels_dest, unit_column="char")
 
 
 def generate_character_script(audio_paths: list, transcripts: list, manifest_file_path: str, vocab_path: str):
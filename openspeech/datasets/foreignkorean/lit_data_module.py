@@ -1,18 +1,22 @@
 import logging
 import os
+from functools import partial
 from typing import Optional
 import math
 
 import pytorch_lightning as pl
 from omegaconf import DictConfig
+from torch.utils.data import IterableDataset
 
+from openspeech.data.audio.builder import build_speech_to_text_datasets
 from openspeech.data.audio.data_loader import AudioDataLoader
-from openspeech.data.audio.dataset import SpeechToTextDataset
-from openspeech.data.sampler import RandomSampler, SmartBatchingSampler
+from openspeech.data.incremental_manifest import IncrementalManifestBuilder, file_digest
+from openspeech.data.manifest import load_manifest
+from openspeech.data.sampler import build_sampler
 from openspeech.datasets import register_data_module
 
 from openspeech.datasets.foreignkorean.character import generate_character_labels, generate_character_script
-from openspeech.datasets.foreignkorean.preprocess import preprocess
+from openspeech.datasets.foreignkorean.preprocess import list_label_files, preprocess, read_label_entries
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +31,8 @@ class LightningForeignKoreanDataModule(pl.LightningDataModule):
         super(LightningForeignKoreanDataModule, self).__init__()
         self.configs = configs
         self.dataset = dict()
+        self.train_sampler = None
+        self.train_sampler_state = None
         self.logger = logging.getLogger(__name__)
         self.encoding = "utf-8"
 
@@ -51,40 +57,62 @@ class LightningForeignKoreanDataModule(pl.LightningDataModule):
             raise ValueError(f"Unsupported vocab : {self.configs.tokenizer.unit}")
         
     
+    def _update_manifest_files(self, manifest_file_path: str) -> None:
+        r"""
+        Update the manifest file incrementally: only new or changed label files are preprocessed again
+        (see ``IncrementalManifestBuilder``). The vocabulary is built once, when missing.
+        """
+        if self.configs.tokenizer.unit != "foreignkorean_character":
+            raise ValueError(f"Unsupported vocab : {self.configs.tokenizer.unit}")
+
+        builder = IncrementalManifestBuilder(f"{manifest_file_path}.shards", version="foreignkorean")
+
+        keys, sources = list(), list()
+        for source, file_paths in list_label_files(self.configs.dataset.dataset_path):
+            keys.append(builder.update(source, file_paths, read_label_entries))
+            sources.append(source)
+        builder.remove_missing_sources(sources)
+
+        vocab_path = self.configs.tokenizer.vocab_path
+        if not os.path.exists(vocab_path):
+            generate_character_labels(builder.load_transcripts(keys)[1], vocab_path)
+
+        write_manifest_shard = partial(generate_character_script, vocab_path=vocab_path)
+        builder.write_manifest(keys, manifest_file_path, write_manifest_shard, file_digest(vocab_path))
+
     def _parse_manifest_file(self):
-        audio_paths = list()
-        transcripts = list()
-
-        with open(self.configs.dataset.manifest_file_path, encoding=self.encoding) as f:
-            files = f.readlines()
-            for idx, line in enumerate(files):
-                audio_path, korean_transcript, transcript = line.split("\t")
-                transcript = transcript.replace("\n", "")
-
-                audio_paths.append(audio_path)
-                transcripts.append(transcript)
-
-            # 데이터 개수를 동적으로 관리, 계산을 단순화하기 위해 모두 내림하고 나머지는 train셋에 추가
-            self.FOREIGNKOREAN_TOTAL_NUM = len(files)
-            self.FOREIGNKOREAN_TRAIN_NUM = math.floor(self.FOREIGNKOREAN_TOTAL_NUM * 0.985) # 매니페스트파일 라인수 * 98.5%
-            self.FOREIGNKOREAN_VALID_NUM = math.floor(self.FOREIGNKOREAN_TOTAL_NUM * 0.005) # 매니페스트파일 라인수 * 0.5%
-            self.FOREIGNKOREAN_TEST_NUM  = math.floor(self.FOREIGNKOREAN_TOTAL_NUM * 0.01 ) # 매니페스트파일 라인수 * 1%
-            self.FOREIGNKOREAN_TRAIN_NUM = self.FOREIGNKOREAN_TRAIN_NUM + math.floor(
-                self.FOREIGNKOREAN_TOTAL_NUM - (self.FOREIGNKOREAN_TRAIN_NUM + self.FOREIGNKOREAN_VALID_NUM + self.FOREIGNKOREAN_TEST_NUM)
-            )
-            print("FOREIGNKOREAN_TOTAL_NUM: ",self.FOREIGNKOREAN_TOTAL_NUM)
-            print("FOREIGNKOREAN_TRAIN_NUM: ",self.FOREIGNKOREAN_TRAIN_NUM)
-            print("FOREIGNKOREAN_VALID_NUM: ",self.FOREIGNKOREAN_VALID_NUM)
-            print("FOREIGNKOREAN_TEST_NUM: " ,self.FOREIGNKOREAN_TEST_NUM)
+        audio_paths, transcripts, audio_lengths = load_manifest(
+            self.configs.dataset.manifest_file_path,
+            encoding=self.encoding,
+            sample_rate=self.configs.audio.sample_rate,
+        )
 
-        return audio_paths, transcripts
+        # 데이터 개수를 동적으로 관리, 계산을 단순화하기 위해 모두 내림하고 나머지는 train셋에 추가
+        self.FOREIGNKOREAN_TOTAL_NUM = len(audio_paths)
+        self.FOREIGNKOREAN_TRAIN_NUM = math.floor(self.FOREIGNKOREAN_TOTAL_NUM * 0.985) # 매니페스트파일 라인수 * 98.5%
+        self.FOREIGNKOREAN_VALID_NUM = math.floor(self.FOREIGNKOREAN_TOTAL_NUM * 0.005) # 매니페스트파일 라인수 * 0.5%
+        self.FOREIGNKOREAN_TEST_NUM  = math.floor(self.FOREIGNKOREAN_TOTAL_NUM * 0.01 ) # 매니페스트파일 라인수 * 1%
+        self.FOREIGNKOREAN_TRAIN_NUM = self.FOREIGNKOREAN_TRAIN_NUM + math.floor(
+            self.FOREIGNKOREAN_TOTAL_NUM - (self.FOREIGNKOREAN_TRAIN_NUM + self.FOREIGNKOREAN_VALID_NUM + self.FOREIGNKOREAN_TEST_NUM)
+        )
+        print("FOREIGNKOREAN_TOTAL_NUM: ",self.FOREIGNKOREAN_TOTAL_NUM)
+        print("FOREIGNKOREAN_TRAIN_NUM: ",self.FOREIGNKOREAN_TRAIN_NUM)
+        print("FOREIGNKOREAN_VALID_NUM: ",self.FOREIGNKOREAN_VALID_NUM)
+        print("FOREIGNKOREAN_TEST_NUM: " ,self.FOREIGNKOREAN_TEST_NUM)
+
+        return audio_paths, transcripts, audio_lengths
 
 
     def prepare_data(self):
         print('prepare_data started..')
         print(f"os.path.exists(self.configs.dataset.manifest_file_path) {os.path.exists(self.configs.dataset.manifest_file_path)}")
         print(f"os.path.exists(self.configs.dataset.dataset_path) {os.path.exists(self.configs.dataset.dataset_path)}")
-        if not os.path.exists(self.configs.dataset.manifest_file_path):
+        if self.configs.dataset.incremental_manifest:
+            if not os.path.exists(self.configs.dataset.dataset_path):
+                self.logger.error("Cannot find dataset path")
+                raise FileNotFoundError
+            self._update_manifest_files(self.configs.dataset.manifest_file_path)
+        elif not os.path.exists(self.configs.dataset.manifest_file_path):
             self.logger.error("Cannot find Manifest file")
             if not os.path.exists(self.configs.dataset.dataset_path):
                 self.logger.error("Cannot find dataset path")
@@ -95,7 +123,7 @@ class LightningForeignKoreanDataModule(pl.LightningDataModule):
     
     def setup(self, stage: Optional[str] = None) -> None:
         valid_end_idx = self.FOREIGNKOREAN_TRAIN_NUM + self.FOREIGNKOREAN_VALID_NUM
-        audio_paths, transcripts = self._parse_manifest_file()
+        audio_paths, transcripts, audio_lengths = self._parse_manifest_file()
         audio_paths = {
             "train": audio_paths[: self.FOREIGNKOREAN_TRAIN_NUM],
             "valid": audio_paths[self.FOREIGNKOREAN_TRAIN_NUM : valid_end_idx],
@@ -107,33 +135,47 @@ class LightningForeignKoreanDataModule(pl.LightningDataModule):
             "test": transcripts[valid_end_idx:],
         }
 
-        for stage in audio_paths.keys():
-            if stage == "test":
-                dataset_path = self.configs.dataset.test_dataset_path
-            else:
-                dataset_path = self.configs.dataset.dataset_path
-
-            self.dataset[stage] = SpeechToTextDataset(
-                configs=self.configs,
-                dataset_path=dataset_path,
-                audio_paths=audio_paths[stage],
-                transcripts=transcripts[stage],
-                apply_spec_augment=self.configs.audio.apply_spec_augment if stage == "train" else False,
-                del_silence=self.configs.audio.del_silence if stage == "train" else False,
-            )
-    
+        manifest_audio_lengths = None
+        if audio_lengths is not None:
+            manifest_audio_lengths = {
+                "train": audio_lengths[: self.FOREIGNKOREAN_TRAIN_NUM],
+                "valid": audio_lengths[self.FOREIGNKOREAN_TRAIN_NUM : valid_end_idx],
+                "test": audio_lengths[valid_end_idx:],
+            }
+
+        dataset_paths = {
+            "train": self.configs.dataset.dataset_path,
+            "valid": self.configs.dataset.dataset_path,
+            "test": self.configs.dataset.test_dataset_path,
+        }
+        self.dataset = build_speech_to_text_datasets(
+            self.configs,
+            audio_paths=audio_paths,
+            transcripts=transcripts,
+            dataset_paths=dataset_paths,
+            manifest_audio_lengths=manifest_audio_lengths,
+        )
+
     def train_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        train_sampler = sampler(data_source=self.dataset["train"], batch_size=self.configs.trainer.batch_size)
+        if isinstance(self.dataset["train"], IterableDataset):
+            return AudioDataLoader(
+                dataset=self.dataset["train"],
+                num_workers=self.configs.trainer.num_workers,
+                batch_sampler=None,
+                batch_size=self.configs.trainer.batch_size,
+            )
+        self.train_sampler = build_sampler(self.configs, self.dataset["train"])
+        if self.train_sampler_state is not None:
+            self.train_sampler.load_state_dict(self.train_sampler_state)
+            self.train_sampler_state = None
         return AudioDataLoader(
             dataset=self.dataset["train"],
             num_workers=self.configs.trainer.num_workers,
-            batch_sampler=train_sampler,
+            batch_sampler=self.train_sampler,
         )
 
     def val_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        valid_sampler = sampler(self.dataset["valid"], batch_size=self.configs.trainer.batch_size)
+        valid_sampler = build_sampler(self.configs, self.dataset["valid"])
         return AudioDataLoader(
             dataset=self.dataset["valid"],
             num_workers=self.configs.trainer.num_workers,
@@ -141,10 +183,18 @@ class LightningForeignKoreanDataModule(pl.LightningDataModule):
         )
 
     def test_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        test_sampler = sampler(self.dataset["test"], batch_size=self.configs.trainer.batch_size)
+        test_sampler = build_sampler(self.configs, self.dataset["test"])
         return AudioDataLoader(
             dataset=self.dataset["test"],
             num_workers=self.configs.trainer.num_workers,
             batch_sampler=test_sampler,
-        )
\ No newline at end of file
+        )
+
+    def on_save_checkpoint(self, checkpoint: dict) -> None:
+        r"""Store the train sampler state, so that resuming skips the batches already seen."""
+        if self.train_sampler is not None:
+            checkpoint["train_sampler"] = self.train_sampler.state_dict()
+
+    def on_load_checkpoint(self, checkpoint: dict) -> None:
+        r"""Keep the train sampler state until the train dataloader is built."""
+        self.train_sampler_state = checkpoint.get("train_sampler")
@@ -17,31 +17,36 @@ def read_preprocess_text_file(file_path):
         transscript = readTxt if len(readTxt.strip())>0 else answerTxt
         return sentence_filter(transscript)
     
-def preprocess(dataset_path, mode="character"):
-    print("preprocess started..")
-    
+def to_audio_path(label_path):
+    return label_path.replace('label','audio').replace('.json','.wav')
+
+def list_label_files(dataset_path):
     #dataset_path : openspeech/openspeech/traindataset
     #subdir       : audio, label
     #subsubdir    : 1, 2, 3, 4, 5
     workdir = os.path.join(dataset_path, 'label')
-    subdirs = os.listdir(workdir)
-    label_paths = []
-    audio_paths = list()
-    transcripts = list()
-    for dir in subdirs:
+    for dir in sorted(os.listdir(workdir)):
         path = os.path.join(workdir, dir)
         if not os.path.isdir(path):
             continue
 
-        filelist = os.listdir(path)
-        #print(f"filelist >> {filelist}")
-        for filename in filelist:
+        label_paths = list()
+        for filename in os.listdir(path):
             filepath = os.path.join(path, os.path.splitext(filename)[0], filename + '.json')
-            #print(f"filepath >> {filepath}")
             if os.path.exists(filepath):
                 label_paths.append(filepath)
-                audio_paths.append(filepath.replace('label','audio').replace('.json','.wav'))
-                print(f"{filepath}, {filepath.replace('label','audio').replace('.json','.wav')}")
+        yield os.path.join('label', dir), label_paths
+
+def read_label_entries(file_path):
+    return [(to_audio_path(file_path), read_preprocess_text_file(file_path))]
+
+def preprocess(dataset_path, mode="character"):
+    print("preprocess started..")
+    
+    audio_paths = list()
+    transcripts = list()
+    label_paths = [label_path for _, paths in list_label_files(dataset_path) for label_path in paths]
+    audio_paths.extend(to_audio_path(label_path) for label_path in label_paths)
     
     #do parallel
     logger.debug(f"label_paths num : {len(label_paths)}")
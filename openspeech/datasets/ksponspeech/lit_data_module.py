@@ -22,22 +22,49 @@
 
 import logging
 import os
+import shutil
+from functools import partial
 from typing import Optional
 
+import numpy as np
 import pytorch_lightning as pl
 from omegaconf import DictConfig
+from torch.utils.data import IterableDataset
 
+from openspeech.data.audio.builder import build_speech_to_text_datasets
 from openspeech.data.audio.data_loader import AudioDataLoader
-from openspeech.data.audio.dataset import SpeechToTextDataset
-from openspeech.data.sampler import RandomSampler, SmartBatchingSampler
+from openspeech.data.incremental_manifest import IncrementalManifestBuilder, file_digest, split_by_key
+from openspeech.data.manifest import load_manifest
+from openspeech.data.sampler import build_sampler
 from openspeech.datasets import register_data_module
 from openspeech.datasets.ksponspeech.preprocess.character import generate_character_labels, generate_character_script
-from openspeech.datasets.ksponspeech.preprocess.grapheme import sentence_to_grapheme
-from openspeech.datasets.ksponspeech.preprocess.preprocess import preprocess, preprocess_test_data
-from openspeech.datasets.ksponspeech.preprocess.subword import sentence_to_subwords, train_sentencepiece
+from openspeech.datasets.ksponspeech.preprocess.grapheme import (
+    generate_grapheme_labels,
+    sentence_to_grapheme,
+    to_grapheme_transcript,
+)
+from openspeech.datasets.ksponspeech.preprocess.preprocess import (
+    TEST_SPLITS,
+    list_text_files,
+    preprocess,
+    preprocess_test_data,
+    read_test_manifest_file,
+    read_text_file_entries,
+)
+from openspeech.datasets.ksponspeech.preprocess.subword import (
+    SENTENCEPIECE_MODEL_PREFIX,
+    sentence_to_subwords,
+    train_sentencepiece,
+)
 from openspeech.tokenizers.tokenizer import Tokenizer
 
 
+def _take(items, indices: np.ndarray):
+    if hasattr(items, "take"):
+        return items.take(indices)
+    return [items[idx] for idx in indices]
+
+
 @register_data_module("ksponspeech")
 class LightningKsponSpeechDataModule(pl.LightningDataModule):
     r"""
@@ -63,6 +90,8 @@ class LightningKsponSpeechDataModule(pl.LightningDataModule):
         super(LightningKsponSpeechDataModule, self).__init__()
         self.configs = configs
         self.dataset = dict()
+        self.train_sampler = None
+        self.train_sampler_state = None
         self.logger = logging.getLogger(__name__)
         self.encoding = "cp949" if self.configs.tokenizer.unit == "kspon_grapheme" else "utf-8"
 
@@ -97,26 +126,92 @@ class LightningKsponSpeechDataModule(pl.LightningDataModule):
         else:
             raise ValueError(f"Unsupported vocab : {self.configs.tokenizer.unit}")
 
+    def _update_manifest_files(self, manifest_file_path: str) -> None:
+        r"""
+        Update KsponSpeech manifest file incrementally: only new or changed transcript files are preprocessed again
+        (see ``IncrementalManifestBuilder``). The vocabulary (or sentencepiece model) is built once, when missing.
+        """
+        dataset_path = self.configs.dataset.dataset_path
+        mode = self.configs.dataset.preprocess_mode
+        builder = IncrementalManifestBuilder(f"{manifest_file_path}.shards", version=f"ksponspeech|{mode}")
+
+        keys, sources = list(), list()
+        read_entries = partial(read_text_file_entries, dataset_path=dataset_path, mode=mode)
+        for source, file_paths in list_text_files(dataset_path):
+            keys.append(builder.update(source, file_paths, read_entries))
+            sources.append(source)
+
+        test_file_paths = [os.path.join(self.configs.dataset.test_manifest_dir, split) for split in TEST_SPLITS]
+        keys.append(builder.update("test", test_file_paths, partial(read_test_manifest_file, mode=mode)))
+        sources.append("test")
+        builder.remove_missing_sources(sources)
+
+        if self.configs.tokenizer.unit == "kspon_character":
+            vocab_path = self.configs.tokenizer.vocab_path
+            if not os.path.exists(vocab_path):
+                generate_character_labels(builder.load_transcripts(keys)[1], vocab_path)
+            write_manifest_shard = partial(generate_character_script, vocab_path=vocab_path)
+
+        elif self.configs.tokenizer.unit == "kspon_subword":
+            vocab_path = self.configs.tokenizer.sp_model_path
+            if not os.path.exists(vocab_path):
+                transcripts = builder.load_transcripts(keys)[1]
+                train_sentencepiece(transcripts, self.configs.tokenizer.vocab_size, self.configs.tokenizer.blank_token)
+                if vocab_path != f"{SENTENCEPIECE_MODEL_PREFIX}.model":
+                    shutil.copy(f"{SENTENCEPIECE_MODEL_PREFIX}.model", vocab_path)
+            write_manifest_shard = partial(sentence_to_subwords, sp_model_path=vocab_path)
+
+        elif self.configs.tokenizer.unit == "kspon_grapheme":
+            vocab_path = self.configs.tokenizer.vocab_path
+            if not os.path.exists(vocab_path):
+                transcripts = builder.load_transcripts(keys)[1]
+                generate_grapheme_labels([to_grapheme_transcript(t) for t in transcripts], vocab_path)
+            write_manifest_shard = partial(sentence_to_grapheme, vocab_path=vocab_path, generate_labels=False)
+
+        else:
+            raise ValueError(f"Unsupported vocab : {self.configs.tokenizer.unit}")
+
+        builder.write_manifest(keys, manifest_file_path, write_manifest_shard, file_digest(vocab_path))
+
     def _parse_manifest_file(self):
         r"""
-        Parsing manifest file.
+        Parsing manifest file. A binary manifest (``manifest_file_path + ".bin"``) is read instead if it is up to date.
 
         Returns:
             audio_paths (list): list of audio path
             transcritps (list): list of transcript of audio
+            audio_lengths (np.ndarray, optional): length of each audio file, if stored in the binary manifest
         """
-        audio_paths = list()
-        transcripts = list()
-
-        with open(self.configs.dataset.manifest_file_path, encoding=self.encoding) as f:
-            for idx, line in enumerate(f.readlines()):
-                audio_path, korean_transcript, transcript = line.split("\t")
-                transcript = transcript.replace("\n", "")
+        return load_manifest(
+            self.configs.dataset.manifest_file_path,
+            encoding=self.encoding,
+            sample_rate=self.configs.audio.sample_rate,
+        )
 
-                audio_paths.append(audio_path)
-                transcripts.append(transcript)
+    def _split_indices(self, audio_paths) -> dict:
+        r"""
+        Returns the manifest indices of `train`, `valid` and `test`. The evaluation scripts are the last
+        ``KSPONSPEECH_TEST_NUM`` lines of the manifest. With ``incremental_manifest``, the rest is split by the hash
+        of the audio path (see ``split_by_key``), so that appended transcripts land in `train` or `valid` and the
+        split of the other utterances does not change. Otherwise it is split by ``KSPONSPEECH_TRAIN_NUM``.
+        """
+        indices = np.arange(len(audio_paths))
+        if not self.configs.dataset.incremental_manifest:
+            valid_end_idx = self.KSPONSPEECH_TRAIN_NUM + self.KSPONSPEECH_VALID_NUM
+            return {
+                "train": indices[: self.KSPONSPEECH_TRAIN_NUM],
+                "valid": indices[self.KSPONSPEECH_TRAIN_NUM : valid_end_idx],
+                "test": indices[valid_end_idx:],
+            }
 
-        return audio_paths, transcripts
+        test_start_idx = max(len(audio_paths) - self.KSPONSPEECH_TEST_NUM, 0)
+        valid_ratio = self.KSPONSPEECH_VALID_NUM / (self.KSPONSPEECH_TRAIN_NUM + self.KSPONSPEECH_VALID_NUM)
+        is_valid = split_by_key(audio_paths[:test_start_idx], valid_ratio)
+        return {
+            "train": np.flatnonzero(~is_valid),
+            "valid": np.flatnonzero(is_valid),
+            "test": indices[test_start_idx:],
+        }
 
     def prepare_data(self):
         r"""
@@ -125,7 +220,11 @@ class LightningKsponSpeechDataModule(pl.LightningDataModule):
         Returns:
             tokenizer (Tokenizer): tokenizer is in charge of preparing the inputs for a model.
         """
-        if not os.path.exists(self.configs.dataset.manifest_file_path):
+        if self.configs.dataset.incremental_manifest:
+            if not os.path.exists(self.configs.dataset.dataset_path):
+                raise FileNotFoundError
+            self._update_manifest_files(self.configs.dataset.manifest_file_path)
+        elif not os.path.exists(self.configs.dataset.manifest_file_path):
             self.logger.info("Manifest file is not exists !!\n" "Generate manifest files..")
             if not os.path.exists(self.configs.dataset.dataset_path):
                 raise FileNotFoundError
@@ -142,47 +241,49 @@ class LightningKsponSpeechDataModule(pl.LightningDataModule):
         Returns:
             None
         """
-        valid_end_idx = self.KSPONSPEECH_TRAIN_NUM + self.KSPONSPEECH_VALID_NUM
+        audio_paths, transcripts, audio_lengths = self._parse_manifest_file()
+        splits = self._split_indices(audio_paths)
 
-        audio_paths, transcripts = self._parse_manifest_file()
-        audio_paths = {
-            "train": audio_paths[: self.KSPONSPEECH_TRAIN_NUM],
-            "valid": audio_paths[self.KSPONSPEECH_TRAIN_NUM : valid_end_idx],
-            "test": audio_paths[valid_end_idx:],
-        }
-        transcripts = {
-            "train": transcripts[: self.KSPONSPEECH_TRAIN_NUM],
-            "valid": transcripts[self.KSPONSPEECH_TRAIN_NUM : valid_end_idx],
-            "test": transcripts[valid_end_idx:],
-        }
+        audio_paths = {stage: _take(audio_paths, indices) for stage, indices in splits.items()}
+        transcripts = {stage: _take(transcripts, indices) for stage, indices in splits.items()}
 
-        for stage in audio_paths.keys():
-            if stage == "test":
-                dataset_path = self.configs.dataset.test_dataset_path
-            else:
-                dataset_path = self.configs.dataset.dataset_path
-
-            self.dataset[stage] = SpeechToTextDataset(
-                configs=self.configs,
-                dataset_path=dataset_path,
-                audio_paths=audio_paths[stage],
-                transcripts=transcripts[stage],
-                apply_spec_augment=self.configs.audio.apply_spec_augment if stage == "train" else False,
-                del_silence=self.configs.audio.del_silence if stage == "train" else False,
-            )
+        manifest_audio_lengths = None
+        if audio_lengths is not None:
+            manifest_audio_lengths = {stage: audio_lengths[indices] for stage, indices in splits.items()}
+
+        dataset_paths = {
+            "train": self.configs.dataset.dataset_path,
+            "valid": self.configs.dataset.dataset_path,
+            "test": self.configs.dataset.test_dataset_path,
+        }
+        self.dataset = build_speech_to_text_datasets(
+            self.configs,
+            audio_paths=audio_paths,
+            transcripts=transcripts,
+            dataset_paths=dataset_paths,
+            manifest_audio_lengths=manifest_audio_lengths,
+        )
 
     def train_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        train_sampler = sampler(data_source=self.dataset["train"], batch_size=self.configs.trainer.batch_size)
+        if isinstance(self.dataset["train"], IterableDataset):
+            return AudioDataLoader(
+                dataset=self.dataset["train"],
+                num_workers=self.configs.trainer.num_workers,
+                batch_sampler=None,
+                batch_size=self.configs.trainer.batch_size,
+            )
+        self.train_sampler = build_sampler(self.configs, self.dataset["train"])
+        if self.train_sampler_state is not None:
+            self.train_sampler.load_state_dict(self.train_sampler_state)
+            self.train_sampler_state = None
         return AudioDataLoader(
             dataset=self.dataset["train"],
             num_workers=self.configs.trainer.num_workers,
-            batch_sampler=train_sampler,
+            batch_sampler=self.train_sampler,
         )
 
     def val_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        valid_sampler = sampler(self.dataset["valid"], batch_size=self.configs.trainer.batch_size)
+        valid_sampler = build_sampler(self.configs, self.dataset["valid"])
         return AudioDataLoader(
             dataset=self.dataset["valid"],
             num_workers=self.configs.trainer.num_workers,
@@ -190,10 +291,18 @@ class LightningKsponSpeechDataModule(pl.LightningDataModule):
         )
 
     def test_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        test_sampler = sampler(self.dataset["test"], batch_size=self.configs.trainer.batch_size)
+        test_sampler = build_sampler(self.configs, self.dataset["test"])
         return AudioDataLoader(
             dataset=self.dataset["test"],
             num_workers=self.configs.trainer.num_workers,
             batch_sampler=test_sampler,
         )
+
+    def on_save_checkpoint(self, checkpoint: dict) -> None:
+        r"""Store the train sampler state, so that resuming skips the batches already seen."""
+        if self.train_sampler is not None:
+            checkpoint["train_sampler"] = self.train_sampler.state_dict()
+
+    def on_load_checkpoint(self, checkpoint: dict) -> None:
+        r"""Keep the train sampler state until the train dataloader is built."""
+        self.train_sampler_state = checkpoint.get("train_sampler")
@@ -24,6 +24,8 @@ import unicodedata
 
 import pandas as pd
 
+from openspeech.data.vocab import generate_vocab_labels
+
 
 def load_label(filepath):
     grpm2id = dict()
@@ -49,13 +51,20 @@ def sentence_to_target(transcript, grpm2id):
     return target[:-1]
 
 
-def sentence_to_grapheme(audio_paths, transcripts, manifest_file_path: str, vocab_path: str):
+def to_grapheme_transcript(transcript):
+    return " ".join(unicodedata.normalize("NFKD", transcript).replace(" ", "|")).upper()
+
+
+def sentence_to_grapheme(
+    audio_paths, transcripts, manifest_file_path: str, vocab_path: str, generate_labels: bool = True
+):
     grapheme_transcripts = list()
 
     for transcript in transcripts:
-        grapheme_transcripts.append(" ".join(unicodedata.normalize("NFKD", transcript).replace(" ", "|")).upper())
+        grapheme_transcripts.append(to_grapheme_transcript(transcript))
 
-    generate_grapheme_labels(grapheme_transcripts, vocab_path)
+    if generate_labels:
+        generate_grapheme_labels(grapheme_transcripts, vocab_path)
 
     print("create_script started..")
     grpm2id, id2grpm = load_label(vocab_path)
@@ -68,25 +77,4 @@ def sentence_to_grapheme(audio_paths, transcripts, manifest_file_path: str, voca
 
 
 def generate_grapheme_labels(grapheme_transcripts, vocab_path: str):
-    vocab_list = list()
-    vocab_freq = list()
-
-    for grapheme_transcript in grapheme_transcripts:
-        graphemes = grapheme_transcript.split()
-        for grapheme in graphemes:
-            if grapheme not in vocab_list:
-                vocab_list.append(grapheme)
-                vocab_freq.append(1)
-            else:
-                vocab_freq[vocab_list.index(grapheme)] += 1
-
-    vocab_freq, vocab_list = zip(*sorted(zip(vocab_freq, vocab_list), reverse=True))
-    vocab_dict = {"id": [0, 1, 2, 3], "grpm": ["<pad>", "<sos>", "<eos>", "<blank>"], "freq": [0, 0, 0, 0]}
-
-    for idx, (grpm, freq) in enumerate(zip(vocab_list, vocab_freq)):
-        vocab_dict["id"].append(idx + 4)
-        vocab_dict["grpm"].append(grpm)
-        vocab_dict["freq"].append(freq)
-
-    label_df = pd.DataFrame(vocab_dict)
-    label_df.to_csv(vocab_path, encoding="utf-8", index=False)
+    generate_vocab_labels(grapheme_transcripts, vocab_path, unit_column="grpm", split=str.split)
@@ -22,75 +22,60 @@
 
 import os
 import re
+from functools import lru_cache
+from typing import Optional
 
 from joblib import Parallel, cpu_count, delayed
 from tqdm import tqdm
 
+NOISE = ["o", "n", "u", "b", "l"]
+EXCEPT = ["/", "+", "*", "-", "@", "$", "^", "&", "[", "]", "=", ":", ";", ","]
 
-def bracket_filter(sentence, mode="phonetic"):
-    new_sentence = str()
+# a noise tag is a noise character followed by "/", e.g. "o/", "b/"
+NOISE_PATTERN = re.compile(r"[{0}](?=/)".format("".join(NOISE)))
+WHITESPACE_PATTERN = re.compile(r"\s\s+")
 
-    if mode == "phonetic":
-        flag = False
 
-        for ch in sentence:
-            if ch == "(" and flag is False:
-                flag = True
-                continue
-            if ch == "(" and flag is True:
-                flag = False
-                continue
-            if ch != ")" and flag is False:
-                new_sentence += ch
+@lru_cache(maxsize=None)
+def _special_table(mode: str, replace: Optional[str]) -> dict:
+    table = {ord(ch): None for ch in EXCEPT}
+    table[ord("#")] = "샾"
+    if mode == "spelling":
+        table[ord("%")] = "%"
+    elif mode == "phonetic":
+        table[ord("%")] = replace
+    else:
+        table[ord("%")] = None
+    return table
 
-    elif mode == "spelling":
-        flag = True
 
-        for ch in sentence:
-            if ch == "(":
-                continue
-            if ch == ")":
-                if flag is True:
-                    flag = False
-                    continue
-                else:
-                    flag = True
-                    continue
-            if ch != ")" and flag is True:
-                new_sentence += ch
+def bracket_filter(sentence, mode="phonetic"):
+    r"""
+    Resolves the dual transcriptions of KsponSpeech, ``(spelling)/(phonetic)``.
 
+    ``phonetic`` keeps the second group of every pair: every ``(`` toggles between dropping and keeping, ``)`` is
+    removed. ``spelling`` keeps the first group: every ``)`` toggles, ``(`` is removed. Text outside brackets is kept
+    up to the toggles, as in the original character scan.
+    """
+    if mode == "phonetic":
+        return "".join(sentence.replace(")", "").split("(")[0::2])
+    elif mode == "spelling":
+        return "".join(sentence.replace("(", "").split(")")[0::2])
     else:
         raise ValueError("Unsupported mode : {0}".format(mode))
 
-    return new_sentence
-
 
 def special_filter(sentence, mode="phonetic", replace=None):
-    SENTENCE_MARK = ["?", "!", "."]
-    NOISE = ["o", "n", "u", "b", "l"]
-    EXCEPT = ["/", "+", "*", "-", "@", "$", "^", "&", "[", "]", "=", ":", ";", ","]
-
-    new_sentence = str()
-    for idx, ch in enumerate(sentence):
-        if ch not in SENTENCE_MARK:
-            if idx + 1 < len(sentence) and ch in NOISE and sentence[idx + 1] == "/":
-                continue
+    r"""
+    Removes noise tags and special characters, spells out ``#`` and ``%``, and collapses white spaces.
 
-        if ch == "#":
-            new_sentence += "샾"
+    ``%`` becomes ``replace`` in ``phonetic`` mode (required if the sentence has one) and stays in ``spelling`` mode.
+    """
+    if mode == "phonetic" and replace is None and "%" in sentence:
+        raise ValueError("`replace` is required to spell out '%' in phonetic mode")
 
-        elif ch == "%":
-            if mode == "phonetic":
-                new_sentence += replace
-            elif mode == "spelling":
-                new_sentence += "%"
-
-        elif ch not in EXCEPT:
-            new_sentence += ch
-
-    pattern = re.compile(r"\s\s+")
-    new_sentence = re.sub(pattern, " ", new_sentence.strip())
-    return new_sentence
+    new_sentence = NOISE_PATTERN.sub("", sentence).translate(_special_table(mode, replace))
+    return WHITESPACE_PATTERN.sub(" ", new_sentence.strip())
 
 
 def sentence_filter(raw_sentence, mode, replace=None):
@@ -126,7 +111,7 @@ def preprocess(dataset_path, mode="phonetic"):
     audio_paths = list()
     transcripts = list()
 
-    with Parallel(n_jobs=cpu_count() - 1) as parallel:
+    with Parallel(n_jobs=max(cpu_count() - 1, 1)) as parallel:
         for folder in os.listdir(dataset_path):
             # folder : {KsponSpeech_01, ..., KsponSpeech_05}
             path = os.path.join(dataset_path, folder)
@@ -156,17 +141,51 @@ def preprocess(dataset_path, mode="phonetic"):
     return audio_paths, transcripts
 
 
+TEST_SPLITS = ("eval_clean.trn", "eval_other.trn")
+
+
+def read_test_manifest_file(file_path, mode="phonetic"):
+    r"""Returns the ``(audio_path, transcript)`` pairs of a KsponSpeech evaluation script (``*.trn``)"""
+    entries = list()
+    with open(file_path, encoding="utf-8") as f:
+        for line in f.readlines():
+            audio_path, raw_transcript = line.split(" :: ")
+            entries.append((audio_path, sentence_filter(raw_transcript, mode=mode)))
+    return entries
+
+
 def preprocess_test_data(manifest_file_dir: str, mode="phonetic"):
     audio_paths = list()
     transcripts = list()
 
-    for split in ("eval_clean.trn", "eval_other.trn"):
-        with open(os.path.join(manifest_file_dir, split), encoding="utf-8") as f:
-            for line in f.readlines():
-                audio_path, raw_transcript = line.split(" :: ")
-                transcript = sentence_filter(raw_transcript, mode=mode)
-
-                audio_paths.append(audio_path)
-                transcripts.append(transcript)
+    for split in TEST_SPLITS:
+        for audio_path, transcript in read_test_manifest_file(os.path.join(manifest_file_dir, split), mode):
+            audio_paths.append(audio_path)
+            transcripts.append(transcript)
 
     return audio_paths, transcripts
+
+
+def list_text_files(dataset_path):
+    r"""Yields every subfolder of KsponSpeech (``KsponSpeech_0X/KsponSpeech_XXXX``) with its transcript files"""
+    for folder in sorted(os.listdir(dataset_path)):
+        path = os.path.join(dataset_path, folder)
+        if not folder.startswith("KsponSpeech") or not os.path.isdir(path):
+            continue
+
+        for subfolder in sorted(os.listdir(path)):
+            subfolder_path = os.path.join(path, subfolder)
+            if not os.path.isdir(subfolder_path):
+                continue
+
+            file_paths = [
+                os.path.join(subfolder_path, file_name)
+                for file_name in os.listdir(subfolder_path)
+                if file_name.endswith(".txt")
+            ]
+            yield os.path.join(folder, subfolder), file_paths
+
+
+def read_text_file_entries(file_path, dataset_path, mode="phonetic"):
+    r"""Returns the ``(audio_path, transcript)`` pair of a transcript file, as ``preprocess`` does"""
+    return [(os.path.relpath(file_path, dataset_path), read_preprocess_text_file(file_path, mode))]
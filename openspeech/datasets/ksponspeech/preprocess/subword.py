@@ -20,52 +20,96 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional, Tuple
 
 import sentencepiece as spm
 
 SENTENCEPIECE_MODEL_PREFIX = "sp"
 SENTENCEPIECE_MODEL_TYPE = "bpe"
 
+_sp = None
 
-def train_sentencepiece(transcripts, vocab_size: int = 3200, blank_token: str = "<blank>") -> None:
-    print("generate_sentencepiece_input..")
-
-    with open("sentencepiece_input.txt", "w", encoding="utf-8") as f:
-        for transcript in transcripts:
-            f.write(f"{transcript}\n")
 
+def train_sentencepiece(transcripts, vocab_size: int = 3200, blank_token: str = "<blank>") -> None:
+    r"""Trains the sentencepiece model (``sp.model``) on transcripts, streamed to the trainer without an input file"""
     spm.SentencePieceTrainer.Train(
-        f"--input=sentencepiece_input.txt "
-        f"--model_prefix={SENTENCEPIECE_MODEL_PREFIX} "
-        f"--vocab_size={vocab_size} "
-        f"--model_type={SENTENCEPIECE_MODEL_TYPE} "
-        f"--pad_id=0 "
-        f"--bos_id=1 "
-        f"--eos_id=2 "
-        f"--unk_id=3 "
-        f"--user_defined_symbols={blank_token}"
+        sentence_iterator=iter(transcripts),
+        model_prefix=SENTENCEPIECE_MODEL_PREFIX,
+        vocab_size=vocab_size,
+        model_type=SENTENCEPIECE_MODEL_TYPE,
+        pad_id=0,
+        bos_id=1,
+        eos_id=2,
+        unk_id=3,
+        user_defined_symbols=blank_token,
     )
 
 
 def convert_subword(transcript: str, sp: spm.SentencePieceProcessor):
-    text = " ".join(sp.EncodeAsPieces(transcript))
-    label = " ".join([str(sp.PieceToId(token)) for token in text])
+    pieces = sp.EncodeAsPieces(transcript)
+    text = " ".join(pieces)
+    label = " ".join([str(sp.PieceToId(piece)) for piece in pieces])
     return text, label
 
 
+def _init_encoder(sp_model_path: str) -> None:
+    global _sp
+    _sp = spm.SentencePieceProcessor()
+    _sp.Load(sp_model_path)
+
+
+def _encode_chunk(transcripts: list) -> list:
+    pieces = _sp.encode(transcripts, out_type=str)
+    ids = _sp.encode(transcripts, out_type=int)
+    return [(" ".join(piece), " ".join(map(str, id_))) for piece, id_ in zip(pieces, ids)]
+
+
+def encode_subwords(
+    transcripts: list, sp_model_path: str, num_workers: Optional[int] = None, chunk_size: int = 2000
+) -> Iterator[Tuple[str, str]]:
+    r"""
+    Encodes transcripts with sentencepiece batch encoding in worker processes.
+
+    Args:
+        transcripts (list): list of transcript
+        sp_model_path (str): path of sentencepiece model
+        num_workers (int, optional): the number of worker processes (default: the number of CPUs)
+        chunk_size (int): the number of transcripts encoded per task
+
+    Returns:
+        iterator of ``(pieces, label)``: space separated pieces and ids of every transcript, in order
+    """
+    chunks = [transcripts[i : i + chunk_size] for i in range(0, len(transcripts), chunk_size)]
+
+    if len(chunks) <= 1 or num_workers == 1:
+        _init_encoder(sp_model_path)
+        for chunk in chunks:
+            yield from _encode_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_encoder, initargs=(sp_model_path,)) as executor:
+        for encoded in executor.map(_encode_chunk, chunks):
+            yield from encoded
+
+
 def sentence_to_subwords(
-    audio_paths: list, transcripts: list, manifest_file_path: str, sp_model_path: str = "sp.model"
+    audio_paths: list,
+    transcripts: list,
+    manifest_file_path: str,
+    sp_model_path: str = "sp.model",
+    num_workers: Optional[int] = None,
 ) -> None:
     print("sentence_to_subwords...")
-    if sp_model_path != f"{SENTENCEPIECE_MODEL_PREFIX}.model":
-        shutil.copy(f"{SENTENCEPIECE_MODEL_PREFIX}.model", sp_model_path)
+    trained_model_path = f"{SENTENCEPIECE_MODEL_PREFIX}.model"
+    if sp_model_path != trained_model_path and os.path.exists(trained_model_path):
+        shutil.copy(trained_model_path, sp_model_path)
 
-    sp = spm.SentencePieceProcessor()
-    sp.Load(sp_model_path)
+    encoded = encode_subwords(list(transcripts), sp_model_path, num_workers=num_workers)
 
-    with open(manifest_file_path, "w", encoding="utf-8") as f:
-        for audio_path, transcript in zip(audio_paths, transcripts):
+    with open(manifest_file_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        for audio_path, (text, label) in zip(audio_paths, encoded):
             audio_path = audio_path.replace("txt", "pcm")
-            text, label = convert_subword(transcript, sp)
             f.write(f"{audio_path}\t{text}\t{label}\n")
@@ -25,12 +25,14 @@ import os
 import random
 from typing import Optional
 
+import numpy as np
 import pytorch_lightning as pl
 from omegaconf import DictConfig
 
 from openspeech.data.sampler import RandomSampler
+from openspeech.data.text.corpus import load_or_tokenize_corpus
 from openspeech.data.text.data_loader import TextDataLoader
-from openspeech.data.text.dataset import TextDataset
+from openspeech.data.text.dataset import PackedTextDataset, TextDataset
 from openspeech.datasets import register_data_module
 from openspeech.tokenizers.tokenizer import Tokenizer
 
@@ -41,13 +43,50 @@ class LightningLanguageModelDataModule(pl.LightningDataModule):
         super(LightningLanguageModelDataModule, self).__init__()
         self.configs = configs
         self.dataset = dict()
+        self.train_sampler = None
+        self.train_sampler_state = None
         self.logger = logging.getLogger(__name__)
 
     def prepare_data(self):
         if not os.path.exists(self.configs.dataset.dataset_path):
             raise FileNotFoundError
 
+    def _setup_tokenized(self, tokenizer: Tokenizer) -> None:
+        sentences = load_or_tokenize_corpus(
+            self.configs.dataset.dataset_path,
+            tokenizer,
+            output_path=self.configs.dataset.tokenized_corpus_path,
+            encoding=self.configs.tokenizer.encoding,
+        )
+        indices = np.random.permutation(len(sentences))
+
+        train_ratio = 1 - self.configs.dataset.valid_ratio - self.configs.dataset.test_ratio
+
+        num_train_sentences = int(len(sentences) * train_ratio)
+        num_valid_sentences = int(len(sentences) * self.configs.dataset.valid_ratio)
+        valid_end_idx = num_train_sentences + num_valid_sentences
+
+        indices = {
+            "train": indices[:num_train_sentences],
+            "valid": indices[num_train_sentences:valid_end_idx],
+            "test": indices[valid_end_idx:],
+        }
+
+        for stage in indices.keys():
+            if self.configs.dataset.block_size is not None:
+                # blocks pack sentences in corpus order, the sampler shuffles the blocks
+                self.dataset[stage] = PackedTextDataset(
+                    sentences.take(np.sort(indices[stage])),
+                    tokenizer=tokenizer,
+                    block_size=self.configs.dataset.block_size,
+                )
+            else:
+                self.dataset[stage] = TextDataset(transcripts=sentences.take(indices[stage]), tokenizer=tokenizer)
+
     def setup(self, stage: Optional[str] = None, tokenizer: Tokenizer = None):
+        if self.configs.dataset.pretokenize or self.configs.dataset.block_size is not None:
+            return self._setup_tokenized(tokenizer)
+
         num_total_transcripts = 0
         transcripts = list()
 
@@ -78,11 +117,14 @@ class LightningLanguageModelDataModule(pl.LightningDataModule):
             )
 
     def train_dataloader(self) -> TextDataLoader:
-        train_sampler = RandomSampler(self.dataset["train"], batch_size=self.configs.trainer.batch_size)
+        self.train_sampler = RandomSampler(self.dataset["train"], batch_size=self.configs.trainer.batch_size)
+        if self.train_sampler_state is not None:
+            self.train_sampler.load_state_dict(self.train_sampler_state)
+            self.train_sampler_state = None
         return TextDataLoader(
             dataset=self.dataset["train"],
             num_workers=self.configs.trainer.num_workers,
-            batch_sampler=train_sampler,
+            batch_sampler=self.train_sampler,
         )
 
     def val_dataloader(self) -> TextDataLoader:
@@ -102,3 +144,12 @@ class LightningLanguageModelDataModule(pl.LightningDataModule):
             num_workers=self.configs.trainer.num_workers,
             batch_sampler=train_sampler,
         )
+
+    def on_save_checkpoint(self, checkpoint: dict) -> None:
+        r"""Store the train sampler state, so that resuming skips the batches already seen."""
+        if self.train_sampler is not None:
+            checkpoint["train_sampler"] = self.train_sampler.state_dict()
+
+    def on_load_checkpoint(self, checkpoint: dict) -> None:
+        r"""Keep the train sampler state until the train dataloader is built."""
+        self.train_sampler_state = checkpoint.get("train_sampler")
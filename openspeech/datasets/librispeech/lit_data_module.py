@@ -26,14 +26,19 @@ import shutil
 import tarfile
 from typing import Optional, Tuple
 
+import numpy as np
 import pytorch_lightning as pl
 import wget
 from omegaconf import DictConfig
+from torch.utils.data import IterableDataset
 
+from openspeech.data.audio.archive import ArchiveIndex, ArchiveReader, decompress_archive, load_or_build_archive_index
+from openspeech.data.audio.builder import build_speech_to_text_datasets
 from openspeech.data.audio.data_loader import AudioDataLoader
-from openspeech.data.audio.dataset import SpeechToTextDataset
-from openspeech.data.sampler import RandomSampler, SmartBatchingSampler
+from openspeech.data.manifest import load_manifest
+from openspeech.data.sampler import build_sampler
 from openspeech.datasets import register_data_module
+from openspeech.datasets.librispeech.preprocess.preprocess import archive_member_to_audio_path
 from openspeech.tokenizers.tokenizer import Tokenizer
 
 
@@ -65,22 +70,39 @@ class LightningLibriSpeechDataModule(pl.LightningDataModule):
         super(LightningLibriSpeechDataModule, self).__init__()
         self.configs = configs
         self.dataset = dict()
+        self.train_sampler = None
+        self.train_sampler_state = None
+        self.archive_index = None
         self.logger = logging.getLogger(__name__)
 
-    def _parse_manifest_file(self, manifest_file_path: str) -> Tuple[list, list]:
-        """Parsing manifest file"""
-        audio_paths = list()
-        transcripts = list()
+    def _parse_manifest_file(self, manifest_file_path: str) -> Tuple[list, list, Optional[np.ndarray]]:
+        """Parsing manifest file (or its binary manifest if it is up to date, with its audio lengths)"""
+        return load_manifest(manifest_file_path, sample_rate=self.configs.audio.sample_rate)
 
-        with open(manifest_file_path) as f:
-            for idx, line in enumerate(f.readlines()):
-                audio_path, _, transcript = line.split("\t")
-                transcript = transcript.replace("\n", "")
-
-                audio_paths.append(audio_path)
-                transcripts.append(transcript)
+    def _load_archive_index(self) -> ArchiveIndex:
+        """
+        Loads the index of the LibriSpeech archives (``{part}.tar`` or ``{part}.tar.gz`` in ``dataset_path``),
+        building it with one pass over the archives if it is missing or out of date. A ``{part}.tar.gz`` is replaced
+        with its decompressed ``{part}.tar``.
+        """
+        if self.archive_index is None:
+            archive_paths = list()
+            for part in self.LIBRISPEECH_PARTS:
+                archive_path = os.path.join(self.configs.dataset.dataset_path, f"{part}.tar")
+                if not os.path.exists(archive_path):
+                    archive_path = f"{archive_path}.gz"
+                if not os.path.exists(archive_path):
+                    raise FileNotFoundError(f"{part}.tar(.gz) is not in {self.configs.dataset.dataset_path}")
+                archive_paths.append(archive_path)
 
-        return audio_paths, transcripts
+            self.archive_index = load_or_build_archive_index(
+                archive_paths,
+                index_path=f"{self.configs.dataset.manifest_file_path}.archive.npz",
+                member_to_path=archive_member_to_audio_path,
+                text_suffix=".trans.txt",
+                remove_compressed=True,
+            )
+        return self.archive_index
 
     def _download_dataset(self) -> None:
         """
@@ -103,12 +125,19 @@ class LightningLibriSpeechDataModule(pl.LightningDataModule):
             wget.download(url)
             shutil.move(f"{part}.tar.gz", os.path.join(self.configs.dataset.dataset_path, f"{part}.tar.gz"))
 
+            if self.configs.dataset.archive_index:
+                decompress_archive(f"{self.configs.dataset.dataset_path}/{part}.tar.gz", remove_compressed=True)
+                continue
+
             self.logger.info(f"Un-tarring archive {self.configs.dataset.dataset_path}/{part}.tar.gz")
             tar = tarfile.open(f"{self.configs.dataset.dataset_path}/{part}.tar.gz", mode="r:gz")
             tar.extractall(self.configs.dataset.dataset_path)
             tar.close()
             os.remove(f"{self.configs.dataset.dataset_path}/{part}.tar.gz")
 
+        if self.configs.dataset.archive_index:
+            return
+
         self.logger.info("Merge all train packs into one")
 
         if not os.path.exists(self.configs.dataset.dataset_path):
@@ -144,6 +173,7 @@ class LightningLibriSpeechDataModule(pl.LightningDataModule):
 
         if not os.path.exists(self.configs.dataset.manifest_file_path):
             self.logger.info("Manifest file is not exists !!\n" "Generate manifest files..")
+            archive_index = self._load_archive_index() if self.configs.dataset.archive_index else None
 
             if hasattr(self.configs.tokenizer, "vocab_size"):
                 generate_manifest_files(
@@ -151,18 +181,20 @@ class LightningLibriSpeechDataModule(pl.LightningDataModule):
                     manifest_file_path=self.configs.dataset.manifest_file_path,
                     vocab_path=self.configs.tokenizer.vocab_path,
                     vocab_size=self.configs.tokenizer.vocab_size,
+                    archive_index=archive_index,
                 )
             else:
                 generate_manifest_files(
                     dataset_path=self.configs.dataset.dataset_path,
                     manifest_file_path=self.configs.dataset.manifest_file_path,
                     vocab_path=self.configs.tokenizer.vocab_path,
+                    archive_index=archive_index,
                 )
 
     def setup(self, stage: Optional[str] = None) -> None:
         r"""Split dataset into train, valid, and test."""
         valid_end_idx = self.LIBRISPEECH_TRAIN_NUM + self.LIBRISPEECH_VALID_NUM
-        audio_paths, transcripts = self._parse_manifest_file(self.configs.dataset.manifest_file_path)
+        audio_paths, transcripts, audio_lengths = self._parse_manifest_file(self.configs.dataset.manifest_file_path)
 
         audio_paths = {
             "train": audio_paths[: self.LIBRISPEECH_TRAIN_NUM],
@@ -175,28 +207,48 @@ class LightningLibriSpeechDataModule(pl.LightningDataModule):
             "test": transcripts[valid_end_idx:],
         }
 
-        for stage in audio_paths.keys():
-            self.dataset[stage] = SpeechToTextDataset(
-                configs=self.configs,
-                dataset_path=os.path.join(self.configs.dataset.dataset_path, "LibriSpeech"),
-                audio_paths=audio_paths[stage],
-                transcripts=transcripts[stage],
-                apply_spec_augment=self.configs.audio.apply_spec_augment if stage == "train" else False,
-                del_silence=self.configs.audio.del_silence if stage == "train" else False,
-            )
+        manifest_audio_lengths = None
+        if audio_lengths is not None:
+            manifest_audio_lengths = {
+                "train": audio_lengths[: self.LIBRISPEECH_TRAIN_NUM],
+                "valid": audio_lengths[self.LIBRISPEECH_TRAIN_NUM : valid_end_idx],
+                "test": audio_lengths[valid_end_idx:],
+            }
+
+        dataset_path = os.path.join(self.configs.dataset.dataset_path, "LibriSpeech")
+        audio_reader = None
+        if self.configs.dataset.archive_index:
+            audio_reader = ArchiveReader(self._load_archive_index(), dataset_path=dataset_path)
+
+        self.dataset = build_speech_to_text_datasets(
+            self.configs,
+            audio_paths=audio_paths,
+            transcripts=transcripts,
+            dataset_paths={stage: dataset_path for stage in audio_paths.keys()},
+            manifest_audio_lengths=manifest_audio_lengths,
+            audio_reader=audio_reader,
+        )
 
     def train_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        train_sampler = sampler(data_source=self.dataset["train"], batch_size=self.configs.trainer.batch_size)
+        if isinstance(self.dataset["train"], IterableDataset):
+            return AudioDataLoader(
+                dataset=self.dataset["train"],
+                num_workers=self.configs.trainer.num_workers,
+                batch_sampler=None,
+                batch_size=self.configs.trainer.batch_size,
+            )
+        self.train_sampler = build_sampler(self.configs, self.dataset["train"])
+        if self.train_sampler_state is not None:
+            self.train_sampler.load_state_dict(self.train_sampler_state)
+            self.train_sampler_state = None
         return AudioDataLoader(
             dataset=self.dataset["train"],
             num_workers=self.configs.trainer.num_workers,
-            batch_sampler=train_sampler,
+            batch_sampler=self.train_sampler,
         )
 
     def val_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        valid_sampler = sampler(self.dataset["valid"], batch_size=self.configs.trainer.batch_size)
+        valid_sampler = build_sampler(self.configs, self.dataset["valid"])
         return AudioDataLoader(
             dataset=self.dataset["valid"],
             num_workers=self.configs.trainer.num_workers,
@@ -204,10 +256,18 @@ class LightningLibriSpeechDataModule(pl.LightningDataModule):
         )
 
     def test_dataloader(self) -> AudioDataLoader:
-        sampler = SmartBatchingSampler if self.configs.trainer.sampler == "smart" else RandomSampler
-        test_sampler = sampler(self.dataset["test"], batch_size=self.configs.trainer.batch_size)
+        test_sampler = build_sampler(self.configs, self.dataset["test"])
         return AudioDataLoader(
             dataset=self.dataset["test"],
             num_workers=self.configs.trainer.num_workers,
             batch_sampler=test_sampler,
         )
+
+    def on_save_checkpoint(self, checkpoint: dict) -> None:
+        r"""Store the train sampler state, so that resuming skips the batches already seen."""
+        if self.train_sampler is not None:
+            checkpoint["train_sampler"] = self.train_sampler.state_dict()
+
+    def on_load_checkpoint(self, checkpoint: dict) -> None:
+        r"""Keep the train sampler state until the train dataloader is built."""
+        self.train_sampler_state = checkpoint.get("train_sampler")
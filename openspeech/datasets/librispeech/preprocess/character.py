@@ -21,10 +21,12 @@
 # SOFTWARE.
 
 import logging
+from typing import Optional
 
 import pandas as pd
 
-from openspeech.datasets.librispeech.preprocess.preprocess import collect_transcripts
+from openspeech.data.audio.archive import ArchiveIndex
+from openspeech.datasets.librispeech.preprocess.preprocess import collect_archive_transcripts, collect_transcripts
 
 logger = logging.getLogger(__name__)
 
@@ -72,13 +74,19 @@ def sentence_to_target(sentence, char2id):
     return target[:-1]
 
 
-def generate_manifest_files(dataset_path: str, manifest_file_path: str, vocab_path: str) -> None:
+def generate_manifest_files(
+    dataset_path: str,
+    manifest_file_path: str,
+    vocab_path: str,
+    archive_index: Optional[ArchiveIndex] = None,
+) -> None:
     """
     Generate manifest files.
     Format: {audio_path}\t{transcript}\t{numerical_label}
 
     Args:
         vocab_size (int): size of subword vocab
+        archive_index (ArchiveIndex, optional): collect transcripts from indexed archives instead of the directory
 
     Returns:
         None
@@ -86,7 +94,10 @@ def generate_manifest_files(dataset_path: str, manifest_file_path: str, vocab_pa
     _generate_character_labels(vocab_path)
     char2id, id2char = _load_label(vocab_path)
 
-    transcripts_collection = collect_transcripts(dataset_path)
+    if archive_index is not None:
+        transcripts_collection = collect_archive_transcripts(archive_index)
+    else:
+        transcripts_collection = collect_transcripts(dataset_path)
 
     with open(manifest_file_path, "w") as f:
         for idx, part in enumerate(["train-960", "dev-clean", "dev-other", "test-clean", "test-other"]):
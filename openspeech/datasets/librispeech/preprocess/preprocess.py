@@ -29,6 +29,11 @@ LIBRI_SPEECH_DATASETS = [
     "test-clean",
     "test-other",
 ]
+TRAIN_PARTS = [
+    "train-clean-100",
+    "train-clean-360",
+    "train-other-500",
+]
 
 
 def collect_transcripts(dataset_path):
@@ -57,3 +62,38 @@ def collect_transcripts(dataset_path):
         transcripts_collection.append(dataset_transcripts)
 
     return transcripts_collection
+
+
+def archive_member_to_audio_path(member_name: str) -> str:
+    """
+    Maps a member of a LibriSpeech archive (e.g. ``LibriSpeech/train-clean-100/19/198/19-198-0001.flac``) to its
+    audio path in the manifest (``train-960/19/198/19-198-0001.flac``). Train parts are merged into train-960.
+    """
+    parts = member_name.split("/")
+    if parts[0] == "LibriSpeech":
+        parts = parts[1:]
+    if parts and parts[0] in TRAIN_PARTS:
+        parts[0] = "train-960"
+    return "/".join(parts)
+
+
+def collect_archive_transcripts(archive_index):
+    """Collect librispeech transcripts from the ``*.trans.txt`` members of an archive index"""
+    transcripts_collection = {dataset: list() for dataset in LIBRI_SPEECH_DATASETS}
+
+    for text_path, text in zip(archive_index.text_paths, archive_index.texts):
+        if not text_path.endswith(".trans.txt"):
+            continue
+        dataset = text_path.split("/")[0]
+        if dataset not in transcripts_collection:
+            continue
+
+        for line in text.splitlines():
+            tokens = line.split()
+            if not tokens:
+                continue
+            audio_path = f"{os.path.join(os.path.dirname(text_path), tokens[0])}.flac"
+            if audio_path in archive_index:
+                transcripts_collection[dataset].append("%s|%s" % (audio_path, " ".join(tokens[1:])))
+
+    return [sorted(transcripts_collection[dataset]) for dataset in LIBRI_SPEECH_DATASETS]
@@ -22,10 +22,12 @@
 
 import os
 import shutil
+from typing import Optional
 
 import sentencepiece as spm
 
-from openspeech.datasets.librispeech.preprocess.preprocess import collect_transcripts
+from openspeech.data.audio.archive import ArchiveIndex
+from openspeech.datasets.librispeech.preprocess.preprocess import collect_archive_transcripts, collect_transcripts
 
 SENTENCEPIECE_MODEL_NAME = "sp"
 
@@ -52,18 +54,28 @@ def _prepare_tokenizer(train_transcripts, vocab_size):
     )
 
 
-def generate_manifest_files(dataset_path: str, manifest_file_path: str, vocab_path: str, vocab_size: int) -> None:
+def generate_manifest_files(
+    dataset_path: str,
+    manifest_file_path: str,
+    vocab_path: str,
+    vocab_size: int,
+    archive_index: Optional[ArchiveIndex] = None,
+) -> None:
     """
     Generate manifest files.
     Format: {audio_path}\t{transcript}\t{numerical_label}
 
     Args:
         vocab_size (int): size of subword vocab
+        archive_index (ArchiveIndex, optional): collect transcripts from indexed archives instead of the directory
 
     Returns:
         None
     """
-    transcripts_collection = collect_transcripts(dataset_path)
+    if archive_index is not None:
+        transcripts_collection = collect_archive_transcripts(archive_index)
+    else:
+        transcripts_collection = collect_transcripts(dataset_path)
     _prepare_tokenizer(transcripts_collection[0], vocab_size)
 
     shutil.copy(f"{SENTENCEPIECE_MODEL_NAME}.model", os.path.join(vocab_path, f"{SENTENCEPIECE_MODEL_NAME}.model"))
@@ -20,25 +20,130 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Tuple
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from operator import itemgetter
+from typing import Optional, Tuple
 
 import Levenshtein as Lev
+import numpy as np
 import torch
 
+ERROR_RATE_BACKENDS = ("auto", "batch", "levenshtein")
+EDIT_OPERATIONS = {"replace": 0, "delete": 1, "insert": 2}
+SURROGATE_START = 0xD800
+SURROGATE_SIZE = 0x800
+
+
+def edit_distance(
+    references: np.ndarray,
+    reference_lengths: np.ndarray,
+    hypotheses: np.ndarray,
+    hypothesis_lengths: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    r"""
+    Levenshtein alignment of every pair of a batch of padded id sequences. The ids are compared directly, so no
+    pair is decoded to sentences: each id is mapped to one code point and each pair is aligned by the C
+    implementation of ``Levenshtein.editops``.
+
+    Args:
+        references (np.ndarray): padded reference ids of shape (batch, max_reference_length)
+        reference_lengths (np.ndarray): length of each reference
+        hypotheses (np.ndarray): padded hypothesis ids of shape (batch, max_hypothesis_length)
+        hypothesis_lengths (np.ndarray): length of each hypothesis
+
+    Returns: substitutions, deletions, insertions
+        - **substitutions** (np.ndarray): the number of substituted ids of each pair
+        - **deletions** (np.ndarray): the number of reference ids missing in the hypothesis of each pair
+        - **insertions** (np.ndarray): the number of extra hypothesis ids of each pair
+    """
+    references, hypotheses = _to_numpy(references), _to_numpy(hypotheses)
+    return _edit_operations(
+        _pack(references, np.arange(references.shape[1]) < np.asarray(reference_lengths)[:, None]),
+        _pack(hypotheses, np.arange(hypotheses.shape[1]) < np.asarray(hypothesis_lengths)[:, None]),
+    )
+
+
+def _edit_operations(references: list, hypotheses: list) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    r"""Counts the substitutions, deletions and insertions aligning each pair of strings or lists of words"""
+    operations = np.zeros((3, len(references)), dtype=np.int64)
+
+    for idx, (reference, hypothesis) in enumerate(zip(references, hypotheses)):
+        if reference == hypothesis:
+            continue
+        for operation, count in Counter(map(itemgetter(0), Lev.editops(reference, hypothesis))).items():
+            operations[EDIT_OPERATIONS[operation], idx] = count
+
+    return operations[0], operations[1], operations[2]
+
+
+def _to_numpy(labels) -> np.ndarray:
+    if isinstance(labels, torch.Tensor):
+        labels = labels.detach().cpu().numpy()
+    labels = np.asarray(labels, dtype=np.int64)
+    return labels[None] if labels.ndim == 1 else labels
+
+
+def _keep_mask(labels: np.ndarray, eos_id: Optional[int], drop_ids: list) -> np.ndarray:
+    r"""Masks the ids of each row of ``labels`` before its first ``eos_id`` that are not in ``drop_ids``"""
+    keep = ~np.isin(labels, drop_ids)
+    if eos_id is not None and labels.shape[1] > 0:
+        is_eos = labels == eos_id
+        lengths = np.where(is_eos.any(axis=1), is_eos.argmax(axis=1), labels.shape[1])
+        keep &= np.arange(labels.shape[1]) < lengths[:, None]
+    return keep
+
+
+def _pack(labels: np.ndarray, keep: np.ndarray) -> list:
+    r"""
+    Converts the kept ids of each row of ``labels`` to a string holding one code point per id. All rows are gathered
+    into a single string, which is then sliced, like :meth:`UnitTable.decode`. Ids from the surrogate range on are
+    shifted past it, as surrogates cannot be encoded.
+    """
+    codepoints = labels[keep]
+    codepoints = codepoints + (codepoints >= SURROGATE_START) * SURROGATE_SIZE
+    text = codepoints.astype("<u4").tobytes().decode("utf-32-le")
+    ends = np.cumsum(keep.sum(axis=1)).tolist()
+    return [text[start:end] for start, end in zip([0] + ends[:-1], ends)]
+
+
+def _code(unit_id: int) -> str:
+    return chr(unit_id + SURROGATE_SIZE if unit_id >= SURROGATE_START else unit_id)
+
 
 class ErrorRate(object):
     r"""
     Provides inteface of error rate calcuation.
 
+    With the `batch` backend, distances of the whole batch are computed from the ids by :func:`edit_distance`
+    instead of decoding every pair to strings, and the substitution, deletion and insertion counts are accumulated
+    too. Every id counts as one unit, after the special ids (blank, pad and sos) are removed and each sequence is
+    cut at its first eos, as the decoded strings are. The `auto` backend uses it for tokenizers with a ``unit_table`` (character
+    level tokenizers), and Levenshtein distances of the decoded strings otherwise.
+
     Note:
         Do not use this class directly, use one of the sub classes.
+
+    Args:
+        tokenizer (Tokenizer): tokenizer is in charge of preparing the inputs for a model.
+        backend (str): distance backend (auto, batch, levenshtein)
     """
 
-    def __init__(self, tokenizer) -> None:
+    def __init__(self, tokenizer, backend: str = "auto") -> None:
         self.total_dist = 0.0
         self.total_length = 0.0
+        self.total_substitutions = 0
+        self.total_deletions = 0
+        self.total_insertions = 0
         self.tokenizer = tokenizer
 
+        if backend not in ERROR_RATE_BACKENDS:
+            raise ValueError(f"Unsupported error rate backend: {backend}")
+        if backend == "auto":
+            backend = "batch" if getattr(tokenizer, "unit_table", None) is not None else "levenshtein"
+        self.backend = backend
+
     def __call__(self, targets, y_hats):
         r"""
         Calculating error rate.
@@ -67,13 +172,17 @@ class ErrorRate(object):
             - **total_dist**: total distance between targets & y_hats
             - **total_length**: total length of targets sequence
         """
+        if self.backend == "batch":
+            substitutions, deletions, insertions, lengths = self.batch_metric(_to_numpy(targets), _to_numpy(y_hats))
+            self.total_substitutions += int(substitutions.sum())
+            self.total_deletions += int(deletions.sum())
+            self.total_insertions += int(insertions.sum())
+            return int(substitutions.sum() + deletions.sum() + insertions.sum()), int(lengths.sum())
+
         total_dist = 0
         total_length = 0
 
-        for (target, y_hat) in zip(targets, y_hats):
-            s1 = self.tokenizer.decode(target)
-            s2 = self.tokenizer.decode(y_hat)
-
+        for (s1, s2) in zip(self.tokenizer.decode_batch(targets), self.tokenizer.decode_batch(y_hats)):
             dist, length = self.metric(s1, s2)
 
             total_dist += dist
@@ -84,6 +193,18 @@ class ErrorRate(object):
     def metric(self, *args, **kwargs) -> Tuple[float, int]:
         raise NotImplementedError
 
+    def batch_metric(self, targets: np.ndarray, y_hats: np.ndarray) -> Tuple[np.ndarray, ...]:
+        raise NotImplementedError
+
+    def _special_ids(self) -> list:
+        r"""Returns the ids of the blank, pad and sos tokens of the tokenizer, which are not units of a sentence"""
+        special_ids = (getattr(self.tokenizer, name, None) for name in ("blank_id", "pad_id", "sos_id"))
+        return [unit_id for unit_id in special_ids if unit_id is not None]
+
+    def _unit_ids(self, predicate) -> list:
+        r"""Returns the ids of the units of the tokenizer satisfying ``predicate``"""
+        return [unit_id for unit_id, unit in self.tokenizer.unit_table.id2unit.items() if predicate(unit)]
+
 
 class CharacterErrorRate(ErrorRate):
     r"""
@@ -91,8 +212,12 @@ class CharacterErrorRate(ErrorRate):
     two provided sentences after tokenizing to characters.
     """
 
-    def __init__(self, tokenizer):
-        super(CharacterErrorRate, self).__init__(tokenizer)
+    def __init__(self, tokenizer, backend: str = "auto"):
+        super(CharacterErrorRate, self).__init__(tokenizer, backend)
+        if self.backend == "batch":
+            # ids removed before comparison, like spaces and subword markers of the decoded sentences
+            self.drop_ids = self._special_ids()
+            self.drop_ids += self._unit_ids(lambda unit: not unit.replace(" ", "").replace("_", ""))
 
     def metric(self, s1: str, s2: str) -> Tuple[float, int]:
         r"""
@@ -122,6 +247,19 @@ class CharacterErrorRate(ErrorRate):
 
         return dist, length
 
+    def batch_metric(self, targets: np.ndarray, y_hats: np.ndarray) -> Tuple[np.ndarray, ...]:
+        r"""
+        Computes the character edit operations of a batch of ids.
+
+        Returns: substitutions, deletions, insertions, lengths
+            - **substitutions**, **deletions**, **insertions**: edit operations of each pair
+            - **lengths**: length of each target sequence
+        """
+        target_mask = _keep_mask(targets, self.tokenizer.eos_id, self.drop_ids)
+        y_hat_mask = _keep_mask(y_hats, self.tokenizer.eos_id, self.drop_ids)
+        operations = _edit_operations(_pack(targets, target_mask), _pack(y_hats, y_hat_mask))
+        return (*operations, target_mask.sum(axis=1))
+
 
 class WordErrorRate(ErrorRate):
     r"""
@@ -129,8 +267,13 @@ class WordErrorRate(ErrorRate):
     two provided sentences after tokenizing to words.
     """
 
-    def __init__(self, tokenizer):
-        super(WordErrorRate, self).__init__(tokenizer)
+    def __init__(self, tokenizer, backend: str = "auto"):
+        super(WordErrorRate, self).__init__(tokenizer, backend)
+        if self.backend == "batch":
+            self.drop_ids = self._special_ids()
+            # every space id is replaced by the first one, which then separates the words
+            self.space_ids = self._unit_ids(lambda unit: not unit.strip())
+            self.separator = _code(self.space_ids[0]) if self.space_ids else ""
 
     def metric(self, s1: str, s2: str) -> Tuple[float, int]:
         r"""
@@ -157,3 +300,137 @@ class WordErrorRate(ErrorRate):
         length = len(s1.split())
 
         return dist, length
+
+    def batch_metric(self, targets: np.ndarray, y_hats: np.ndarray) -> Tuple[np.ndarray, ...]:
+        r"""
+        Computes the word edit operations of a batch of ids. Words are the runs of ids between space ids.
+
+        Returns: substitutions, deletions, insertions, lengths
+            - **substitutions**, **deletions**, **insertions**: edit operations of each pair
+            - **lengths**: the number of words of each target sequence
+        """
+        references, hypotheses = list(), list()
+
+        for labels, words in ((targets, references), (y_hats, hypotheses)):
+            keep = _keep_mask(labels, self.tokenizer.eos_id, self.drop_ids)
+            if len(self.space_ids) > 1:
+                labels = np.where(np.isin(labels, self.space_ids), self.space_ids[0], labels)
+            words.extend(self._split(sentence) for sentence in _pack(labels, keep))
+
+        operations = _edit_operations(references, hypotheses)
+        return (*operations, np.array([len(words) for words in references], dtype=np.int64))
+
+    def _split(self, sentence: str) -> list:
+        r"""Splits a string of ids (see ``_pack``) into its words, the non-empty runs between space ids"""
+        if not self.separator:
+            return [sentence] if sentence else list()
+        return [word for word in sentence.split(self.separator) if word]
+
+
+class MetricScheduler(object):
+    r"""
+    Schedules the word & character error rate updates of training steps, so that they don't stall the training loop.
+    The error rates are updated every ``interval`` steps, from ``sample_size`` randomly sampled utterances of the batch,
+    and on a background thread if ``asynchronous`` is set. Its accumulators are its own, so validation and test
+    metrics stay exact.
+
+    With ``asynchronous``, at most one update runs at a time: a scheduled update is skipped while the previous one is
+    still running, and the returned error rates are the ones of the last finished update.
+
+    Args:
+        tokenizer (Tokenizer): tokenizer is in charge of preparing the inputs for a model.
+        interval (int): update the error rates every ``interval`` steps
+        sample_size (int): the number of utterances of a batch to update from (0 means all)
+        asynchronous (bool): update the error rates on a background thread
+        seed (int): seed of the utterance sampling
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        interval: int = 1,
+        sample_size: int = 0,
+        asynchronous: bool = False,
+        seed: int = 1,
+    ) -> None:
+        if interval < 1:
+            raise ValueError(f"interval should be positive, got {interval}")
+        self.wer_metric = WordErrorRate(tokenizer)
+        self.cer_metric = CharacterErrorRate(tokenizer)
+        self.interval = interval
+        self.sample_size = sample_size
+        self.asynchronous = asynchronous
+        self.seed = seed
+        self.num_steps = 0
+        self.wer = None
+        self.cer = None
+        self._reset_runtime()
+
+    def _reset_runtime(self) -> None:
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1) if self.asynchronous else None
+        self._pending: Optional[Future] = None
+        self._generator = torch.Generator().manual_seed(self.seed)
+
+    def __getstate__(self):
+        self.wait()
+        state = self.__dict__.copy()
+        for key in ("_lock", "_executor", "_pending", "_generator"):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_runtime()
+
+    def __call__(self, targets: torch.Tensor, y_hats: torch.Tensor) -> Tuple[Optional[float], Optional[float]]:
+        r"""
+        Schedules an update of the error rates with a training batch.
+
+        Args:
+            targets (torch.Tensor): set of ground truth
+            y_hats (torch.Tensor): predicted y values (y_hat) by the model
+
+        Returns: wer, cer
+            - **wer**: word error rate of the updates so far, None before the first update finished
+            - **cer**: character error rate of the updates so far, None before the first update finished
+        """
+        step = self.num_steps
+        self.num_steps += 1
+        self._check_pending()
+
+        if step % self.interval == 0 and self._pending is None:
+            if 0 < self.sample_size < targets.size(0):
+                indices = torch.randperm(targets.size(0), generator=self._generator)[: self.sample_size]
+                indices = indices.to(targets.device)
+                targets, y_hats = targets[indices], y_hats[indices]
+
+            targets, y_hats = targets.detach(), y_hats.detach()
+            if self._executor is None:
+                self._update(targets, y_hats)
+            else:
+                self._pending = self._executor.submit(self._update, targets, y_hats)
+
+        with self._lock:
+            return self.wer, self.cer
+
+    def wait(self) -> Tuple[Optional[float], Optional[float]]:
+        r"""Waits for the running update, and returns the word & character error rates"""
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+        with self._lock:
+            return self.wer, self.cer
+
+    def _check_pending(self) -> None:
+        r"""Forgets the running update once it finished, raising its exception if it failed"""
+        if self._pending is not None and self._pending.done():
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def _update(self, targets: torch.Tensor, y_hats: torch.Tensor) -> None:
+        targets, y_hats = targets.cpu(), y_hats.cpu()
+        wer = self.wer_metric(targets, y_hats)
+        cer = self.cer_metric(targets, y_hats)
+        with self._lock:
+            self.wer, self.cer = wer, cer
@@ -77,13 +77,17 @@ class OpenspeechCTCModel(OpenspeechModel):
         )
         predictions = logits.max(-1)[1]
 
-        wer = self.wer_metric(targets[:, 1:], predictions)
-        cer = self.cer_metric(targets[:, 1:], predictions)
-
+        wer, cer = self.get_error_rates(stage, targets[:, 1:], predictions)
+
+        if wer is not None:
+            self.info(
+                {
+                    f"{stage}_wer": wer,
+                    f"{stage}_cer": cer,
+                }
+            )
         self.info(
             {
-                f"{stage}_wer": wer,
-                f"{stage}_cer": cer,
                 f"{stage}_loss": loss,
                 "learning_rate": self.get_lr(),
             }
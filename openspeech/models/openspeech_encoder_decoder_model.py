@@ -98,15 +98,15 @@ class OpenspeechEncoderDecoderModel(OpenspeechModel):
 
         predictions = logits.max(-1)[1]
 
-        wer = self.wer_metric(targets[:, 1:], predictions)
-        cer = self.cer_metric(targets[:, 1:], predictions)
+        wer, cer = self.get_error_rates(stage, targets[:, 1:], predictions)
 
-        self.info(
-            {
-                f"{stage}_wer": wer,
-                f"{stage}_cer": cer,
-            }
-        )
+        if wer is not None:
+            self.info(
+                {
+                    f"{stage}_wer": wer,
+                    f"{stage}_cer": cer,
+                }
+            )
 
         return OrderedDict(
             {
@@ -20,7 +20,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Dict
+import os
+from typing import Dict, Optional, Tuple
 
 import pytorch_lightning as pl
 import torch
@@ -30,7 +31,10 @@ from torch import Tensor
 from torch.optim import ASGD, SGD, Adadelta, Adagrad, Adam, Adamax, AdamW
 
 from openspeech.criterion import CRITERION_REGISTRY
-from openspeech.metrics import CharacterErrorRate, WordErrorRate
+from openspeech.data.audio.augment import BatchSpecAugment
+from openspeech.data.audio.batch_feature_transform import build_batch_feature_transform
+from openspeech.data.audio.cmvn import CMVN, get_cmvn_path
+from openspeech.metrics import CharacterErrorRate, MetricScheduler, WordErrorRate
 from openspeech.optim import AdamP, Novograd, RAdam
 from openspeech.optim.scheduler import SCHEDULER_REGISTRY
 from openspeech.tokenizers.tokenizer import Tokenizer
@@ -63,14 +67,61 @@ class OpenspeechModel(pl.LightningModule):
         self.current_val_loss = 100.0
         self.wer_metric = WordErrorRate(tokenizer)
         self.cer_metric = CharacterErrorRate(tokenizer)
+        trainer_configs = configs.trainer if hasattr(configs, "trainer") else None
+        self.train_metric_scheduler = MetricScheduler(
+            tokenizer,
+            interval=getattr(trainer_configs, "metric_interval", 1),
+            sample_size=getattr(trainer_configs, "metric_sample_size", 0),
+            asynchronous=getattr(trainer_configs, "async_metrics", False),
+            seed=getattr(trainer_configs, "seed", 1),
+        )
         if hasattr(configs, "trainer"):
             self.gradient_clip_val = configs.trainer.gradient_clip_val
         if hasattr(configs, "criterion"):
             self.criterion = self.configure_criterion(configs.criterion.criterion_name)
+        self.cmvn = None
+        if hasattr(configs, "audio") and configs.audio.get("normalization", "utterance") != "utterance":
+            cmvn_path = get_cmvn_path(configs)
+            if cmvn_path is not None and os.path.exists(cmvn_path):
+                self.cmvn = CMVN.load(cmvn_path)
+        if hasattr(configs, "audio") and configs.audio.get("feature_extraction", "dataset") == "model":
+            self.feature_transform = build_batch_feature_transform(configs, cmvn=self.cmvn)
+        if hasattr(configs, "augment"):
+            self.spec_augment = BatchSpecAugment(
+                freq_mask_para=configs.augment.freq_mask_para,
+                freq_mask_num=configs.augment.freq_mask_num,
+                time_mask_num=configs.augment.time_mask_num,
+                time_mask_ratio=configs.augment.time_mask_ratio,
+            )
+            self.apply_batch_spec_augment = configs.augment.apply_batch_spec_augment
 
     def set_beam_decoder(self, beam_size: int = 3):
         raise NotImplementedError
 
+    def get_error_rates(
+        self, stage: str, targets: Tensor, predictions: Tensor
+    ) -> Tuple[Optional[float], Optional[float]]:
+        r"""
+        Updates the word & character error rates of a stage. Training error rates are scheduled by
+        ``train_metric_scheduler``, and are None until its first update finished.
+
+        Inputs:
+            stage (str): train, val or test
+            targets (torch.Tensor): set of ground truth
+            predictions (torch.Tensor): predicted y values (y_hat) by the model
+
+        Returns:
+            wer (float): word error rate
+            cer (float): character error rate
+        """
+        if stage == "train":
+            return self.train_metric_scheduler(targets, predictions)
+        return self.wer_metric(targets, predictions), self.cer_metric(targets, predictions)
+
+    def on_train_epoch_end(self) -> None:
+        r"""Waits for the running training error rate update, so that it doesn't outlive the epoch."""
+        self.train_metric_scheduler.wait()
+
     def info(self, dictionary: dict) -> None:
         r"""
         Logging information from dictionary.
@@ -94,6 +145,60 @@ class OpenspeechModel(pl.LightningModule):
         """
         raise NotImplementedError
 
+    def extract_features(self, waveforms: Tensor, waveform_lengths: Tensor) -> Tuple[Tensor, Tensor]:
+        r"""
+        Extracts features from a padded waveform batch on the model device.
+        Used when ``configs.audio.feature_extraction`` is `model`.
+
+        Inputs:
+            waveforms (torch.FloatTensor): zero padded waveforms of size ``(batch, num_samples)``
+            waveform_lengths (torch.IntTensor): The length of waveforms. ``(batch)``
+
+        Returns:
+            inputs (torch.FloatTensor): features of size ``(batch, seq_length, dimension)``
+            input_lengths (torch.IntTensor): The length of features. ``(batch)``
+        """
+        with torch.no_grad():
+            return self.feature_transform(waveforms, waveform_lengths)
+
+    def on_save_checkpoint(self, checkpoint: dict) -> None:
+        r"""Saves the CMVN statistics of global / speaker normalization with the checkpoint."""
+        if self.cmvn is not None:
+            checkpoint["cmvn"] = self.cmvn.state_dict()
+
+    def on_load_checkpoint(self, checkpoint: dict) -> None:
+        r"""Restores the CMVN statistics saved with the checkpoint, so inference normalizes like training."""
+        if "cmvn" in checkpoint:
+            self.cmvn = CMVN.from_state_dict(checkpoint["cmvn"])
+            if hasattr(self, "feature_transform"):
+                self.feature_transform.set_cmvn(self.cmvn)
+
+    def on_after_batch_transfer(self, batch, dataloader_idx: int):
+        r"""
+        Replaces a waveform batch ``(waveforms, targets, waveform_lengths, target_lengths, spec_augment)``
+        by a feature batch ``(inputs, targets, input_lengths, target_lengths)``, and applies batch spec augment
+        to training batches if ``configs.augment.apply_batch_spec_augment`` is set.
+        """
+        spec_augment = None
+
+        if hasattr(self, "feature_transform") and len(batch) == 5:
+            waveforms, targets, waveform_lengths, target_lengths, spec_augment = batch
+            inputs, input_lengths = self.extract_features(waveforms, waveform_lengths)
+            batch = inputs, targets, input_lengths, target_lengths
+
+        if not self.training or not hasattr(self, "spec_augment"):
+            return batch
+
+        if self.apply_batch_spec_augment:
+            inputs, targets, input_lengths, target_lengths = batch
+            return self.spec_augment(inputs, input_lengths), targets, input_lengths, target_lengths
+
+        if spec_augment is not None and spec_augment.any():
+            inputs, targets, input_lengths, target_lengths = batch
+            return self.spec_augment(inputs, input_lengths, spec_augment), targets, input_lengths, target_lengths
+
+        return batch
+
     def training_step(self, batch: tuple, batch_idx: int):
         r"""
         Forward propagate a `inputs` and `targets` pair for training.
@@ -22,12 +22,14 @@
 
 import csv
 from dataclasses import dataclass, field
+from typing import Tuple
 
+import numpy as np
 from omegaconf import DictConfig
 
 from openspeech.dataclass.configurations import TokenizerConfigs
 from openspeech.tokenizers import register_tokenizer
-from openspeech.tokenizers.tokenizer import Tokenizer
+from openspeech.tokenizers.tokenizer import Tokenizer, UnitTable
 
 
 @dataclass
@@ -51,6 +53,7 @@ class KsponSpeechCharacterTokenizer(Tokenizer):
             vocab_path=configs.tokenizer.vocab_path,
             encoding=configs.tokenizer.encoding,
         )
+        self.unit_table = UnitTable(self.id_dict)
         self.labels = self.vocab_dict.keys()
         self.sos_id = int(self.vocab_dict[configs.tokenizer.sos_token])
         self.eos_id = int(self.vocab_dict[configs.tokenizer.eos_token])
@@ -72,26 +75,11 @@ class KsponSpeechCharacterTokenizer(Tokenizer):
             - **sentence** (str or list): symbol of labels
         """
         if len(labels.shape) == 1:
-            sentence = str()
-            for label in labels:
-                if label.item() == self.eos_id:
-                    break
-                elif label.item() == self.blank_id:
-                    continue
-                sentence += self.id_dict[label.item()]
-            return sentence
-
-        sentences = list()
-        for batch in labels:
-            sentence = str()
-            for label in batch:
-                if label.item() == self.eos_id:
-                    break
-                elif label.item() == self.blank_id:
-                    continue
-                sentence += self.id_dict[label.item()]
-            sentences.append(sentence)
-        return sentences
+            return self.decode_batch(labels[None])[0]
+        return self.decode_batch(labels)
+
+    def decode_batch(self, labels) -> list:
+        return self.unit_table.decode(labels, eos_id=self.eos_id, blank_id=self.blank_id)
 
     def encode(self, sentence):
         label = str()
@@ -104,6 +92,9 @@ class KsponSpeechCharacterTokenizer(Tokenizer):
 
         return label[:-1]
 
+    def _encode_ragged(self, sentences: list) -> Tuple[np.ndarray, np.ndarray]:
+        return self.unit_table.encode(sentences)
+
     def load_vocab(self, vocab_path, encoding="utf-8"):
         r"""
         Provides char2id, id2char
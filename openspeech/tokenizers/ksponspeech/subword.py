@@ -21,13 +21,15 @@
 # SOFTWARE.
 
 from dataclasses import dataclass, field
+from typing import Tuple
 
+import numpy as np
 import sentencepiece as spm
 from omegaconf import DictConfig
 
 from openspeech.dataclass.configurations import TokenizerConfigs
 from openspeech.tokenizers import register_tokenizer
-from openspeech.tokenizers.tokenizer import Tokenizer
+from openspeech.tokenizers.tokenizer import Tokenizer, pack_ragged
 
 
 @dataclass
@@ -87,6 +89,8 @@ class KsponSpeechSubwordTokenizer(Tokenizer):
         return sentences
 
     def encode(self, sentence):
-        text = " ".join(self.sp.EncodeAsPieces(sentence))
-        label = " ".join([str(self.sp.PieceToId(token)) for token in text])
-        return label
+        return " ".join(str(token) for token in self.sp.EncodeAsIds(sentence))
+
+    def _encode_ragged(self, sentences: list) -> Tuple[np.ndarray, np.ndarray]:
+        # batch encoding of sentencepiece runs on its own thread pool (one thread per CPU by default)
+        return pack_ragged(self.sp.encode(sentences, out_type=int))
@@ -22,13 +22,15 @@
 
 import os
 from dataclasses import dataclass, field
+from typing import Tuple
 
+import numpy as np
 from omegaconf import DictConfig
 
 from openspeech.dataclass.configurations import TokenizerConfigs
 from openspeech.datasets.librispeech.preprocess.subword import SENTENCEPIECE_MODEL_NAME
 from openspeech.tokenizers import register_tokenizer
-from openspeech.tokenizers.tokenizer import Tokenizer
+from openspeech.tokenizers.tokenizer import Tokenizer, pack_ragged
 from openspeech.utils import SENTENCEPIECE_IMPORT_ERROR
 
 
@@ -83,6 +85,8 @@ class LibriSpeechSubwordTokenizer(Tokenizer):
             raise ValueError("Unsupported label's shape")
 
     def encode(self, sentence):
-        text = " ".join(self.sp.EncodeAsPieces(sentence))
-        label = " ".join([str(self.sp.PieceToId(token)) for token in text])
-        return label
+        return " ".join(str(token) for token in self.sp.EncodeAsIds(sentence))
+
+    def _encode_ragged(self, sentences: list) -> Tuple[np.ndarray, np.ndarray]:
+        # batch encoding of sentencepiece runs on its own thread pool (one thread per CPU by default)
+        return pack_ragged(self.sp.encode(sentences, out_type=int))
@@ -20,6 +20,11 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from typing import Optional, Tuple
+
+import numpy as np
+import torch
+
 
 class Tokenizer(object):
     r"""
@@ -38,8 +43,155 @@ class Tokenizer(object):
     def decode(self, labels):
         raise NotImplementedError
 
+    def decode_batch(self, labels) -> list:
+        r"""
+        Converts a batch of labels to sentences.
+
+        Args:
+            labels (torch.Tensor or numpy.ndarray): number labels of shape (batch, seq_length)
+
+        Returns: sentences
+            - **sentences** (list): sentence of each row
+        """
+        return [self.decode(label) for label in labels]
+
     def encode(self, labels):
         raise NotImplementedError
 
+    def encode_batch(self, sentences: list, ragged: bool = False):
+        r"""
+        Converts sentences to token ids, without going through the space separated string of ``encode``.
+
+        Args:
+            sentences (list): list of sentence
+            ragged (bool): return the token ids of all sentences as one ``(values, offsets)`` pair
+
+        Returns: labels
+            - **labels** (list or tuple): int32 token ids of each sentence, or ``(values, offsets)`` if ``ragged``,
+              where the token ids of the ``i``-th sentence are ``values[offsets[i] : offsets[i + 1]]``
+        """
+        values, offsets = self._encode_ragged(list(sentences))
+        if ragged:
+            return values, offsets
+        return np.split(values, offsets[1:-1]) if len(sentences) else list()
+
+    def _encode_ragged(self, sentences: list) -> Tuple[np.ndarray, np.ndarray]:
+        return pack_ragged([np.array(self.encode(sentence).split(), dtype=np.int32) for sentence in sentences])
+
     def __call__(self, sentence):
         return self.encode(sentence)
+
+
+def pack_ragged(labels: list) -> Tuple[np.ndarray, np.ndarray]:
+    r"""Packs a list of token id sequences into ``(values, offsets)`` (int32 values, int64 offsets)"""
+    offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum([len(label) for label in labels], out=offsets[1:])
+    values = np.concatenate(labels).astype(np.int32) if len(labels) else np.zeros(0, dtype=np.int32)
+    return values, offsets
+
+
+class UnitTable(object):
+    r"""
+    Id to unit lookup table for decoding whole batches of labels with numpy instead of a Python loop per label.
+    The units are stored as one array of code points with the offset and length of each id, so that the kept labels
+    of a batch are gathered into a single string, which is then sliced into sentences.
+    Sentences are encoded character by character through a dense code point to id array of single character units.
+
+    Args:
+        id2unit (dict): id2unit[id] = unit
+    """
+
+    def __init__(self, id2unit: dict) -> None:
+        self.id2unit = dict(id2unit)
+        size = max(id2unit.keys()) + 1 if id2unit else 0
+        self.known = np.zeros(size, dtype=bool)
+        self.starts = np.zeros(size, dtype=np.int64)
+        self.lengths = np.zeros(size, dtype=np.int64)
+
+        codepoints = list()
+        for unit_id, unit in id2unit.items():
+            self.known[unit_id] = True
+            self.starts[unit_id] = len(codepoints)
+            self.lengths[unit_id] = len(unit)
+            codepoints.extend(ord(ch) for ch in unit)
+
+        self.codepoints = np.asarray(codepoints, dtype="<u4")
+        self.single_character = bool((self.lengths[self.known] == 1).all())
+
+        characters = [(ord(unit), unit_id) for unit_id, unit in id2unit.items() if len(unit) == 1]
+        self.character_ids = np.full(max(characters)[0] + 1 if characters else 0, -1, dtype=np.int32)
+        for codepoint, unit_id in characters:
+            self.character_ids[codepoint] = unit_id
+
+    def encode(self, sentences: list) -> Tuple[np.ndarray, np.ndarray]:
+        r"""
+        Converts sentences to token ids, one per character. Characters that are not a unit are skipped.
+
+        Args:
+            sentences (list): list of sentence
+
+        Returns: values, offsets
+            - **values** (np.ndarray): int32 token ids of all sentences
+            - **offsets** (np.ndarray): int64 offsets, the token ids of the ``i``-th sentence are
+              ``values[offsets[i] : offsets[i + 1]]``
+        """
+        sentences = list(sentences)
+        codepoints = np.frombuffer("".join(sentences).encode("utf-32-le"), dtype="<u4")
+
+        ids = np.full(len(codepoints), -1, dtype=np.int32)
+        in_table = codepoints < len(self.character_ids)
+        ids[in_table] = self.character_ids[codepoints[in_table]]
+        known = ids >= 0
+
+        lengths = np.fromiter(map(len, sentences), dtype=np.int64, count=len(sentences))
+        sentence_indices = np.repeat(np.arange(len(sentences)), lengths)
+        offsets = np.zeros(len(sentences) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sentence_indices[known], minlength=len(sentences)), out=offsets[1:])
+        return ids[known], offsets
+
+    def decode(self, labels, eos_id: Optional[int] = None, blank_id: Optional[int] = None) -> list:
+        r"""
+        Converts labels to sentences. Each row is truncated at its first ``eos_id`` and ``blank_id`` is skipped.
+
+        Args:
+            labels (torch.Tensor or numpy.ndarray): number labels of shape (batch, seq_length)
+            eos_id (int, optional): identification of <endofsentence>
+            blank_id (int, optional): identification of <blank>
+
+        Returns: sentences
+            - **sentences** (list): sentence of each row
+        """
+        if isinstance(labels, torch.Tensor):
+            labels = labels.detach().cpu().numpy()
+        labels = np.asarray(labels, dtype=np.int64)
+        batch_size, seq_length = labels.shape
+        if seq_length == 0:
+            return [str() for _ in range(batch_size)]
+
+        keep = np.ones(labels.shape, dtype=bool)
+        if eos_id is not None:
+            is_eos = labels == eos_id
+            lengths = np.where(is_eos.any(axis=1), is_eos.argmax(axis=1), seq_length)
+            keep &= np.arange(seq_length) < lengths[:, None]
+        if blank_id is not None:
+            keep &= labels != blank_id
+
+        ids = labels[keep]
+        unknown = (ids < 0) | (ids >= len(self.known))
+        unknown[~unknown] = ~self.known[ids[~unknown]]
+        if unknown.any():
+            raise KeyError(int(ids[unknown][0]))
+
+        if self.single_character:
+            codepoints = self.codepoints[self.starts[ids]]
+            unit_ends = np.arange(1, len(ids) + 1)
+        else:
+            unit_lengths = self.lengths[ids]
+            unit_ends = np.cumsum(unit_lengths)
+            offsets = np.repeat(self.starts[ids] - (unit_ends - unit_lengths), unit_lengths)
+            codepoints = self.codepoints[np.arange(len(offsets)) + offsets]
+        text = codepoints.tobytes().decode("utf-32-le")
+
+        sentence_ends = np.concatenate(([0], unit_ends))[np.cumsum(keep.sum(axis=1))].tolist()
+        sentence_starts = [0] + sentence_ends[:-1]
+        return [text[start:end] for start, end in zip(sentence_starts, sentence_ends)]
@@ -30,7 +30,7 @@ import torch
 from omegaconf import DictConfig, OmegaConf
 from pytorch_lightning.callbacks import LearningRateMonitor
 
-from .callbacks import CheckpointEveryNSteps
+from .callbacks import CheckpointEveryNSteps, DatasetEpochCallback, SamplerStateCallback
 
 PYTORCH_IMPORT_ERROR = """
 Openspeech requires the PyTorch library but it was not found in your environment. Checkout the instructions on the
@@ -249,8 +249,11 @@ def get_pl_trainer(
             logger=logger,
             auto_scale_batch_size=configs.trainer.auto_scale_batch_size,
             max_epochs=configs.trainer.max_epochs,
+            replace_sampler_ddp=False,
             callbacks=[
                 LearningRateMonitor(logging_interval="step"),
+                SamplerStateCallback(),
+                DatasetEpochCallback(),
                 CheckpointEveryNSteps(configs.trainer.save_checkpoint_n_steps),
             ],
         )
@@ -265,8 +268,11 @@ def get_pl_trainer(
             logger=logger,
             auto_scale_batch_size=configs.trainer.auto_scale_batch_size,
             max_epochs=configs.trainer.max_epochs,
+            replace_sampler_ddp=False,
             callbacks=[
                 LearningRateMonitor(logging_interval="step"),
+                SamplerStateCallback(),
+                DatasetEpochCallback(),
                 CheckpointEveryNSteps(configs.trainer.save_checkpoint_n_steps),
             ],
         )
@@ -281,8 +287,11 @@ def get_pl_trainer(
             logger=logger,
             auto_scale_batch_size=configs.trainer.auto_scale_batch_size,
             max_epochs=configs.trainer.max_epochs,
+            replace_sampler_ddp=False,
             callbacks=[
                 LearningRateMonitor(logging_interval="step"),
+                SamplerStateCallback(),
+                DatasetEpochCallback(),
                 CheckpointEveryNSteps(configs.trainer.save_checkpoint_n_steps),
             ],
         )
@@ -299,8 +308,11 @@ def get_pl_trainer(
             logger=logger,
             auto_scale_batch_size=configs.trainer.auto_scale_batch_size,
             max_epochs=configs.trainer.max_epochs,
+            replace_sampler_ddp=False,
             callbacks=[
                 LearningRateMonitor(logging_interval="step"),
+                SamplerStateCallback(),
+                DatasetEpochCallback(),
                 CheckpointEveryNSteps(configs.trainer.save_checkpoint_n_steps),
             ],
         )
@@ -316,8 +328,11 @@ def get_pl_trainer(
             logger=logger,
             auto_scale_batch_size=configs.trainer.auto_scale_batch_size,
             max_epochs=configs.trainer.max_epochs,
+            replace_sampler_ddp=False,
             callbacks=[
                 LearningRateMonitor(logging_interval="step"),
+                SamplerStateCallback(),
+                DatasetEpochCallback(),
                 CheckpointEveryNSteps(configs.trainer.save_checkpoint_n_steps),
             ],
         )
@@ -332,8 +347,11 @@ def get_pl_trainer(
             logger=logger,
             auto_scale_batch_size=configs.trainer.auto_scale_batch_size,
             max_epochs=configs.trainer.max_epochs,
+            replace_sampler_ddp=False,
             callbacks=[
                 LearningRateMonitor(logging_interval="step"),
+                SamplerStateCallback(),
+                DatasetEpochCallback(),
                 CheckpointEveryNSteps(configs.trainer.save_checkpoint_n_steps),
             ],
         )
@@ -346,9 +364,12 @@ def get_pl_trainer(
             logger=logger,
             auto_scale_batch_size=configs.trainer.auto_scale_batch_size,
             max_epochs=configs.trainer.max_epochs,
+            replace_sampler_ddp=False,
             resume_from_checkpoint=configs.trainer.checkpoint_path,
             callbacks=[
                 LearningRateMonitor(logging_interval="step"),
+                SamplerStateCallback(),
+                DatasetEpochCallback(),
                 CheckpointEveryNSteps(configs.trainer.save_checkpoint_n_steps),
             ],
         )
@@ -363,9 +384,12 @@ def get_pl_trainer(
             logger=logger,
             auto_scale_batch_size=configs.trainer.auto_scale_batch_size,
             max_epochs=configs.trainer.max_epochs,
+            replace_sampler_ddp=False,
             resume_from_checkpoint=configs.trainer.checkpoint_path,
             callbacks=[
                 LearningRateMonitor(logging_interval="step"),
+                SamplerStateCallback(),
+                DatasetEpochCallback(),
                 CheckpointEveryNSteps(configs.trainer.save_checkpoint_n_steps),
             ],
         )
@@ -380,9 +404,12 @@ def get_pl_trainer(
             logger=logger,
             auto_scale_batch_size=configs.trainer.auto_scale_batch_size,
             max_epochs=configs.trainer.max_epochs,
+            replace_sampler_ddp=False,
             resume_from_checkpoint=configs.trainer.checkpoint_path,
             callbacks=[
                 LearningRateMonitor(logging_interval="step"),
+                SamplerStateCallback(),
+                DatasetEpochCallback(),
                 CheckpointEveryNSteps(configs.trainer.save_checkpoint_n_steps),
             ],
         )
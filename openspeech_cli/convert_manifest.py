@@ -0,0 +1,51 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+
+from openspeech.data.manifest import convert_manifest
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Convert a TSV manifest to a pre-tokenized binary manifest.")
+    parser.add_argument("--manifest_file_path", type=str, required=True, help="Path of TSV manifest file")
+    parser.add_argument(
+        "--output_path", type=str, default=None, help="Path of binary manifest (default: manifest_file_path + .bin)"
+    )
+    parser.add_argument(
+        "--dataset_path", type=str, default=None, help="Path of dataset. If given, audio lengths are stored too"
+    )
+    parser.add_argument("--sample_rate", type=int, default=16000, help="Sampling rate of audio lengths")
+    parser.add_argument("--encoding", type=str, default="utf-8", help="Encoding of TSV manifest file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    output_path = convert_manifest(
+        manifest_file_path=args.manifest_file_path,
+        output_path=args.output_path,
+        dataset_path=args.dataset_path,
+        sample_rate=args.sample_rate,
+        encoding=args.encoding,
+    )
+    print(f"Binary manifest is saved at {output_path}")
@@ -73,6 +73,7 @@ def hydra_main(configs: DictConfig) -> None:
         transcripts=transcripts,
         sos_id=tokenizer.sos_id,
         eos_id=tokenizer.eos_id,
+        cmvn=models[0].cmvn,
     )
     sampler = RandomSampler(data_source=dataset, batch_size=configs.eval.batch_size)
     data_loader = AudioDataLoader(
@@ -85,6 +86,8 @@ def hydra_main(configs: DictConfig) -> None:
     cer_metric = CharacterErrorRate(tokenizer)
 
     for i, (batch) in enumerate(data_loader):
+        if configs.audio.feature_extraction == "model":
+            batch = models[0].on_after_batch_transfer(batch, dataloader_idx=0)
         inputs, targets, input_lengths, target_lengths = batch
 
         outputs = model(inputs, input_lengths)
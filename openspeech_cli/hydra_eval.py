@@ -67,6 +67,7 @@ def hydra_main(configs: DictConfig) -> None:
         transcripts=transcripts,
         sos_id=tokenizer.sos_id,
         eos_id=tokenizer.eos_id,
+        cmvn=model.cmvn,
     )
     sampler = RandomSampler(data_source=dataset, batch_size=configs.eval.batch_size)
     data_loader = AudioDataLoader(
@@ -81,6 +82,8 @@ def hydra_main(configs: DictConfig) -> None:
     logger.info("Start evaluation ...")
     for i, (batch) in enumerate(tqdm(data_loader)):
         with torch.no_grad():
+            if configs.audio.feature_extraction == "model":
+                batch = model.on_after_batch_transfer([tensor.to(device) for tensor in batch], dataloader_idx=0)
             inputs, targets, input_lengths, target_lengths = batch
 
             outputs = model(inputs.to(device), input_lengths.to(device))
@@ -0,0 +1,48 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+
+import hydra
+from omegaconf import DictConfig
+
+from openspeech.data.text.corpus import tokenize_corpus
+from openspeech.dataclass.initialize import hydra_lm_train_init
+from openspeech.tokenizers import TOKENIZER_REGISTRY
+
+
+@hydra.main(config_path=os.path.join("..", "openspeech", "configs"), config_name="lm_train")
+def hydra_main(configs: DictConfig) -> None:
+    r"""Tokenizes the language model corpus once, ahead of training with ``dataset.pretokenize=true``."""
+    tokenizer = TOKENIZER_REGISTRY[configs.tokenizer.unit](configs)
+    output_path = tokenize_corpus(
+        configs.dataset.dataset_path,
+        tokenizer,
+        output_path=configs.dataset.tokenized_corpus_path,
+        encoding=configs.tokenizer.encoding,
+    )
+    print(f"Tokenized corpus is saved at {output_path}")
+
+
+if __name__ == "__main__":
+    hydra_lm_train_init()
+    hydra_main()
@@ -30,6 +30,7 @@ from pytorch_lightning.utilities import rank_zero_info
 from openspeech.dataclass.initialize import hydra_lm_train_init
 from openspeech.datasets import DATA_MODULE_REGISTRY
 from openspeech.models import MODEL_REGISTRY
+from openspeech.tokenizers import TOKENIZER_REGISTRY
 from openspeech.utils import get_pl_trainer, parse_configs
 
 
@@ -41,7 +42,8 @@ def hydra_main(configs: DictConfig) -> None:
     logger, num_devices = parse_configs(configs)
 
     data_module = DATA_MODULE_REGISTRY[configs.dataset.dataset](configs)
-    tokenizer = data_module.prepare_data()
+    data_module.prepare_data()
+    tokenizer = TOKENIZER_REGISTRY[configs.tokenizer.unit](configs)
     data_module.setup(tokenizer=tokenizer)
 
     model = MODEL_REGISTRY[configs.model.model_name](configs=configs, tokenizer=tokenizer)
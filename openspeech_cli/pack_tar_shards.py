@@ -0,0 +1,51 @@
+# MIT License
+#
+# Copyright (c) 2021 Soohwan Kim and Sangchun Ha and Soyoung Cho
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+
+from openspeech.data.audio.tar_dataset import write_tar_shards
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Pack the utterances of a manifest into tar shards.")
+    parser.add_argument("--manifest_file_path", type=str, required=True, help="Path of manifest file")
+    parser.add_argument("--dataset_path", type=str, required=True, help="Path of dataset")
+    parser.add_argument("--output_dir", type=str, required=True, help="Directory of tar shards")
+    parser.add_argument("--shard_size", type=int, default=1000, help="The number of utterances per shard")
+    parser.add_argument("--no_shuffle", action="store_true", help="Keep the manifest order inside shards")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the shuffle")
+    parser.add_argument("--encoding", type=str, default="utf-8", help="Encoding of manifest file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    shard_paths = write_tar_shards(
+        manifest_file_path=args.manifest_file_path,
+        dataset_path=args.dataset_path,
+        output_dir=args.output_dir,
+        shard_size=args.shard_size,
+        shuffle=not args.no_shuffle,
+        seed=args.seed,
+        encoding=args.encoding,
+    )
+    print(f"{len(shard_paths)} shards are saved at {args.output_dir}")
@@ -0,0 +1,133 @@
+import os
+import pickle
+import tarfile
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+
+from openspeech.data.audio.archive import (
+    ArchiveIndex,
+    ArchiveReader,
+    decompress_archive,
+    load_or_build_archive_index,
+)
+from openspeech.data.audio.index import load_audio_lengths
+from openspeech.data.audio.load import get_audio_length, load_audio
+from openspeech.datasets.librispeech.preprocess.preprocess import (
+    archive_member_to_audio_path,
+    collect_archive_transcripts,
+)
+
+
+class TestArchiveDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.tmp_dir.name, "source")
+        rng = np.random.RandomState(0)
+
+        self.archive_paths = list()
+        self.audio_paths = list()
+        for part, sample_rate in (("train-clean-100", 16000), ("dev-clean", 8000)):
+            chapter_dir = os.path.join("LibriSpeech", part, "19", "198")
+            os.makedirs(os.path.join(self.source_dir, chapter_dir))
+
+            lines = list()
+            for idx in range(3):
+                utterance_id = f"19-198-{idx:04d}"
+                audio = (rng.randn(rng.randint(4000, 8000)) * 0.1).astype("float32")
+                sf.write(os.path.join(self.source_dir, chapter_dir, f"{utterance_id}.flac"), audio, sample_rate)
+                lines.append(f"{utterance_id} {part.upper()} UTTERANCE {idx}\n")
+                self.audio_paths.append(os.path.join(chapter_dir, f"{utterance_id}.flac"))
+            with open(os.path.join(self.source_dir, chapter_dir, "19-198.trans.txt"), "w") as f:
+                f.writelines(lines)
+
+            archive_path = os.path.join(self.tmp_dir.name, f"{part}.tar.gz")
+            with tarfile.open(archive_path, "w:gz") as tar:
+                tar.add(os.path.join(self.source_dir, "LibriSpeech", part), arcname=os.path.join("LibriSpeech", part))
+            self.archive_paths.append(archive_path)
+
+        self.index_path = os.path.join(self.tmp_dir.name, "archive.npz")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _build_index(self) -> ArchiveIndex:
+        return load_or_build_archive_index(
+            self.archive_paths,
+            index_path=self.index_path,
+            member_to_path=archive_member_to_audio_path,
+            text_suffix=".trans.txt",
+        )
+
+    def test_reader_matches_files(self):
+        reader = ArchiveReader(self._build_index(), dataset_path="LibriSpeech", max_open_files=1)
+
+        for audio_path in self.audio_paths:
+            file_path = os.path.join(self.source_dir, audio_path)
+            archive_path = os.path.join("LibriSpeech", archive_member_to_audio_path(audio_path))
+
+            self.assertTrue(np.allclose(reader.load_audio(archive_path, 16000), load_audio(file_path, 16000)))
+            self.assertEqual(reader.get_audio_length(archive_path, 16000), get_audio_length(file_path, 16000))
+        self.assertEqual(len(reader._handles), 1)
+        self.assertIsNone(reader.load_audio("LibriSpeech/dev-clean/missing.flac", 16000))
+
+        unpickled = pickle.loads(pickle.dumps(reader))
+        audio_path = os.path.join("LibriSpeech", archive_member_to_audio_path(self.audio_paths[0]))
+        self.assertEqual(unpickled.read(audio_path), reader.read(audio_path))
+
+        audio_paths = [archive_member_to_audio_path(audio_path) for audio_path in self.audio_paths]
+        audio_lengths = load_audio_lengths("LibriSpeech", audio_paths, 16000, audio_reader=reader)
+        file_lengths = [get_audio_length(os.path.join(self.source_dir, path), 16000) for path in self.audio_paths]
+        self.assertEqual(audio_lengths.tolist(), file_lengths)
+
+    def test_transcripts(self):
+        transcripts_collection = collect_archive_transcripts(self._build_index())
+
+        self.assertEqual(
+            transcripts_collection[0],
+            [f"train-960/19/198/19-198-{idx:04d}.flac|TRAIN-CLEAN-100 UTTERANCE {idx}" for idx in range(3)],
+        )
+        self.assertEqual(
+            transcripts_collection[1],
+            [f"dev-clean/19/198/19-198-{idx:04d}.flac|DEV-CLEAN UTTERANCE {idx}" for idx in range(3)],
+        )
+        self.assertEqual(transcripts_collection[2:], [[], [], []])
+
+    def test_index_is_reused(self):
+        archive_index = self._build_index()
+        self.assertEqual(len(archive_index), 6)
+        self.assertTrue(all(os.path.exists(path[: -len(".gz")]) for path in self.archive_paths))
+
+        mtime = os.path.getmtime(self.index_path)
+        self.assertEqual(list(self._build_index().paths), list(archive_index.paths))
+        self.assertEqual(os.path.getmtime(self.index_path), mtime)
+
+        tar_path = self.archive_paths[1][: -len(".gz")]
+        os.utime(tar_path, ns=(os.stat(tar_path).st_atime_ns, os.stat(tar_path).st_mtime_ns + 10**9))
+        self._build_index()
+        self.assertNotEqual(os.path.getmtime(self.index_path), mtime)
+
+    def test_remove_compressed(self):
+        archive_path = self.archive_paths[0]
+        with open(archive_path, "rb") as f:
+            data = f.read()
+
+        broken_path = os.path.join(self.tmp_dir.name, "broken.tar.gz")
+        with open(broken_path, "wb") as f:
+            f.write(data[: len(data) // 2])
+        with self.assertRaises(EOFError):
+            decompress_archive(broken_path, remove_compressed=True)
+        self.assertEqual(
+            [name for name in os.listdir(self.tmp_dir.name) if name.startswith("broken")], ["broken.tar.gz"]
+        )
+
+        tar_path = decompress_archive(archive_path, remove_compressed=True)
+        self.assertFalse(os.path.exists(archive_path))
+        with tarfile.open(tar_path) as tar:
+            self.assertEqual(len([name for name in tar.getnames() if name.endswith(".flac")]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
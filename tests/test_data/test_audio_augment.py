@@ -6,7 +6,13 @@ import numpy as np
 import torch
 from librosa.display import specshow
 
-from openspeech.data.audio.augment import JoiningAugment, SpecAugment, TimeStretchAugment
+from openspeech.data.audio.augment import (
+    BatchSpecAugment,
+    JoiningAugment,
+    SpecAugment,
+    SpeedPerturbAugment,
+    TimeStretchAugment,
+)
 from openspeech.utils import DUMMY_FEATURES, DUMMY_SIGNALS, DUMMY_TRANSCRIPTS
 
 
@@ -24,6 +30,21 @@ class TestAudioAugment(unittest.TestCase):
         plt.show()
         assert isinstance(feature, torch.Tensor)
 
+    def test_batch_spec_augment(self):
+        spec_augment = BatchSpecAugment(freq_mask_para=10, time_mask_num=4, freq_mask_num=2, time_mask_ratio=0.2)
+        features = torch.rand(4, 200, 80) + 1.0
+        feature_lengths = torch.IntTensor([200, 150, 100, 50])
+        features[1, 150:] = features[2, 100:] = features[3, 50:] = 0
+        apply_mask = torch.BoolTensor([True, True, True, False])
+
+        masked = spec_augment(features.clone(), feature_lengths, apply_mask)
+
+        self.assertTrue(torch.equal(masked[3], features[3]))
+        for idx, length in enumerate(feature_lengths.tolist()[:3]):
+            masked_frames = (masked[idx, :length] == 0).all(dim=1).sum().item()
+            self.assertLessEqual(masked_frames, 4 * int(length * 0.2))
+            self.assertTrue(torch.equal(masked[idx, length:], features[idx, length:]))
+
     def test_time_stretch_augment(self):
         y, sr = librosa.load(librosa.ex("choice"))
         plt.plot(y)
@@ -45,6 +66,17 @@ class TestAudioAugment(unittest.TestCase):
         plt.tight_layout()
         plt.show()
 
+    def test_speed_perturb_augment(self):
+        speed_perturb = SpeedPerturbAugment(rates=(0.9, 1.0, 1.1))
+        signal = np.sin(np.linspace(0, 200 * np.pi, 16000)).astype(np.float32)
+
+        self.assertIs(speed_perturb(signal, rate=1.0), signal)
+        for rate in (0.9, 1.1):
+            perturbed = speed_perturb(signal, rate=rate)
+            self.assertEqual(perturbed.dtype, np.float32)
+            self.assertAlmostEqual(len(perturbed), len(signal) / rate, delta=1)
+        self.assertIn(len(speed_perturb(signal)), (len(signal), 17778, 14546))
+
     def test_audio_joining(self):
         joining_augment = JoiningAugment()
 
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+
+from openspeech.data.audio.index import filter_by_duration, load_audio_lengths, load_non_silence_indices
+from openspeech.data.audio.load import get_audio_length, load_audio
+from openspeech.data.packed import PackedSequences
+
+
+class TestAudioIndex(unittest.TestCase):
+    def setUp(self):
+        self.dataset_path = tempfile.mkdtemp()
+        self.audio_paths = list()
+        rng = np.random.RandomState(0)
+
+        for idx, length in enumerate([8000, 12345, 20000]):
+            signal = (rng.randn(length) * 3000).astype("int16")
+            signal.tofile(os.path.join(self.dataset_path, f"{idx}.pcm"))
+            self.audio_paths.append(f"{idx}.pcm")
+
+        sf.write(os.path.join(self.dataset_path, "a.wav"), rng.randn(16000) * 0.1, 16000)
+        sf.write(os.path.join(self.dataset_path, "b.flac"), rng.randn(22050) * 0.1, 22050)
+        self.audio_paths += ["a.wav", "b.flac"]
+
+    def test_header_length_matches_decoded_length(self):
+        for audio_path in self.audio_paths:
+            audio_path = os.path.join(self.dataset_path, audio_path)
+            self.assertEqual(get_audio_length(audio_path, 16000), len(load_audio(audio_path, sample_rate=16000)))
+
+    def test_index_is_persisted(self):
+        index_path = os.path.join(self.dataset_path, "manifest.txt.train.lengths.npz")
+
+        audio_lengths = load_audio_lengths(self.dataset_path, self.audio_paths, 16000, index_path=index_path)
+        self.assertTrue(os.path.exists(index_path))
+
+        os.remove(os.path.join(self.dataset_path, "0.pcm"))
+        cached = load_audio_lengths(self.dataset_path, self.audio_paths, 16000, index_path=index_path)
+        np.testing.assert_array_equal(cached, audio_lengths)
+
+        rebuilt = load_audio_lengths(self.dataset_path, self.audio_paths[1:], 16000, index_path=index_path)
+        np.testing.assert_array_equal(rebuilt, audio_lengths[1:])
+
+    def test_non_silence_indices(self):
+        silent = np.zeros(30000, dtype="int16")
+        silent[8000:12000] = (np.random.RandomState(1).randn(4000) * 3000).astype("int16")
+        silent[20000:24000] = (np.random.RandomState(2).randn(4000) * 3000).astype("int16")
+        silent.tofile(os.path.join(self.dataset_path, "silent.pcm"))
+        audio_paths = self.audio_paths + ["silent.pcm"]
+        index_path = os.path.join(self.dataset_path, "manifest.txt.train.silence.npz")
+
+        non_silence_indices = load_non_silence_indices(
+            self.dataset_path, audio_paths, 16000, index_path=index_path, num_workers=2
+        )
+        self.assertEqual(len(non_silence_indices), len(audio_paths))
+        self.assertTrue(os.path.exists(index_path))
+
+        for idx, audio_path in enumerate(audio_paths):
+            audio_path = os.path.join(self.dataset_path, audio_path)
+            expected = load_audio(audio_path, sample_rate=16000, del_silence=True)
+            sliced = load_audio(
+                audio_path,
+                sample_rate=16000,
+                del_silence=True,
+                non_silence_indices=non_silence_indices[idx].reshape(-1, 2),
+            )
+            np.testing.assert_array_equal(sliced, expected)
+
+        self.assertLess(len(non_silence_indices[len(audio_paths) - 1]) // 2, 3)
+        cached = load_non_silence_indices(self.dataset_path, audio_paths, 16000, index_path=index_path)
+        np.testing.assert_array_equal(cached.data, non_silence_indices.data)
+
+    def test_filter_by_duration(self):
+        audio_paths, transcripts, audio_lengths, non_silence_indices = filter_by_duration(
+            ["a", "b", "c", "d"],
+            ["1", "2", "3", "4"],
+            [0, 8000, 16000, 48000],
+            16000,
+            min_duration=0.6,
+            max_duration=2.0,
+        )
+        self.assertEqual(audio_paths, ["c"])
+        self.assertEqual(transcripts, ["3"])
+        self.assertEqual(audio_lengths.tolist(), [16000])
+        self.assertIsNone(non_silence_indices)
+
+    def test_filter_by_trimmed_duration(self):
+        non_silence_indices = PackedSequences.from_list(
+            [[0, 16000], [0, 4000, 12000, 16000], [0, 32000], []], dtype=np.int64
+        )
+        audio_paths, transcripts, audio_lengths, non_silence_indices = filter_by_duration(
+            ["a", "b", "c", "d"],
+            ["1", "2", "3", "4"],
+            [16000, 16000, 32000, 16000],
+            16000,
+            min_duration=0.6,
+            max_duration=2.0,
+            non_silence_indices=non_silence_indices,
+        )
+        self.assertEqual(audio_paths, ["a", "c"])
+        self.assertEqual(transcripts, ["1", "3"])
+        self.assertEqual(audio_lengths.tolist(), [16000, 32000])
+        self.assertEqual([non_silence_indices[idx].tolist() for idx in range(2)], [[0, 16000], [0, 32000]])
+
+
+if __name__ == "__main__":
+    unittest.main()
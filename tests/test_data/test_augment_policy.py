@@ -0,0 +1,114 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+from omegaconf import OmegaConf
+
+from openspeech.data.audio.dataset import SpeechToTextDataset
+from openspeech.data.audio.melspectrogram.configuration import MelSpectrogramConfigs
+from openspeech.dataclass.configurations import AugmentConfigs
+
+
+class TestAugmentPolicy(unittest.TestCase):
+    def setUp(self):
+        self.dataset_path = tempfile.mkdtemp()
+        self.noise_path = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+
+        self.audio_paths, self.transcripts = list(), list()
+        for idx in range(8):
+            (rng.randn(rng.randint(8000, 16000)) * 3000).astype("int16").tofile(
+                os.path.join(self.dataset_path, f"{idx}.pcm")
+            )
+            self.audio_paths.append(f"{idx}.pcm")
+            self.transcripts.append(" ".join(str(token) for token in rng.randint(4, 50, 5)))
+        (rng.randn(4000) * 3000).astype("int16").tofile(os.path.join(self.noise_path, "noise.pcm"))
+
+    def _build_dataset(self, augment_policy):
+        configs = OmegaConf.create(
+            {
+                "audio": OmegaConf.structured(MelSpectrogramConfigs()),
+                "augment": OmegaConf.structured(
+                    AugmentConfigs(augment_policy=augment_policy, noise_dataset_dir=self.noise_path)
+                ),
+            }
+        )
+        return SpeechToTextDataset(
+            configs=configs,
+            dataset_path=self.dataset_path,
+            audio_paths=self.audio_paths,
+            transcripts=self.transcripts,
+            apply_spec_augment=True,
+            apply_noise_augment=True,
+            apply_time_stretch_augment=True,
+            apply_joining_augment=True,
+        )
+
+    def test_duplicate_policy(self):
+        dataset = self._build_dataset("duplicate")
+        self.assertEqual(len(dataset), 5 * len(self.audio_paths))
+
+    def test_eval_configs(self):
+        configs = OmegaConf.create({"audio": OmegaConf.structured(MelSpectrogramConfigs()), "eval": {"batch_size": 2}})
+        dataset = SpeechToTextDataset(
+            configs=configs,
+            dataset_path=self.dataset_path,
+            audio_paths=self.audio_paths,
+            transcripts=self.transcripts,
+        )
+        self.assertEqual(dataset.augment_policy, "duplicate")
+        self.assertEqual(len(dataset), len(self.audio_paths))
+
+        feature, transcript = dataset[0]
+        self.assertEqual(feature.size(1), 80)
+
+    def test_online_policy(self):
+        dataset = self._build_dataset("online")
+        self.assertEqual(len(dataset), len(self.audio_paths))
+
+        compositions = set(dataset._sample_augments(0) for _ in range(200))
+        self.assertIn(frozenset(), compositions)
+        self.assertIn(
+            frozenset((dataset.SPEC_AUGMENT, dataset.NOISE_AUGMENT, dataset.TIME_STRETCH, dataset.AUDIO_JOINING)),
+            compositions,
+        )
+
+        for idx in range(len(dataset)):
+            feature, transcript = dataset[idx]
+            self.assertEqual(feature.size(1), 80)
+            self.assertFalse(feature.isnan().any())
+
+    def test_cached_speed_perturb(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            configs = OmegaConf.create(
+                {
+                    "audio": OmegaConf.structured(MelSpectrogramConfigs(feature_cache_dir=cache_dir)),
+                    "augment": OmegaConf.structured(AugmentConfigs(speed_perturb_rates="(0.9, 1.1)")),
+                }
+            )
+            dataset = SpeechToTextDataset(
+                configs=configs,
+                dataset_path=self.dataset_path,
+                audio_paths=self.audio_paths,
+                transcripts=self.transcripts,
+                apply_speed_perturb_augment=True,
+            )
+            self.assertEqual(len(dataset), 2 * len(self.audio_paths))
+
+            audio_path = self.audio_paths[0]
+            random.seed(0)
+            for _ in range(10):
+                dataset._parse_audio(os.path.join(self.dataset_path, audio_path), frozenset((dataset.SPEED_PERTURB,)))
+
+            num_samples = len(np.fromfile(os.path.join(self.dataset_path, audio_path), dtype="int16"))
+            for rate in (0.9, 1.1):
+                key = dataset._feature_cache.key(os.path.join(self.dataset_path, audio_path), f"speed_perturb={rate}")
+                feature = dataset._feature_cache.get(key)
+                self.assertIsNotNone(feature)
+                self.assertAlmostEqual(len(feature), num_samples / rate / dataset.hop_length, delta=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+import librosa
+import numpy as np
+import torch
+from omegaconf import OmegaConf
+
+from openspeech.data import AUDIO_FEATURE_TRANSFORM_REGISTRY
+from openspeech.data.audio.batch_feature_transform import build_batch_feature_transform
+from openspeech.data.audio.filter_bank.configuration import FilterBankConfigs
+from openspeech.data.audio.melspectrogram.configuration import MelSpectrogramConfigs
+from openspeech.data.audio.mfcc.configuration import MFCCConfigs
+from openspeech.data.audio.spectrogram.configuration import SpectrogramConfigs
+
+try:
+    import torchaudio  # noqa: F401
+
+    TORCHAUDIO_AVAILABLE = True
+except ImportError:
+    TORCHAUDIO_AVAILABLE = False
+
+
+def _normalize(feature):
+    feature = feature - feature.mean()
+    return feature / np.std(feature)
+
+
+class TestBatchFeatureTransform(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.signals = [
+            (rng.randn(length) * 0.1 + 0.3 * np.sin(np.arange(length) * 0.05)).astype(np.float32)
+            for length in [16000, 12345, 9000, 20001]
+        ]
+        self.waveform_lengths = torch.IntTensor([len(signal) for signal in self.signals])
+        self.waveforms = torch.zeros(len(self.signals), int(self.waveform_lengths.max()))
+        for idx, signal in enumerate(self.signals):
+            self.waveforms[idx, : len(signal)] = torch.from_numpy(signal)
+
+    def _assert_match(self, configs, reference, atol=1e-3):
+        features, feature_lengths = build_batch_feature_transform(configs)(self.waveforms, self.waveform_lengths)
+
+        for idx, signal in enumerate(self.signals):
+            expected = _normalize(reference(signal))
+            self.assertEqual(int(feature_lengths[idx]), expected.shape[0])
+            np.testing.assert_allclose(features[idx, : feature_lengths[idx]].numpy(), expected, atol=atol)
+            self.assertTrue(torch.all(features[idx, feature_lengths[idx] :] == 0))
+
+    def _registered(self, configs):
+        transform = AUDIO_FEATURE_TRANSFORM_REGISTRY[configs.audio.name](configs)
+        return lambda signal: transform(signal).transpose()
+
+    def test_melspectrogram(self):
+        configs = OmegaConf.create({"audio": OmegaConf.structured(MelSpectrogramConfigs())})
+        self._assert_match(configs, self._registered(configs))
+
+    def test_mfcc(self):
+        configs = OmegaConf.create({"audio": OmegaConf.structured(MFCCConfigs())})
+        self._assert_match(configs, self._registered(configs))
+
+    def test_spectrogram(self):
+        configs = OmegaConf.create({"audio": OmegaConf.structured(SpectrogramConfigs())})
+        n_fft, hop_length = 320, 160
+
+        def reference(signal):
+            stft = librosa.stft(signal, n_fft=n_fft, hop_length=hop_length, window="hamming", center=False)
+            return np.log1p(np.abs(stft)).transpose()
+
+        self._assert_match(configs, reference)
+
+    @unittest.skipUnless(TORCHAUDIO_AVAILABLE, "torchaudio is not installed")
+    def test_fbank(self):
+        configs = OmegaConf.create({"audio": OmegaConf.structured(FilterBankConfigs())})
+        self._assert_match(configs, self._registered(configs))
+
+
+if __name__ == "__main__":
+    unittest.main()
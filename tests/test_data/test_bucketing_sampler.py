@@ -0,0 +1,169 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from openspeech.data.sampler import BucketingSampler, DistributedBucketingSampler, RandomSampler
+
+
+class _LengthDataset(object):
+    def __init__(self, feature_lengths, target_lengths):
+        self.feature_lengths = np.asarray(feature_lengths)
+        self.target_lengths = np.asarray(target_lengths)
+
+    def get_feature_lengths(self):
+        return self.feature_lengths
+
+    def get_target_lengths(self):
+        return self.target_lengths
+
+    def __len__(self):
+        return len(self.feature_lengths)
+
+
+def _gather_batches(rank, world_size, init_file, dataset, output_dir):
+    dist.init_process_group("gloo", init_method=f"file://{init_file}", rank=rank, world_size=world_size)
+    try:
+        sampler = DistributedBucketingSampler(dataset, max_frames=6000, num_buckets=10, seed=3, drop_last=True)
+        epochs = [list(sampler), list(sampler)]
+        gathered = [None] * world_size
+        dist.all_gather_object(gathered, epochs)
+        if rank == 0:
+            np.save(os.path.join(output_dir, "batches.npy"), np.array(gathered, dtype=object), allow_pickle=True)
+    finally:
+        dist.destroy_process_group()
+
+
+class TestBucketingSampler(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.dataset = _LengthDataset(rng.randint(50, 1500, 1000), rng.randint(5, 100, 1000))
+
+    def test_frame_budget(self):
+        sampler = BucketingSampler(self.dataset, max_frames=6000, max_tokens=800, num_buckets=10)
+
+        batches = list(sampler)
+        self.assertEqual(len(batches), len(sampler))
+        self.assertEqual(sorted(idx for ids in batches for idx in ids), list(range(len(self.dataset))))
+
+        for ids in batches:
+            if len(ids) > 1:
+                self.assertLessEqual(self.dataset.feature_lengths[ids].max() * len(ids), 6000)
+                self.assertLessEqual(self.dataset.target_lengths[ids].max() * len(ids), 800)
+
+        sizes = {len(ids): self.dataset.feature_lengths[ids].max() for ids in batches}
+        self.assertGreater(sizes[max(sizes)], 0)
+        self.assertLess(sizes[max(sizes)], sizes[min(sizes)])
+
+    def test_shuffle_every_epoch(self):
+        sampler = BucketingSampler(self.dataset, max_frames=6000, num_buckets=10, seed=3)
+
+        first, second = list(sampler), list(sampler)
+        self.assertNotEqual(first, second)
+        self.assertNotEqual(sorted(map(sorted, first)), sorted(map(sorted, second)))
+        self.assertEqual(sorted(idx for ids in second for idx in ids), list(range(len(self.dataset))))
+
+        sampler.shuffle(0)
+        self.assertEqual(list(sampler), first)
+
+    def test_len_every_epoch(self):
+        sampler = BucketingSampler(self.dataset, max_frames=6000, num_buckets=10, seed=3)
+        shares = [
+            DistributedBucketingSampler(
+                self.dataset, max_frames=6000, num_buckets=10, num_replicas=3, rank=rank, seed=3
+            )
+            for rank in range(3)
+        ]
+
+        lengths = list()
+        for _ in range(6):
+            lengths.append(len(sampler))
+            self.assertEqual(len(list(sampler)), lengths[-1])
+            for share in shares:
+                num_bins = len(share)
+                self.assertEqual(len(list(share)), num_bins)
+        self.assertGreater(len(set(lengths)), 1)
+
+    def test_resume_from_state(self):
+        sampler = BucketingSampler(self.dataset, max_frames=6000, num_buckets=10, seed=3)
+        list(sampler)
+
+        iterator = iter(sampler)
+        seen = [next(iterator) for _ in range(7)]
+        sampler.advance(len(seen))
+        state = sampler.state_dict()
+        rest = list(iterator)
+        next_epoch = list(sampler)
+
+        resumed = BucketingSampler(self.dataset, max_frames=6000, num_buckets=10, seed=3)
+        resumed.load_state_dict(state)
+        self.assertEqual(list(resumed), rest)
+        self.assertEqual(list(resumed), next_epoch)
+
+    def test_resume_at_end_of_epoch(self):
+        sampler = RandomSampler(self.dataset, batch_size=32)
+        sampler.shuffle(0)
+        list(sampler)
+        sampler.advance(len(sampler))
+
+        resumed = RandomSampler(self.dataset, batch_size=32)
+        resumed.load_state_dict(sampler.state_dict())
+        self.assertEqual(resumed.epoch, 1)
+        self.assertEqual(len(list(resumed)), len(sampler))
+        self.assertEqual(resumed.bin_order.tolist(), sampler.bin_order.tolist())
+
+    def test_distributed_shares(self):
+        sampler = BucketingSampler(self.dataset, max_frames=6000, num_buckets=10, seed=3)
+        shares = [
+            DistributedBucketingSampler(
+                self.dataset, max_frames=6000, num_buckets=10, num_replicas=3, rank=rank, seed=3
+            )
+            for rank in range(3)
+        ]
+        batches = [list(share) for share in shares]
+
+        self.assertEqual([len(share) for share in batches], [len(shares[0])] * 3)
+        self.assertEqual(sum(map(len, batches)), 3 * -(-len(sampler) // 3))
+        seen = sorted(tuple(sorted(ids)) for share in batches for ids in share)
+        self.assertEqual(sorted(set(seen)), sorted(tuple(sorted(ids)) for ids in sampler.bins))
+
+        frames = [sum(self.dataset.feature_lengths[ids].max() * len(ids) for ids in share) for share in batches]
+        self.assertLess(max(frames) - min(frames), 6000)
+        self.assertNotEqual(batches, [list(share) for share in shares])
+
+    def test_random_sampler_shares(self):
+        shares = [RandomSampler(self.dataset, batch_size=32, num_replicas=3, rank=rank) for rank in range(3)]
+        batches = [list(share) for share in shares]
+
+        num_bins = -(-len(self.dataset) // 32)
+        self.assertEqual([len(share) for share in batches], [-(-num_bins // 3)] * 3)
+        seen = sorted(idx for share in batches for ids in share for idx in ids)
+        self.assertEqual(sorted(set(seen)), list(range(len(self.dataset))))
+
+        shares[1].advance(4)
+        resumed = RandomSampler(self.dataset, batch_size=32, num_replicas=3, rank=2)
+        resumed.load_state_dict(shares[1].state_dict())
+        self.assertEqual([sorted(ids) for ids in resumed], [sorted(ids) for ids in batches[2][4:]])
+
+    def test_distributed_gloo(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            mp.start_processes(
+                _gather_batches,
+                args=(2, os.path.join(tmp_dir, "init"), self.dataset, tmp_dir),
+                nprocs=2,
+                start_method="fork",
+            )
+            gathered = np.load(os.path.join(tmp_dir, "batches.npy"), allow_pickle=True).tolist()
+
+        for epoch in range(2):
+            first, second = gathered[0][epoch], gathered[1][epoch]
+            self.assertEqual(len(first), len(second))
+            self.assertFalse({tuple(ids) for ids in first} & {tuple(ids) for ids in second})
+        self.assertNotEqual(gathered[0][0], gathered[0][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+from omegaconf import OmegaConf
+
+from openspeech.data.audio.batch_feature_transform import build_batch_feature_transform
+from openspeech.data.audio.cmvn import CMVN, load_or_compute_cmvn
+from openspeech.data.audio.dataset import SpeechToTextDataset
+from openspeech.data.audio.melspectrogram.configuration import MelSpectrogramConfigs
+from openspeech.data.audio.melspectrogram.melspectrogram import MelSpectrogramFeatureTransform
+from openspeech.dataclass.configurations import AugmentConfigs
+
+
+class TestCMVN(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = self.tmp_dir.name
+        rng = np.random.RandomState(0)
+
+        self.audio_paths, self.transcripts = list(), list()
+        for idx in range(6):
+            speaker = f"speaker_{idx % 2}"
+            os.makedirs(os.path.join(self.dataset_path, speaker), exist_ok=True)
+            audio_path = os.path.join(speaker, f"{idx}.pcm")
+            (rng.randn(rng.randint(8000, 16000)) * 1000 * (idx % 2 + 1)).astype("int16").tofile(
+                os.path.join(self.dataset_path, audio_path)
+            )
+            self.audio_paths.append(audio_path)
+            self.transcripts.append("5 6 7")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _configs(self, normalization, **audio):
+        cmvn_path = os.path.join(self.dataset_path, "cmvn.npz")
+        return OmegaConf.create(
+            {
+                "audio": OmegaConf.structured(
+                    MelSpectrogramConfigs(normalization=normalization, cmvn_path=cmvn_path, **audio)
+                ),
+                "augment": OmegaConf.structured(AugmentConfigs()),
+            }
+        )
+
+    def _features(self, configs):
+        transforms = MelSpectrogramFeatureTransform(configs)
+        return [
+            transforms(np.fromfile(os.path.join(self.dataset_path, audio_path), dtype="int16") / 32767).transpose()
+            for audio_path in self.audio_paths
+        ]
+
+    def test_statistics_match_numpy(self):
+        configs = self._configs("speaker")
+        cmvn = load_or_compute_cmvn(
+            configs, self.dataset_path, self.audio_paths, configs.audio.cmvn_path, num_workers=2
+        )
+        features = self._features(configs)
+
+        stacked = np.concatenate(features).astype(np.float64)
+        np.testing.assert_allclose(cmvn.mean, stacked.mean(axis=0), rtol=1e-4, atol=1e-3)
+        np.testing.assert_allclose(cmvn.std, stacked.std(axis=0), rtol=1e-4, atol=1e-3)
+
+        speaker_1 = np.concatenate(features[1::2]).astype(np.float64)
+        np.testing.assert_allclose(cmvn.speaker_stats["speaker_1"][0], speaker_1.mean(axis=0), rtol=1e-4, atol=1e-3)
+
+        restored = CMVN.load(configs.audio.cmvn_path)
+        np.testing.assert_array_equal(restored.speaker_stats["speaker_0"][1], cmvn.speaker_stats["speaker_0"][1])
+
+        normalized = cmvn.normalize(features[0].copy())
+        np.testing.assert_allclose(normalized, (features[0] - cmvn.mean) / cmvn.std, rtol=1e-4, atol=1e-4)
+        normalized = cmvn.normalize_tensor(torch.from_numpy(features[0].copy())).numpy()
+        np.testing.assert_allclose(normalized, (features[0] - cmvn.mean) / cmvn.std, rtol=1e-4, atol=1e-4)
+
+    def test_dataset_and_batch_transform(self):
+        configs = self._configs("global")
+        cmvn = load_or_compute_cmvn(configs, self.dataset_path, self.audio_paths, configs.audio.cmvn_path)
+        dataset = SpeechToTextDataset(configs, self.dataset_path, self.audio_paths, self.transcripts)
+        features = self._features(configs)
+
+        for idx in range(len(dataset)):
+            feature, _ = dataset[idx]
+            expected = (features[self.audio_paths.index(dataset.audio_paths[idx])] - cmvn.mean) / cmvn.std
+            np.testing.assert_allclose(feature.numpy(), expected, rtol=1e-4, atol=1e-4)
+
+        transform = build_batch_feature_transform(configs, cmvn=cmvn)
+        waveform = torch.from_numpy(
+            np.fromfile(os.path.join(self.dataset_path, self.audio_paths[0]), dtype="int16") / 32767
+        ).float()
+        batch_features, _ = transform(waveform.unsqueeze(0), torch.IntTensor([len(waveform)]))
+        expected = (features[0] - cmvn.mean) / cmvn.std
+        np.testing.assert_allclose(batch_features[0].numpy(), expected, rtol=1e-3, atol=1e-2)
+
+    def test_missing_statistics(self):
+        with self.assertRaises(ValueError):
+            SpeechToTextDataset(self._configs("global"), self.dataset_path, self.audio_paths, self.transcripts)
+
+
+if __name__ == "__main__":
+    unittest.main()
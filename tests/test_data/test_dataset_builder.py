@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from omegaconf import OmegaConf
+
+from openspeech.data.audio.builder import build_speech_to_text_datasets
+from openspeech.data.audio.dataset import SpeechToTextDataset
+from openspeech.data.audio.melspectrogram.configuration import MelSpectrogramConfigs
+from openspeech.data.audio.tar_dataset import SpeechToTextTarDataset
+from openspeech.dataclass.configurations import AugmentConfigs
+
+
+class TestDatasetBuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = os.path.join(self.tmp_dir.name, "train")
+        self.test_dataset_path = os.path.join(self.tmp_dir.name, "test")
+        rng = np.random.RandomState(0)
+
+        self.audio_paths, self.transcripts = dict(), dict()
+        for stage, num_samples in (("train", 6), ("valid", 2), ("test", 2)):
+            dataset_path = self.test_dataset_path if stage == "test" else self.dataset_path
+            os.makedirs(dataset_path, exist_ok=True)
+            self.audio_paths[stage], self.transcripts[stage] = list(), list()
+            for idx in range(num_samples):
+                # the first train utterance is shorter than min_duration
+                length = 1600 if stage == "train" and idx == 0 else rng.randint(8000, 16000)
+                audio_path = f"{stage}{idx}.pcm"
+                (rng.randn(length) * 3000).astype("int16").tofile(os.path.join(dataset_path, audio_path))
+                self.audio_paths[stage].append(audio_path)
+                self.transcripts[stage].append(" ".join(str(token) for token in rng.randint(4, 50, 5)))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _build(self, **audio_configs):
+        configs = OmegaConf.create(
+            {
+                "audio": OmegaConf.structured(MelSpectrogramConfigs(min_duration=0.3, **audio_configs)),
+                "augment": OmegaConf.structured(AugmentConfigs()),
+                "dataset": {"manifest_file_path": os.path.join(self.tmp_dir.name, "manifest.txt")},
+                "trainer": {"seed": 1},
+            }
+        )
+        dataset_paths = {
+            "train": self.dataset_path,
+            "valid": self.dataset_path,
+            "test": self.test_dataset_path,
+        }
+        return build_speech_to_text_datasets(
+            configs,
+            audio_paths={stage: list(audio_paths) for stage, audio_paths in self.audio_paths.items()},
+            transcripts={stage: list(transcripts) for stage, transcripts in self.transcripts.items()},
+            dataset_paths=dataset_paths,
+        )
+
+    def test_splits(self):
+        datasets = self._build(normalization="global")
+
+        self.assertEqual(list(datasets.keys()), ["train", "valid", "test"])
+        # only the train split is filtered and augmented (spec augment duplicates it)
+        self.assertEqual(sorted(set(datasets["train"].audio_paths)), self.audio_paths["train"][1:])
+        self.assertEqual(len(datasets["train"]), 2 * (len(self.audio_paths["train"]) - 1))
+        self.assertEqual(len(datasets["valid"]), len(self.audio_paths["valid"]))
+        self.assertEqual(datasets["test"].dataset_path, self.test_dataset_path)
+        for stage in datasets.keys():
+            self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, f"manifest.txt.{stage}.lengths.npz")))
+
+        self.assertIsNotNone(datasets["train"].cmvn)
+        self.assertIs(datasets["test"].cmvn, datasets["train"].cmvn)
+        feature, transcript = datasets["test"][0]
+        self.assertEqual(feature.size(1), 80)
+
+    def test_train_shards(self):
+        datasets = self._build(train_shard_dir=os.path.join(self.tmp_dir.name, "shards"))
+
+        self.assertIsInstance(datasets["train"], SpeechToTextTarDataset)
+        self.assertEqual(datasets["train"].num_samples, len(self.audio_paths["train"]) - 1)
+        self.assertIsInstance(datasets["valid"], SpeechToTextDataset)
+
+    def test_train_shards_with_unsupported_features(self):
+        shard_dir = os.path.join(self.tmp_dir.name, "shards")
+        with self.assertRaisesRegex(ValueError, "apply_noise_augment"):
+            self._build(train_shard_dir=shard_dir, apply_noise_augment=True)
+        with self.assertRaisesRegex(ValueError, "speaker normalization"):
+            self._build(train_shard_dir=shard_dir, normalization="speaker")
+        self.assertFalse(os.path.exists(shard_dir))
+
+    def test_train_shards_with_silence_removal(self):
+        datasets = self._build(train_shard_dir=os.path.join(self.tmp_dir.name, "shards"), del_silence=True)
+
+        self.assertTrue(datasets["train"].del_silence)
+        samples = [
+            sample
+            for shard_path in datasets["train"].shard_paths
+            for sample in datasets["train"]._read_shard(shard_path)
+        ]
+        self.assertEqual(len(samples), len(self.audio_paths["train"]) - 1)
+        for _, _, _, non_silence_indices in samples:
+            self.assertEqual(non_silence_indices.shape[1], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from omegaconf import OmegaConf
+
+from openspeech.data.audio.feature_cache import FeatureCache
+from openspeech.data.audio.melspectrogram.configuration import MelSpectrogramConfigs
+
+
+def _fill(cache, audio_paths):
+    for audio_path in audio_paths:
+        cache.get_or_compute(audio_path, lambda: np.full((10, 80), len(audio_path), dtype=np.float32))
+
+
+class TestFeatureCache(unittest.TestCase):
+    def setUp(self):
+        self.configs = OmegaConf.create({"audio": OmegaConf.structured(MelSpectrogramConfigs())})
+        self.cache_dir = tempfile.mkdtemp()
+
+    def test_round_trip(self):
+        cache = FeatureCache(self.cache_dir, self.configs, num_shards=4, dtype="float32")
+        feature = np.random.randn(123, 80).astype(np.float32)
+
+        computed = cache.get_or_compute("a.pcm", lambda: feature)
+        cached = FeatureCache(self.cache_dir, self.configs, num_shards=4, dtype="float32").get(cache.key("a.pcm"))
+
+        np.testing.assert_array_equal(computed, feature)
+        np.testing.assert_array_equal(cached, feature)
+
+    def test_float16_storage(self):
+        cache = FeatureCache(self.cache_dir, self.configs, num_shards=4, dtype="float16")
+        feature = np.random.randn(50, 80).astype(np.float32)
+
+        computed = cache.get_or_compute("a.pcm", lambda: feature)
+        cached = cache.get(cache.key("a.pcm"))
+
+        self.assertEqual(cached.dtype, np.float32)
+        np.testing.assert_array_equal(computed, cached)
+        np.testing.assert_allclose(cached, feature, atol=1e-2)
+
+    def test_key_depends_on_audio_configs(self):
+        cache = FeatureCache(self.cache_dir, self.configs, num_shards=4)
+        self.configs.audio.num_mels = 40
+        other_cache = FeatureCache(self.cache_dir, self.configs, num_shards=4)
+
+        self.assertNotEqual(cache.key("a.pcm"), other_cache.key("a.pcm"))
+        self.assertNotEqual(cache.key("a.pcm"), cache.key("a.pcm", variant="speed_1.1"))
+
+    def test_concurrent_workers(self):
+        cache = FeatureCache(self.cache_dir, self.configs, num_shards=2)
+        audio_paths = [f"{idx}.pcm" for idx in range(100)]
+
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=_fill, args=(cache, audio_paths)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        record_size = FeatureCache.INDEX_DTYPE.itemsize
+        num_records = sum(
+            os.path.getsize(os.path.join(self.cache_dir, file)) // record_size
+            for file in os.listdir(self.cache_dir)
+            if file.endswith(".idx")
+        )
+        self.assertEqual(num_records, len(audio_paths))
+
+        for audio_path in audio_paths:
+            feature = cache.get(cache.key(audio_path))
+            self.assertEqual(feature.shape, (10, 80))
+            self.assertTrue(np.all(feature == len(audio_path)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+
+from omegaconf import OmegaConf
+
+from openspeech.data.incremental_manifest import IncrementalManifestBuilder, split_by_key
+from openspeech.datasets.ksponspeech.lit_data_module import LightningKsponSpeechDataModule
+
+PROCESSED = list()
+
+
+def _read_entries(file_path):
+    PROCESSED.append(os.path.basename(file_path))
+    with open(file_path, encoding="utf-8") as f:
+        return [(os.path.basename(file_path).replace(".txt", ".pcm"), f.read().strip())]
+
+
+def _write_manifest_shard(audio_paths, transcripts, shard_path):
+    with open(shard_path, "w", encoding="utf-8") as f:
+        for audio_path, transcript in zip(audio_paths, transcripts):
+            f.write(f"{audio_path}\t{transcript}\t{len(transcript)}\n")
+
+
+class TestIncrementalManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.sources = {"a": ["안녕", "하세요"], "b": ["반갑", "습니다", "또"]}
+        for source, sentences in self.sources.items():
+            self._write_source(source, sentences)
+        del PROCESSED[:]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_source(self, source, sentences):
+        os.makedirs(os.path.join(self.root, source), exist_ok=True)
+        for idx, sentence in enumerate(sentences):
+            with open(os.path.join(self.root, source, f"{source}{idx}.txt"), "w", encoding="utf-8") as f:
+                f.write(sentence)
+
+    def _build(self, manifest_file_path, vocab_digest="vocab"):
+        builder = IncrementalManifestBuilder(os.path.join(self.root, "shards"), version="test", n_jobs=1)
+        keys, sources = list(), sorted(os.listdir(self.root))
+        sources = [source for source in sources if source != "shards" and not source.endswith(".tsv")]
+        for source in sources:
+            file_paths = [os.path.join(self.root, source, name) for name in os.listdir(os.path.join(self.root, source))]
+            keys.append(builder.update(source, file_paths, _read_entries))
+        builder.remove_missing_sources(sources)
+        builder.write_manifest(keys, manifest_file_path, _write_manifest_shard, vocab_digest)
+        with open(manifest_file_path, encoding="utf-8") as f:
+            return [line.split("\t")[1] for line in f], keys
+
+    def test_only_changed_files_are_processed(self):
+        manifest_file_path = os.path.join(self.root, "manifest.tsv")
+        transcripts, keys = self._build(manifest_file_path)
+        self.assertEqual(transcripts, self.sources["a"] + self.sources["b"])
+        self.assertEqual(len(PROCESSED), 5)
+
+        del PROCESSED[:]
+        self.assertEqual(self._build(manifest_file_path), (transcripts, keys))
+        self.assertEqual(PROCESSED, [])
+
+        for name, sentence in (("b1.txt", "고쳤다"), ("b3.txt", "새로운")):
+            with open(os.path.join(self.root, "b", name), "w", encoding="utf-8") as f:
+                f.write(sentence)
+        transcripts, new_keys = self._build(manifest_file_path)
+        self.assertEqual(transcripts, ["안녕", "하세요", "반갑", "고쳤다", "또", "새로운"])
+        self.assertEqual(new_keys[0], keys[0])
+        self.assertEqual(sorted(PROCESSED), ["b1.txt", "b3.txt"])
+
+        for name in os.listdir(os.path.join(self.root, "a")):
+            os.remove(os.path.join(self.root, "a", name))
+        os.rmdir(os.path.join(self.root, "a"))
+        transcripts, _ = self._build(manifest_file_path)
+        self.assertEqual(transcripts, ["반갑", "고쳤다", "또", "새로운"])
+        self.assertFalse(any(name.startswith(keys[0]) for name in os.listdir(os.path.join(self.root, "shards"))))
+
+    def test_stale_vocab_shards_are_removed(self):
+        manifest_file_path = os.path.join(self.root, "manifest.tsv")
+        transcripts, keys = self._build(manifest_file_path)
+        self.assertEqual(self._build(manifest_file_path, vocab_digest="other")[0], transcripts)
+
+        shard_names = sorted(name for name in os.listdir(os.path.join(self.root, "shards")) if name.endswith(".tsv"))
+        self.assertEqual(shard_names, sorted(f"{key}.other.tsv" for key in keys))
+
+    def test_split_by_key(self):
+        audio_paths = [f"KsponSpeech_01/KsponSpeech_{idx:06d}.pcm" for idx in range(2000)]
+        is_valid = split_by_key(audio_paths, 0.1)
+        self.assertTrue(50 < is_valid.sum() < 400)
+
+        appended = split_by_key(audio_paths[:1000] + ["KsponSpeech_06/new.pcm"] + audio_paths[1000:], 0.1)
+        self.assertEqual(appended[:1000].tolist() + appended[1001:].tolist(), is_valid.tolist())
+
+    def test_ksponspeech_incremental_split(self):
+        class DataModule(LightningKsponSpeechDataModule):
+            KSPONSPEECH_TRAIN_NUM = 90
+            KSPONSPEECH_VALID_NUM = 10
+            KSPONSPEECH_TEST_NUM = 2
+
+        configs = OmegaConf.create(
+            {"dataset": {"incremental_manifest": True}, "tokenizer": {"unit": "kspon_character"}}
+        )
+        data_module = DataModule(configs)
+        audio_paths = [f"KsponSpeech_01/{idx}.pcm" for idx in range(100)] + ["eval/0.pcm", "eval/1.pcm"]
+        splits = data_module._split_indices(audio_paths)
+        self.assertEqual(splits["test"].tolist(), [100, 101])
+
+        appended = data_module._split_indices(audio_paths[:100] + ["KsponSpeech_06/0.pcm"] + audio_paths[100:])
+        self.assertEqual(appended["test"].tolist(), [101, 102])
+        self.assertEqual(sorted(appended["valid"].tolist() + appended["train"].tolist()), list(range(101)))
+        self.assertEqual([idx for idx in appended["valid"].tolist() if idx < 100], splits["valid"].tolist())
+
+    def test_ksponspeech_matches_full_build(self):
+        dataset_path = os.path.join(self.root, "kspon")
+        script_dir = os.path.join(self.root, "scripts")
+        sentences = ["o/ 그래서 (3G)/(쓰리 쥐)가 안 돼", "b/ 네 알겠습니다.", "(70%)/(칠십 퍼센트) 정도요", "음 그래요"]
+        for idx, sentence in enumerate(sentences):
+            subfolder = os.path.join(dataset_path, "KsponSpeech_01", f"KsponSpeech_000{idx % 2}")
+            os.makedirs(subfolder, exist_ok=True)
+            with open(os.path.join(subfolder, f"KsponSpeech_00000{idx}.txt"), "w", encoding="cp949") as f:
+                f.write(sentence)
+        os.makedirs(script_dir)
+        for split in ("eval_clean.trn", "eval_other.trn"):
+            with open(os.path.join(script_dir, split), "w", encoding="utf-8") as f:
+                f.write(f"KsponSpeech_eval/{split}.pcm :: 평가 문장 입니다\n")
+
+        manifests = list()
+        for incremental in (False, True):
+            configs = OmegaConf.create(
+                {
+                    "dataset": {
+                        "dataset_path": dataset_path,
+                        "test_manifest_dir": script_dir,
+                        "manifest_file_path": os.path.join(self.root, f"manifest.{incremental}.txt"),
+                        "preprocess_mode": "spelling",
+                        "incremental_manifest": incremental,
+                    },
+                    "tokenizer": {
+                        "unit": "kspon_character",
+                        "vocab_path": os.path.join(self.root, f"{incremental}.csv"),
+                    },
+                }
+            )
+            LightningKsponSpeechDataModule(configs).prepare_data()
+            with open(configs.dataset.manifest_file_path) as f:
+                manifests.append(sorted(f.readlines()))
+
+        self.assertEqual(len(manifests[0]), len(sentences) + 2)
+        self.assertEqual(manifests[0], manifests[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import re
+import unittest
+
+import numpy as np
+
+from openspeech.datasets.ksponspeech.preprocess.preprocess import sentence_filter
+
+
+def _legacy_bracket_filter(sentence, mode="phonetic"):
+    new_sentence = str()
+
+    if mode == "phonetic":
+        flag = False
+
+        for ch in sentence:
+            if ch == "(" and flag is False:
+                flag = True
+                continue
+            if ch == "(" and flag is True:
+                flag = False
+                continue
+            if ch != ")" and flag is False:
+                new_sentence += ch
+
+    elif mode == "spelling":
+        flag = True
+
+        for ch in sentence:
+            if ch == "(":
+                continue
+            if ch == ")":
+                if flag is True:
+                    flag = False
+                    continue
+                else:
+                    flag = True
+                    continue
+            if ch != ")" and flag is True:
+                new_sentence += ch
+
+    return new_sentence
+
+
+def _legacy_special_filter(sentence, mode="phonetic", replace=None):
+    SENTENCE_MARK = ["?", "!", "."]
+    NOISE = ["o", "n", "u", "b", "l"]
+    EXCEPT = ["/", "+", "*", "-", "@", "$", "^", "&", "[", "]", "=", ":", ";", ","]
+
+    new_sentence = str()
+    for idx, ch in enumerate(sentence):
+        if ch not in SENTENCE_MARK:
+            if idx + 1 < len(sentence) and ch in NOISE and sentence[idx + 1] == "/":
+                continue
+
+        if ch == "#":
+            new_sentence += "샾"
+
+        elif ch == "%":
+            if mode == "phonetic":
+                new_sentence += replace
+            elif mode == "spelling":
+                new_sentence += "%"
+
+        elif ch not in EXCEPT:
+            new_sentence += ch
+
+    pattern = re.compile(r"\s\s+")
+    new_sentence = re.sub(pattern, " ", new_sentence.strip())
+    return new_sentence
+
+
+FIXTURES = [
+    "o/ 그래서 (3G)/(쓰리 쥐)가 안 돼 n/\n",
+    "b/ 아/ 몇 (70%)/(칠십 퍼센트)? l/ u/",
+    "(a)/(에이) + (b)/(비) = #태그, *강조* [음] @멘션; 끝.",
+    "  공백이    많은   문장   \t  ",
+    "((중첩)) 괄호 ) 짝이 ( 안 맞는 (문장",
+    "on/ bo/ lu/ 소리 o/o/ no/",
+    "",
+]
+
+
+class TestKsponSpeechPreprocess(unittest.TestCase):
+    def _fixture_corpus(self):
+        rng = np.random.RandomState(0)
+        alphabet = list("()/%#+*-@$^&[]=:;,?!. \t\nonubl") + ["가", "나", "다", "퍼", "a", "B", "3"]
+        random_sentences = ["".join(rng.choice(alphabet, rng.randint(0, 40))) for _ in range(2000)]
+        return FIXTURES + random_sentences
+
+    def test_matches_legacy_filters(self):
+        for sentence in self._fixture_corpus():
+            for mode in ("phonetic", "spelling"):
+                expected = _legacy_special_filter(_legacy_bracket_filter(sentence, mode), mode, "퍼센트")
+                self.assertEqual(sentence_filter(sentence, mode, "퍼센트"), expected, (sentence, mode))
+
+    def test_percent_requires_replace_in_phonetic_mode(self):
+        self.assertEqual(sentence_filter("10%", "spelling"), "10%")
+        with self.assertRaises(ValueError):
+            sentence_filter("10%", "phonetic")
+        with self.assertRaises(ValueError):
+            sentence_filter("10%", "unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
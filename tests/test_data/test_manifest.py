@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from openspeech.data.audio.index import filter_by_duration
+from openspeech.data.manifest import BinaryManifest, convert_manifest, find_binary_manifest, load_manifest
+
+MANIFEST_LINES = [
+    "a/1.pcm\t안녕 하세요\t5 6 7\n",
+    "a/2.pcm\tb\t8\n",
+    "b/3.pcm\tc d\t10 11\n",
+]
+
+
+class TestBinaryManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manifest_file_path = os.path.join(self.tmp_dir.name, "transcripts.txt")
+        with open(self.manifest_file_path, "w", encoding="utf-8") as f:
+            f.writelines(MANIFEST_LINES)
+
+        dataset_path = os.path.join(self.tmp_dir.name, "dataset")
+        for idx, line in enumerate(MANIFEST_LINES):
+            audio_path = os.path.join(dataset_path, line.split("\t")[0])
+            os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+            np.zeros(1000 * (idx + 1), dtype=np.int16).tofile(audio_path)
+        self.dataset_path = dataset_path
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        output_path = convert_manifest(self.manifest_file_path, dataset_path=self.dataset_path)
+        manifest = BinaryManifest(output_path)
+
+        self.assertEqual(len(manifest), 3)
+        self.assertEqual(list(manifest.audio_paths), ["a/1.pcm", "a/2.pcm", "b/3.pcm"])
+        self.assertEqual(list(manifest.texts), ["안녕 하세요", "b", "c d"])
+        self.assertEqual([tokens.tolist() for tokens in manifest.tokens], [[5, 6, 7], [8], [10, 11]])
+        self.assertEqual(manifest.audio_lengths.tolist(), [1000, 2000, 3000])
+        self.assertEqual(manifest.sample_rate, 16000)
+
+        _, _, audio_lengths = load_manifest(self.manifest_file_path, sample_rate=16000)
+        self.assertEqual(audio_lengths.tolist(), [1000, 2000, 3000])
+        self.assertIsNone(load_manifest(self.manifest_file_path, sample_rate=8000)[2])
+
+    def test_load_manifest_matches_tsv(self):
+        tsv_paths, tsv_transcripts, tsv_lengths = load_manifest(self.manifest_file_path)
+        self.assertIsNone(tsv_lengths)
+        self.assertIsNone(find_binary_manifest(self.manifest_file_path))
+
+        convert_manifest(self.manifest_file_path)
+        bin_paths, bin_transcripts, bin_lengths = load_manifest(self.manifest_file_path)
+        self.assertIsNone(bin_lengths)
+
+        self.assertEqual(list(bin_paths), tsv_paths)
+        self.assertEqual([" ".join(map(str, tokens)) for tokens in bin_transcripts], tsv_transcripts)
+        self.assertEqual(list(bin_paths[1:]), tsv_paths[1:])
+
+        paths, transcripts, _, _ = filter_by_duration(
+            bin_paths, bin_transcripts, np.array([16000, 0, 32000]), sample_rate=16000
+        )
+        self.assertEqual(list(paths), ["a/1.pcm", "b/3.pcm"])
+        self.assertEqual(transcripts.lengths().tolist(), [3, 2])
+
+    def test_stale_binary_manifest(self):
+        output_path = convert_manifest(self.manifest_file_path)
+        self.assertEqual(find_binary_manifest(self.manifest_file_path), output_path)
+
+        stat = os.stat(output_path)
+        os.utime(self.manifest_file_path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertIsNone(find_binary_manifest(self.manifest_file_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from openspeech.data.audio.augment import NoiseInjector
+from openspeech.data.audio.noise_bank import NoiseBank
+
+
+class TestNoiseBank(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.noise_path = self.tmp_dir.name
+        rng = np.random.RandomState(0)
+        self.noises = [(rng.randn(length) * 3000).astype("int16") for length in (4000, 6000, 2000)]
+        for idx, noise in enumerate(self.noises):
+            noise.tofile(os.path.join(self.noise_path, f"noise_{idx}.pcm"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_bank_matches_noise_files(self):
+        noise_bank = NoiseBank.open(self.noise_path)
+
+        self.assertEqual(len(noise_bank), len(self.noises))
+        self.assertIsInstance(noise_bank.data, np.memmap)
+        for idx, noise in enumerate(self.noises):
+            expected = noise.astype(np.float32) / 32767
+            np.testing.assert_allclose(noise_bank[idx], expected, atol=1e-6)
+            self.assertAlmostEqual(noise_bank.rms[idx], np.sqrt(np.mean(np.square(expected))), places=4)
+
+        restored = pickle.loads(pickle.dumps(noise_bank))
+        self.assertIsNone(restored._data)
+        np.testing.assert_array_equal(restored[1], noise_bank[1])
+
+    def test_rebuild_on_change(self):
+        fingerprint = NoiseBank.open(self.noise_path).fingerprint
+        self.assertEqual(NoiseBank.open(self.noise_path).fingerprint, fingerprint)
+
+        np.zeros(100, dtype="int16").tofile(os.path.join(self.noise_path, "silence.pcm"))
+        noise_bank = NoiseBank.open(self.noise_path)
+        self.assertNotEqual(noise_bank.fingerprint, fingerprint)
+        self.assertEqual(len(noise_bank), len(self.noises))  # silent clips are skipped
+
+    def test_snr_mixing(self):
+        noise_injector = NoiseInjector(self.noise_path, noise_bank_dtype="float32", min_snr=10.0, max_snr=10.0)
+        signal = np.random.RandomState(1).randn(16000).astype(np.float32) * 0.1
+
+        mixed = noise_injector(signal.copy())
+        noise = mixed - signal
+        snr = 10 * np.log10(np.mean(np.square(signal)) / np.mean(np.square(noise[noise != 0])))
+        self.assertAlmostEqual(snr, 10.0, delta=0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
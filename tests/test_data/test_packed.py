@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+
+from openspeech.data.packed import PackedSequences, PackedStrings
+
+
+class TestPacked(unittest.TestCase):
+    def test_packed_strings(self):
+        strings = ["KsponSpeech_01/a.pcm", "", "한국어/b.pcm", "c.wav"]
+        packed = PackedStrings.from_list(strings)
+
+        self.assertEqual(list(packed), strings)
+        self.assertEqual(list(packed.take(np.array([3, 0, 0]))), ["c.wav", strings[0], strings[0]])
+        self.assertIs(packed.take(np.array([1, 2])).data, packed.data)
+
+    def test_packed_sequences(self):
+        transcripts = ["5 6 7", "8", "10 11"]
+        packed = PackedSequences.from_transcripts(transcripts)
+
+        self.assertEqual(packed.data.dtype, np.int32)
+        self.assertEqual([sequence.tolist() for sequence in packed], [[5, 6, 7], [8], [10, 11]])
+        self.assertEqual(packed.lengths().tolist(), [3, 1, 2])
+        self.assertEqual(packed.take(np.array([2, 2]))[1].tolist(), [10, 11])
+
+    def test_empty_transcripts(self):
+        packed = PackedSequences.from_transcripts(["", "5 6", ""])
+        self.assertEqual([sequence.tolist() for sequence in packed], [[], [5, 6], []])
+        self.assertEqual(packed.lengths().tolist(), [0, 2, 0])
+        self.assertEqual(len(PackedSequences.from_transcripts([""])[0]), 0)
+        self.assertEqual(len(PackedSequences.from_transcripts([])), 0)
+
+    def test_invalid_transcript(self):
+        with self.assertRaises(ValueError):
+            PackedSequences.from_transcripts(["5  6"])
+
+
+if __name__ == "__main__":
+    unittest.main()
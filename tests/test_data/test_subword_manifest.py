@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import sentencepiece as spm
+
+from openspeech.datasets.ksponspeech.preprocess.subword import (
+    convert_subword,
+    sentence_to_subwords,
+    train_sentencepiece,
+)
+
+
+class TestSubwordManifest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+
+        rng = np.random.RandomState(0)
+        words = ["안녕", "하세요", "그래서", "정말", "오늘", "날씨", "가", "좋네요", "네", "알겠습니다"]
+        self.transcripts = [" ".join(rng.choice(words, rng.randint(1, 8))) for _ in range(3000)]
+        self.audio_paths = [f"KsponSpeech_01/KsponSpeech_0001/KsponSpeech_{idx:06d}.txt" for idx in range(3000)]
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def test_parallel_encoding_matches_pieces(self):
+        train_sentencepiece(self.transcripts, vocab_size=60)
+        self.assertTrue(os.path.exists("sp.model"))
+        self.assertFalse(os.path.exists("sentencepiece_input.txt"))
+
+        sentence_to_subwords(
+            self.audio_paths, self.transcripts, "manifest.txt", sp_model_path="kspon_sp.model", num_workers=2
+        )
+
+        sp = spm.SentencePieceProcessor()
+        sp.Load("kspon_sp.model")
+        with open("manifest.txt", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+        self.assertEqual(len(lines), len(self.transcripts))
+        for line, audio_path, transcript in zip(lines, self.audio_paths, self.transcripts):
+            text, label = convert_subword(transcript, sp)
+            self.assertEqual(line, f"{audio_path.replace('txt', 'pcm')}\t{text}\t{label}")
+            self.assertEqual(sp.DecodeIds([int(id_) for id_ in label.split()]), transcript)
+
+
+if __name__ == "__main__":
+    unittest.main()
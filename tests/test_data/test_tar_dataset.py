@@ -0,0 +1,196 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+import torch
+from omegaconf import OmegaConf
+
+from openspeech.data.audio.data_loader import AudioDataLoader
+from openspeech.data.audio.load import load_audio
+from openspeech.data.audio.melspectrogram.configuration import MelSpectrogramConfigs
+from openspeech.data.audio.tar_dataset import (
+    SpeechToTextTarDataset,
+    list_tar_shards,
+    load_or_write_tar_shards,
+    write_tar_shards,
+)
+from openspeech.data.manifest import convert_manifest, load_manifest
+from openspeech.data.packed import PackedSequences
+from openspeech.dataclass.configurations import AugmentConfigs
+
+
+class TestTarDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = os.path.join(self.tmp_dir.name, "dataset")
+        os.makedirs(self.dataset_path)
+        rng = np.random.RandomState(0)
+
+        lines = list()
+        for idx in range(10):
+            audio = (rng.randn(rng.randint(4000, 8000)) * 3000).astype("int16")
+            if idx % 2:
+                audio_path = f"{idx}.pcm"
+                audio.tofile(os.path.join(self.dataset_path, audio_path))
+            else:
+                audio_path = f"{idx}.wav"
+                sf.write(os.path.join(self.dataset_path, audio_path), audio, 16000)
+            lines.append(f"{audio_path}\t-\t{idx + 4} {idx + 5}\n")
+
+        self.lines = lines
+        self.manifest_file_path = os.path.join(self.tmp_dir.name, "manifest.txt")
+        with open(self.manifest_file_path, "w") as f:
+            f.writelines(lines)
+
+        self.shard_dir = os.path.join(self.tmp_dir.name, "shards")
+        write_tar_shards(self.manifest_file_path, self.dataset_path, self.shard_dir, shard_size=3)
+        self.configs = OmegaConf.create(
+            {
+                "audio": OmegaConf.structured(MelSpectrogramConfigs(feature_extraction="model")),
+                "augment": OmegaConf.structured(AugmentConfigs()),
+            }
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_shards_match_files(self):
+        shard_paths = list_tar_shards(self.shard_dir)
+        self.assertEqual(len(shard_paths), 4)
+
+        dataset = SpeechToTextTarDataset(self.configs, shard_paths, shuffle=False)
+        items = list(dataset)
+        self.assertEqual(len(items), 10)
+
+        for waveform, transcript, spec_augment in items:
+            idx = int(transcript[1]) - 4
+            extension = "pcm" if idx % 2 else "wav"
+            expected = load_audio(os.path.join(self.dataset_path, f"{idx}.{extension}"), 16000)
+            np.testing.assert_allclose(waveform.numpy(), expected, atol=1e-4)
+            self.assertEqual(transcript.tolist(), [1, idx + 4, idx + 5, 2])
+            self.assertFalse(spec_augment)
+
+    def test_worker_split_and_epoch_shuffle(self):
+        shard_dir = os.path.join(self.tmp_dir.name, "even_shards")
+        write_tar_shards(self.manifest_file_path, self.dataset_path, shard_dir, shard_size=5)
+        dataset = SpeechToTextTarDataset(self.configs, list_tar_shards(shard_dir), shuffle_buffer_size=4)
+        data_loader = AudioDataLoader(dataset=dataset, num_workers=2, batch_sampler=None, batch_size=2)
+
+        orders = list()
+        for epoch in range(2):
+            dataset.set_epoch(epoch)
+            order = list()
+            for waveforms, targets, waveform_lengths, target_lengths, spec_augment in data_loader:
+                order.extend(targets[:, 1].tolist())
+            self.assertEqual(sorted(order), list(range(4, 14)))
+            orders.append(order)
+
+        self.assertNotEqual(orders[0], orders[1])
+
+    def test_readers_yield_same_number_of_samples(self):
+        dataset = SpeechToTextTarDataset(self.configs, list_tar_shards(self.shard_dir), shuffle=False)
+        self.assertEqual(dataset.num_samples, 10)
+
+        for num_readers in (2, 3, 6):
+            counts = [len(list(dataset._reader_samples(reader_id, num_readers))) for reader_id in range(num_readers)]
+            self.assertEqual(counts, [-(-10 // num_readers)] * num_readers)
+
+    def test_load_or_write_tar_shards(self):
+        audio_paths = [line.split("\t")[0] for line in self.lines]
+        transcripts = [line.rstrip("\n").split("\t")[2] for line in self.lines]
+        shard_dir = os.path.join(self.tmp_dir.name, "train_shards")
+
+        shard_paths, shard_sizes = load_or_write_tar_shards(
+            self.dataset_path, audio_paths, transcripts, shard_dir, shard_size=4
+        )
+        self.assertEqual(shard_sizes, [4, 4, 2])
+        mtimes = [os.path.getmtime(shard_path) for shard_path in shard_paths]
+
+        self.assertEqual(
+            load_or_write_tar_shards(self.dataset_path, audio_paths, transcripts, shard_dir, shard_size=4),
+            (shard_paths, shard_sizes),
+        )
+        self.assertEqual([os.path.getmtime(shard_path) for shard_path in shard_paths], mtimes)
+
+        shard_paths, shard_sizes = load_or_write_tar_shards(
+            self.dataset_path, audio_paths[:6], transcripts[:6], shard_dir, shard_size=4
+        )
+        self.assertEqual(shard_sizes, [4, 2])
+        self.assertEqual(list_tar_shards(shard_dir), shard_paths)
+
+        dataset = SpeechToTextTarDataset(self.configs, shard_paths, shard_sizes=shard_sizes, shuffle=False)
+        self.assertEqual(sorted(int(transcript[1]) for _, transcript, _ in dataset), list(range(4, 10)))
+
+    def test_load_or_write_tar_shards_from_binary_manifest(self):
+        convert_manifest(self.manifest_file_path, dataset_path=self.dataset_path)
+        audio_paths, transcripts, _ = load_manifest(self.manifest_file_path)
+        self.assertIsInstance(transcripts, PackedSequences)
+        shard_dir = os.path.join(self.tmp_dir.name, "train_shards")
+
+        shard_paths, shard_sizes = load_or_write_tar_shards(
+            self.dataset_path, audio_paths, transcripts, shard_dir, shard_size=4
+        )
+        self.assertEqual(shard_sizes, [4, 4, 2])
+        mtimes = [os.path.getmtime(shard_path) for shard_path in shard_paths]
+
+        # the same utterances from the TSV manifest are not repacked
+        text_transcripts = [line.rstrip("\n").split("\t")[2] for line in self.lines]
+        self.assertEqual(
+            load_or_write_tar_shards(self.dataset_path, list(audio_paths), text_transcripts, shard_dir, shard_size=4),
+            (shard_paths, shard_sizes),
+        )
+        self.assertEqual([os.path.getmtime(shard_path) for shard_path in shard_paths], mtimes)
+
+        dataset = SpeechToTextTarDataset(self.configs, shard_paths, shard_sizes=shard_sizes, shuffle=False)
+        self.assertEqual(sorted(int(transcript[1]) for _, transcript, _ in dataset), list(range(4, 14)))
+
+    def test_spec_augment_policies(self):
+        shard_paths = list_tar_shards(self.shard_dir)
+        flags = dict()
+        for augment_policy in ("duplicate", "online"):
+            configs = OmegaConf.create(
+                {
+                    "audio": OmegaConf.structured(MelSpectrogramConfigs(feature_extraction="model")),
+                    "augment": OmegaConf.structured(AugmentConfigs(augment_policy=augment_policy)),
+                }
+            )
+            dataset = SpeechToTextTarDataset(configs, shard_paths, apply_spec_augment=True, shuffle=False)
+            flags[augment_policy] = dict()
+            for _, transcript, spec_augment in dataset:
+                flags[augment_policy].setdefault(int(transcript[1]) - 4, list()).append(spec_augment)
+
+        self.assertEqual(flags["duplicate"], {idx: [False, True] for idx in range(10)})
+        self.assertEqual(sorted(flags["online"]), list(range(10)))
+        self.assertEqual({len(spec_augments) for spec_augments in flags["online"].values()}, {1})
+        self.assertEqual({spec_augments[0] for spec_augments in flags["online"].values()}, {False, True})
+
+    def test_precomputed_non_silence_indices(self):
+        audio_paths = [line.split("\t")[0] for line in self.lines]
+        transcripts = [line.rstrip("\n").split("\t")[2] for line in self.lines]
+        non_silence_indices = PackedSequences.from_list([[0, 1000, 2000, 2500]] * len(audio_paths), dtype=np.int64)
+        shard_paths, shard_sizes = load_or_write_tar_shards(
+            self.dataset_path,
+            audio_paths,
+            transcripts,
+            os.path.join(self.tmp_dir.name, "train_shards"),
+            shard_size=4,
+            non_silence_indices=non_silence_indices,
+        )
+
+        dataset = SpeechToTextTarDataset(
+            self.configs, shard_paths, shard_sizes=shard_sizes, del_silence=True, shuffle=False
+        )
+        for waveform, transcript, _ in dataset:
+            idx = int(transcript[1]) - 4
+            if idx % 2:
+                # silence is only removed from PCM
+                expected = load_audio(os.path.join(self.dataset_path, f"{idx}.pcm"), 16000)
+                np.testing.assert_allclose(waveform.numpy(), np.concatenate([expected[:1000], expected[2000:2500]]))
+            else:
+                self.assertGreater(len(waveform), 2500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+import torch
+
+from openspeech.data.text.corpus import load_or_tokenize_corpus, load_tokenized_corpus, tokenize_corpus
+from openspeech.data.text.dataset import PackedTextDataset, TextDataset
+from openspeech.tokenizers.tokenizer import Tokenizer
+
+
+class _CharTokenizer(Tokenizer):
+    def __init__(self):
+        super(_CharTokenizer, self).__init__()
+        self.sos_id = 1
+        self.eos_id = 2
+
+    def encode(self, sentence):
+        return " ".join(str(ord(ch) - ord("a") + 3) for ch in sentence if ch.isalpha())
+
+
+class TestTextCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.corpus_path = os.path.join(self.tmp_dir.name, "corpus.txt")
+        self.lines = ["hello world", "", "a", "language model corpus", "xyz"] * 7
+        with open(self.corpus_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.lines) + "\n")
+        self.tokenizer = _CharTokenizer()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_tokenize_corpus(self):
+        output_path = tokenize_corpus(self.corpus_path, self.tokenizer, num_workers=2, chunk_size=3)
+        sentences = load_tokenized_corpus(output_path)
+
+        expected = [self.tokenizer(line) for line in self.lines if self.tokenizer(line)]
+        self.assertEqual(len(sentences), len(expected))
+        self.assertEqual([" ".join(map(str, sentence)) for sentence in sentences], expected)
+
+        reference = TextDataset([line for line in self.lines if self.tokenizer(line)], self.tokenizer)
+        dataset = TextDataset(sentences, self.tokenizer)
+        for idx in range(len(dataset)):
+            for tensor, reference_tensor in zip(dataset[idx], reference[idx]):
+                self.assertTrue(torch.equal(tensor, reference_tensor))
+
+        mtime = os.stat(f"{output_path}.bin").st_mtime_ns
+        load_or_tokenize_corpus(self.corpus_path, self.tokenizer)
+        self.assertEqual(os.stat(f"{output_path}.bin").st_mtime_ns, mtime)
+
+    def test_packed_blocks(self):
+        sentences = load_or_tokenize_corpus(self.corpus_path, self.tokenizer, num_workers=1)
+        stream = torch.cat([torch.LongTensor(list(sentence) + [self.tokenizer.eos_id]) for sentence in sentences])
+
+        dataset = PackedTextDataset(sentences, self.tokenizer, block_size=8)
+        self.assertEqual(len(dataset), -(-(len(stream) - 1) // 8))
+
+        inputs = torch.cat([dataset[idx][0] for idx in range(len(dataset))])
+        targets = torch.cat([dataset[idx][1] for idx in range(len(dataset))])
+        self.assertTrue(all(len(dataset[idx][0]) == 8 for idx in range(len(dataset) - 1)))
+        self.assertTrue(torch.equal(inputs, stream[:-1]))
+        self.assertTrue(torch.equal(targets, stream[1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import sentencepiece as spm
+import torch
+from omegaconf import OmegaConf
+
+from openspeech.tokenizers.ksponspeech.character import KsponSpeechCharacterTokenizer
+from openspeech.tokenizers.ksponspeech.subword import KsponSpeechSubwordTokenizer
+from openspeech.tokenizers.tokenizer import UnitTable
+
+
+def _decode_row(row, id_dict, eos_id, blank_id):
+    sentence = str()
+    for label in row:
+        if label.item() == eos_id:
+            break
+        elif label.item() == blank_id:
+            continue
+        sentence += id_dict[label.item()]
+    return sentence
+
+
+class TestTokenizerBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        vocab_path = os.path.join(self.tmp_dir.name, "labels.csv")
+        units = ["<pad>", "<sos>", "<eos>", "<blank>", " "] + [chr(0xAC00 + idx) for idx in range(60)] + ["ㄱㄴ", ""]
+        with open(vocab_path, "w", encoding="utf-8") as f:
+            f.write("id,char,freq\n")
+            f.writelines(f"{idx},{unit},0\n" for idx, unit in enumerate(units))
+
+        self.configs = configs = OmegaConf.create(
+            {
+                "tokenizer": {
+                    "vocab_path": vocab_path,
+                    "encoding": "utf-8",
+                    "sos_token": "<sos>",
+                    "eos_token": "<eos>",
+                    "pad_token": "<pad>",
+                    "blank_token": "<blank>",
+                }
+            }
+        )
+        self.tokenizer = KsponSpeechCharacterTokenizer(configs)
+        self.labels = torch.from_numpy(np.random.RandomState(0).randint(0, len(units), size=(64, 40)))
+        self.labels[5] = self.tokenizer.eos_id
+        self.labels[6] = self.tokenizer.blank_id
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_matches_loop(self):
+        tokenizer = self.tokenizer
+        expected = [_decode_row(row, tokenizer.id_dict, tokenizer.eos_id, tokenizer.blank_id) for row in self.labels]
+
+        self.assertEqual(tokenizer.decode(self.labels), expected)
+        self.assertEqual(tokenizer.decode(self.labels.numpy()), expected)
+        self.assertEqual(tokenizer.decode(self.labels[3]), expected[3])
+        self.assertEqual(tokenizer.decode(self.labels[:, :0]), [""] * len(self.labels))
+        self.assertEqual(expected[5:7], ["", ""])
+
+    def test_single_character_table(self):
+        table = UnitTable({0: "a", 1: "b", 2: "c", 4: "d"})
+        self.assertTrue(table.single_character)
+        self.assertEqual(table.decode(np.array([[0, 1, 2, 4], [4, 0, 1, 1]]), eos_id=2), ["ab", "dabb"])
+        with self.assertRaises(KeyError):
+            table.decode(np.array([[0, 3]]))
+
+    def test_character_encode_batch(self):
+        tokenizer = self.tokenizer
+        sentences = ["가나 다", "", "abc 가", "ㄱㄴ가", "각" * 50]
+        expected = [[int(token) for token in tokenizer.encode(sentence).split()] for sentence in sentences]
+
+        labels = tokenizer.encode_batch(sentences)
+        self.assertEqual([label.tolist() for label in labels], expected)
+        self.assertTrue(all(label.dtype == np.int32 for label in labels))
+
+        values, offsets = tokenizer.encode_batch(sentences, ragged=True)
+        self.assertEqual(offsets.tolist(), np.cumsum([0] + [len(label) for label in expected]).tolist())
+        self.assertEqual(values.tolist(), sum(expected, []))
+        self.assertEqual(tokenizer.encode_batch([]), [])
+
+    def test_subword_encode_batch(self):
+        rng = np.random.RandomState(0)
+        words = ["안녕", "하세요", "그래서", "정말", "오늘", "날씨", "가", "좋네요", "네", "알겠습니다"]
+        sentences = [" ".join(rng.choice(words, rng.randint(1, 8))) for _ in range(500)]
+        model_prefix = os.path.join(self.tmp_dir.name, "sp")
+        spm.SentencePieceTrainer.Train(
+            sentence_iterator=iter(sentences),
+            model_prefix=model_prefix,
+            vocab_size=40,
+            pad_id=0,
+            bos_id=1,
+            eos_id=2,
+            unk_id=3,
+            user_defined_symbols=["<blank>"],
+            minloglevel=2,
+        )
+        self.configs.tokenizer.sp_model_path = f"{model_prefix}.model"
+        self.configs.tokenizer.sos_token = "<s>"
+        self.configs.tokenizer.eos_token = "</s>"
+        self.configs.tokenizer.vocab_size = 40
+        tokenizer = KsponSpeechSubwordTokenizer(self.configs)
+
+        labels = tokenizer.encode_batch(sentences[:50])
+        for sentence, label in zip(sentences, labels):
+            self.assertEqual(label.tolist(), tokenizer.sp.EncodeAsIds(sentence))
+            self.assertEqual(tokenizer.encode(sentence), " ".join(map(str, label.tolist())))
+            self.assertEqual(tokenizer.decode(label), sentence)
+
+
+if __name__ == "__main__":
+    unittest.main()
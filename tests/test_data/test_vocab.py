@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from openspeech.data.vocab import count_units, generate_vocab_labels
+
+
+def _legacy_labels(transcripts, unit_column="char", max_size=None, split=None):
+    label_list = list()
+    label_freq = list()
+
+    for transcript in transcripts:
+        for ch in transcript if split is None else split(transcript):
+            if ch not in label_list:
+                label_list.append(ch)
+                label_freq.append(1)
+            else:
+                label_freq[label_list.index(ch)] += 1
+
+    label_freq, label_list = zip(*sorted(zip(label_freq, label_list), reverse=True))
+    label = {"id": [0, 1, 2, 3], unit_column: ["<pad>", "<sos>", "<eos>", "<blank>"], "freq": [0, 0, 0, 0]}
+
+    for idx, (ch, freq) in enumerate(zip(label_list, label_freq)):
+        label["id"].append(idx + 4)
+        label[unit_column].append(ch)
+        label["freq"].append(freq)
+
+    if max_size is not None:
+        label = {key: values[:max_size] for key, values in label.items()}
+    return pd.DataFrame(label)
+
+
+class TestVocab(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        alphabet = list("가나다라마바사아자차카타파하 ") + [chr(0xAC00 + i) for i in range(40)]
+        self.transcripts = ["".join(rng.choice(alphabet, rng.randint(1, 30))) for _ in range(3000)]
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.vocab_path = os.path.join(self.tmp_dir.name, "labels.csv")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read(self):
+        return pd.read_csv(self.vocab_path, encoding="utf-8", keep_default_na=False)
+
+    def test_parallel_counting(self):
+        self.assertEqual(
+            count_units(self.transcripts, shard_size=256, num_workers=2), count_units(self.transcripts, num_workers=1)
+        )
+
+    def test_character_labels_match_legacy(self):
+        for max_size in (None, 20):
+            generate_vocab_labels(self.transcripts, self.vocab_path, max_size=max_size)
+            expected = _legacy_labels(self.transcripts, max_size=max_size)
+            expected_path = f"{self.vocab_path}.expected"
+            expected.to_csv(expected_path, encoding="utf-8", index=False)
+
+            with open(self.vocab_path, encoding="utf-8") as f, open(expected_path, encoding="utf-8") as g:
+                self.assertEqual(f.read(), g.read())
+
+    def test_grapheme_labels_match_legacy(self):
+        generate_vocab_labels(self.transcripts, self.vocab_path, unit_column="grpm", split=str.split)
+        expected = _legacy_labels(self.transcripts, unit_column="grpm", split=str.split)
+        pd.testing.assert_frame_equal(self._read(), expected.astype({"grpm": str}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+from omegaconf import OmegaConf
+
+from openspeech.metrics import CharacterErrorRate, MetricScheduler, WordErrorRate, edit_distance
+from openspeech.tokenizers.ksponspeech.character import KsponSpeechCharacterTokenizer
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        vocab_path = os.path.join(self.tmp_dir.name, "labels.csv")
+        units = ["<pad>", "<sos>", "<eos>", "<blank>", " ", "_"] + [chr(0xAC00 + idx) for idx in range(6)]
+        with open(vocab_path, "w", encoding="utf-8") as f:
+            f.write("id,char,freq\n")
+            f.writelines(f"{idx},{unit},0\n" for idx, unit in enumerate(units))
+
+        configs = OmegaConf.create(
+            {
+                "tokenizer": {
+                    "vocab_path": vocab_path,
+                    "encoding": "utf-8",
+                    "sos_token": "<sos>",
+                    "eos_token": "<eos>",
+                    "pad_token": "<pad>",
+                    "blank_token": "<blank>",
+                }
+            }
+        )
+        self.tokenizer = KsponSpeechCharacterTokenizer(configs)
+
+        rng = np.random.RandomState(0)
+        self.targets = torch.from_numpy(rng.choice([2, 3, 4, 4, 5] + list(range(6, 12)) * 2, size=(64, 50)))
+        self.y_hats = torch.from_numpy(rng.choice([2, 3, 4, 4, 5] + list(range(6, 12)) * 2, size=(64, 40)))
+        self.targets[0] = self.y_hats[1] = self.tokenizer.eos_id
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_edit_distance_counts(self):
+        references = np.array([[1, 2, 3, 4], [1, 2, 3, 0], [5, 5, 0, 0]])
+        hypotheses = np.array([[1, 3, 4, 9, 9], [1, 2, 3, 0, 0], [0, 0, 0, 0, 0]])
+        substitutions, deletions, insertions = edit_distance(references, [4, 3, 2], hypotheses, [5, 3, 0])
+
+        self.assertEqual(substitutions.tolist(), [0, 0, 0])
+        self.assertEqual(deletions.tolist(), [1, 0, 2])
+        self.assertEqual(insertions.tolist(), [2, 0, 0])
+
+    def test_batch_backend_matches_levenshtein(self):
+        for metric_class in (CharacterErrorRate, WordErrorRate):
+            metric = metric_class(self.tokenizer)
+            reference = metric_class(self.tokenizer, backend="levenshtein")
+            self.assertEqual(metric.backend, "batch")
+
+            for start in range(0, 64, 16):
+                targets, y_hats = self.targets[start : start + 16], self.y_hats[start : start + 16]
+                self.assertAlmostEqual(metric(targets, y_hats), reference(targets, y_hats))
+                self.assertEqual(
+                    (metric.total_dist, metric.total_length), (reference.total_dist, reference.total_length)
+                )
+
+            edits = metric.total_substitutions + metric.total_deletions + metric.total_insertions
+            self.assertEqual(edits, metric.total_dist)
+
+    def test_special_ids_are_ignored(self):
+        padding = torch.full_like(self.y_hats, self.tokenizer.pad_id)
+        padding[:, ::3] = self.tokenizer.sos_id
+        y_hats = torch.stack([padding, self.y_hats], dim=2).reshape(len(self.y_hats), -1)
+
+        for metric_class in (CharacterErrorRate, WordErrorRate):
+            metric, reference = metric_class(self.tokenizer), metric_class(self.tokenizer)
+            self.assertAlmostEqual(metric(self.targets, y_hats), reference(self.targets, self.y_hats))
+            self.assertEqual((metric.total_dist, metric.total_length), (reference.total_dist, reference.total_length))
+
+    def test_metric_scheduler(self):
+        scheduler = MetricScheduler(self.tokenizer, interval=2, sample_size=4, seed=3)
+        reference = CharacterErrorRate(self.tokenizer)
+        generator = torch.Generator().manual_seed(3)
+
+        for step, start in enumerate(range(0, 64, 16)):
+            targets, y_hats = self.targets[start : start + 16], self.y_hats[start : start + 16]
+            wer, cer = scheduler(targets, y_hats)
+            if step % 2 == 0:
+                indices = torch.randperm(16, generator=generator)[:4]
+                expected = reference(targets[indices], y_hats[indices])
+            self.assertIsNotNone(wer)
+            self.assertEqual(cer, expected)
+
+        asynchronous = MetricScheduler(self.tokenizer, asynchronous=True)
+        synchronous = MetricScheduler(self.tokenizer)
+        for start in range(0, 64, 16):
+            asynchronous.wait()
+            asynchronous(self.targets[start : start + 16], self.y_hats[start : start + 16])
+            expected = synchronous(self.targets[start : start + 16], self.y_hats[start : start + 16])
+        self.assertEqual(asynchronous.wait(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()